@@ -3,17 +3,39 @@ MirAI Flask Application
 Production-ready multi-stage Alzheimer's early-screening platform.
 """
 import os
-from flask import Flask, send_from_directory, jsonify
+import click
+import hmac
+from flask import Flask, Response, request, send_from_directory, jsonify
 from config import config
 from backend.extensions import init_extensions
-from backend.routes import auth_bp, predict_bp, results_bp
+from backend.routes import auth_bp, predict_bp, results_bp, admin_bp, jobs_bp
 from backend.services.model_loader import model_loader
+from backend.services.archive import assessment_archive
+from backend.services.idempotency import idempotency
+from backend.services.password_hasher import password_hasher
+from backend.services.token_revocation import token_revocation
+from backend.services.rate_limiter import rate_limiter
+from backend.services.static_assets import static_assets
+from backend.services.page_cache import page_cache
+from backend.services.metrics import metrics
+from backend.services.queries import query_accounting
+from backend.services.profiler import request_profiler
+from backend.services.warmer import warmer
+from backend.services.cascade import cascade_pipeline
+from backend.services.rescoring import assessment_scorer
+from backend.services.drift import drift_monitor
+from backend.services.journal import prediction_journal
+from backend.services.jobs import job_queue, start_workers
+from backend.services.trends import risk_trends
+from backend.services.surrogate import surrogate_models
 
 # Get absolute paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 STATIC_DIR = os.path.join(BASE_DIR, 'static')
 ASSETS_DIR = os.path.join(BASE_DIR, 'static', 'assets')
+DIST_DIR = os.path.join(BASE_DIR, 'static', 'dist')
+PAGES = ['index.html', 'register.html', 'login.html', 'assessment.html', 'results.html']
 
 
 def create_app(config_name=None):
@@ -30,49 +52,81 @@ def create_app(config_name=None):
     
     # Initialize extensions
     init_extensions(app)
+    assessment_archive.init_app(app)
+    risk_trends.init_app(app)
+    idempotency.init_app(app)
+    password_hasher.init_app(app)
+    token_revocation.init_app(app)
+    rate_limiter.init_app(app)
+    metrics.init_app(app)
+    query_accounting.init_app(app)
+    request_profiler.init_app(app)
+    static_assets.init_app(app, STATIC_DIR, DIST_DIR)
+    page_cache.init_app(app, TEMPLATES_DIR, PAGES, rewrite=static_assets.rewrite_html)
     
     # Load ML models
     with app.app_context():
         try:
+            model_loader.configure(
+                compact=app.config.get('MODEL_COMPACT', False),
+                tolerance=app.config.get('MODEL_COMPACT_TOLERANCE')
+            )
             model_loader.load_all()
         except Exception as e:
             print(f"⚠️ Warning: Could not load ML models: {e}")
-            print("  API will use mock predictions until models are available.")
+    
+    # Distilled fallback models (serve while the primary models are unavailable)
+    surrogate_models.init_app(app)
+    if not model_loader.is_loaded():
+        if surrogate_models.is_loaded():
+            print("  API will serve the distilled fallback models until the primary models are available.")
+        else:
+            print("  Predictions will fail until the models are available.")
+    
+    cascade_pipeline.init_app(app)
+    drift_monitor.init_app(app)
+    prediction_journal.init_app(app)
+    job_queue.init_app(app)
+    
+    # Start the synthetic-traffic warmer (after models are loaded)
+    warmer.init_app(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(predict_bp)
     app.register_blueprint(results_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(jobs_bp)
     
-    # Serve frontend pages
+    # Serve frontend pages (from the in-memory page cache)
     @app.route('/')
     def index():
-        return send_from_directory(TEMPLATES_DIR, 'index.html')
+        return page_cache.serve('index.html')
     
     @app.route('/register.html')
     def register_page():
-        return send_from_directory(TEMPLATES_DIR, 'register.html')
+        return page_cache.serve('register.html')
     
     @app.route('/login.html')
     def login_page():
-        return send_from_directory(TEMPLATES_DIR, 'login.html')
+        return page_cache.serve('login.html')
     
     @app.route('/assessment.html')
     def assessment_page():
-        return send_from_directory(TEMPLATES_DIR, 'assessment.html')
+        return page_cache.serve('assessment.html')
     
     @app.route('/results.html')
     def results_page():
-        return send_from_directory(TEMPLATES_DIR, 'results.html')
+        return page_cache.serve('results.html')
     
-    # Serve static assets
+    # Serve static assets (precompressed/fingerprinted when built, see build_assets.py)
     @app.route('/static/<path:path>')
     def serve_static(path):
-        return send_from_directory(STATIC_DIR, path)
+        return static_assets.serve(path) or send_from_directory(STATIC_DIR, path)
     
     @app.route('/assets/<path:path>')
     def serve_assets(path):
-        return send_from_directory(ASSETS_DIR, path)
+        return static_assets.serve(f'assets/{path}') or send_from_directory(ASSETS_DIR, path)
     
     # Health check endpoint
     @app.route('/api/health')
@@ -80,14 +134,67 @@ def create_app(config_name=None):
         return jsonify({
             'status': 'healthy',
             'models_loaded': model_loader.is_loaded(),
+            'fallback_available': surrogate_models.is_loaded(),
             'version': '2.0.0'
         })
     
+    # Synthetic scoring through every stage (no rows written), for sidecar warmers;
+    # only exposed when WARMER_TOKEN is set
+    @app.route('/api/warmup', methods=['POST'])
+    def warmup():
+        if not warmer.token:
+            return jsonify({'error': 'Not found'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Warmer-Token', ''), warmer.token):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return jsonify(warmer.warm_once())
+    
+    # Prometheus metrics (aggregated across workers)
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+    
+    # Maintenance commands
+    @app.cli.command('archive-assessments')
+    @click.option('--older-than-days', type=int, default=None,
+                  help='Archive completed assessments older than this many days.')
+    def archive_assessments(older_than_days):
+        """Move old completed assessments into the compressed archive."""
+        moved = assessment_archive.archive_completed(older_than_days)
+        print(f"📦 Archived {moved} assessments to {assessment_archive.path}")
+    
+    @app.cli.command('rescore-assessments')
+    @click.option('--batch-size', type=int, default=500, help='Assessments per transaction.')
+    def rescore_assessments(batch_size):
+        """Re-score stored assessments after a model upgrade (unchanged ones are skipped)."""
+        stats = assessment_scorer.rescore_all(batch_size)
+        print(f"🔁 Examined {stats['examined']} assessments: {stats['unchanged']} unchanged, "
+              f"re-scored stage1={stats['stage1']} stage2={stats['stage2']} stage3={stats['stage3']} "
+              f"final={stats['final']}, failed {stats['failed']}")
+    
+    @app.cli.command('rebuild-risk-trends')
+    def rebuild_risk_trends():
+        """Recompute every user's risk trend from their full history."""
+        users = risk_trends.rebuild_all()
+        print(f"📈 Rebuilt risk trends for {users} users")
+    
+    @app.cli.command('run-job-workers')
+    @click.option('--processes', type=int, default=None,
+                  help='Worker processes (default: JOBS_WORKER_PROCESSES).')
+    def run_job_workers(processes):
+        """Score uploaded batch jobs in background worker processes."""
+        processes = processes or app.config.get('JOBS_WORKER_PROCESSES', 1)
+        print(f"🧮 Starting {processes} job worker(s) on {job_queue.path}")
+        start_workers(app, processes)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(e):
         return jsonify({'error': 'Not found'}), 404
     
+    @app.errorhandler(413)
+    def request_too_large(e):
+        return jsonify({'success': False, 'error': 'Request body too large'}), 413
+    
     @app.errorhandler(500)
     def internal_error(e):
         return jsonify({'error': 'Internal server error'}), 500
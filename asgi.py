@@ -0,0 +1,246 @@
+"""
+MirAI ASGI Entry Point
+Async serving mode: an event loop accepts connections and hands each
+request to a dedicated executor, so CPU-bound inference and blocking I/O
+(SQLite commits, bcrypt) never block the loop or each other.
+
+    uvicorn asgi:app --workers 2
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker --workers 2
+
+Routing:
+    /api/predict/*  -> inference executor (threads, or processes with
+                       ASGI_INFERENCE_EXECUTOR=process)
+    everything else -> I/O executor (results, auth, pages, assets)
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Populated in each inference worker process (process executor mode)
+_process_app = None
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope and request body into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.input_terminated': True,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    # The body is fully buffered, so its length is known even for chunked uploads
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class WSGIResponse:
+    """
+    A running WSGI call whose body is pulled one chunk at a time, so a
+    streaming response (job result downloads) can be forwarded as it is
+    produced. status and headers are set once the first chunk is pulled.
+    """
+
+    def __init__(self, wsgi_app, environ):
+        self.status = None
+        self.headers = None
+        self._pending = []
+        self._result = wsgi_app(environ, self._start_response)
+        self._iterator = iter(self._result)
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+        return self._pending.append
+
+    def next_chunk(self):
+        """The next non-empty body chunk, or None once the body is exhausted."""
+        while not self._pending:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                return None
+            if chunk:
+                self._pending.append(chunk)
+        return self._pending.pop(0)
+
+    def close(self):
+        if hasattr(self._result, 'close'):
+            self._result.close()
+
+
+def start_wsgi(wsgi_app, environ):
+    """Start a WSGI call and pull its first chunk; return (response, first chunk or None)."""
+    response = WSGIResponse(wsgi_app, environ)
+    try:
+        return response, response.next_chunk()
+    except BaseException:
+        response.close()
+        raise
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion; return (status, headers, body)."""
+    response = WSGIResponse(wsgi_app, environ)
+    chunks = []
+    try:
+        chunk = response.next_chunk()
+        while chunk is not None:
+            chunks.append(chunk)
+            chunk = response.next_chunk()
+    finally:
+        response.close()
+    return response.status, response.headers, b''.join(chunks)
+
+
+def _init_process_worker():
+    """Import the Flask app once per inference process."""
+    global _process_app
+    from app import app as flask_app
+    _process_app = flask_app
+
+
+def _call_in_process(environ, body):
+    """Process-executor entry point (environ must be picklable, so body travels separately)."""
+    environ['wsgi.input'] = io.BytesIO(body)
+    environ['wsgi.errors'] = sys.stderr
+    return call_wsgi(_process_app, environ)
+
+
+class AsyncServer:
+    """
+    ASGI application that serves the Flask app through two bounded executors.
+
+    Inference has its own pool sized to the core count, so slow I/O-bound
+    requests queue on the I/O pool without taking inference capacity.
+    """
+
+    INFERENCE_PREFIX = '/api/predict/'
+    TOO_LARGE_BODY = json.dumps({'success': False, 'error': 'Request body too large'}).encode()
+
+    def __init__(self, wsgi_app, inference_workers=None, io_workers=None, inference_mode='thread'):
+        self.wsgi_app = wsgi_app
+        self.inference_mode = inference_mode
+        # Enforced while the body is received, before Flask could check it
+        self.max_body = getattr(wsgi_app, 'config', {}).get('MAX_CONTENT_LENGTH')
+        inference_workers = inference_workers or os.cpu_count() or 2
+        if inference_mode == 'process':
+            self.inference_executor = ProcessPoolExecutor(
+                max_workers=inference_workers, initializer=_init_process_worker
+            )
+        else:
+            self.inference_executor = ThreadPoolExecutor(
+                max_workers=inference_workers, thread_name_prefix='inference'
+            )
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=io_workers or 16, thread_name_prefix='io'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._receive_body(receive)
+        if body is None:
+            await send({'type': 'http.response.start', 'status': 413, 'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(self.TOO_LARGE_BODY)).encode()),
+                (b'connection', b'close')
+            ]})
+            await send({'type': 'http.response.body', 'body': self.TOO_LARGE_BODY})
+            return
+
+        environ = build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        executor = self.io_executor
+        if scope['path'].startswith(self.INFERENCE_PREFIX):
+            # Lets the app measure inference queue wait (surrogate load shedding)
+            environ['mirai.enqueued'] = time.time()
+            executor = self.inference_executor
+            if self.inference_mode == 'process':
+                # Responses cannot stream back from another process; inference replies are small
+                del environ['wsgi.input'], environ['wsgi.errors']
+                status, headers, response_body = await loop.run_in_executor(
+                    executor, _call_in_process, environ, body)
+                await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                await send({'type': 'http.response.body', 'body': response_body})
+                return
+
+        response, chunk = await loop.run_in_executor(executor, start_wsgi, self.wsgi_app, environ)
+        try:
+            await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+            # Chunks are sent as produced; each is pulled on the executor so a slow generator never blocks the loop
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(executor, response.next_chunk)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await loop.run_in_executor(executor, response.close)
+
+    async def _receive_body(self, receive):
+        """The buffered request body, or None once it passes max_body (the rest is not read)."""
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get('body', b''))
+            if self.max_body is not None and len(body) > self.max_body:
+                return None
+            if not message.get('more_body'):
+                return bytes(body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.inference_executor.shutdown(wait=False)
+                self.io_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app():
+    """Build the ASGI server around the Flask app using environment settings."""
+    from app import app as flask_app
+    return AsyncServer(
+        flask_app,
+        inference_workers=int(os.environ.get('ASGI_INFERENCE_WORKERS', 0)) or None,
+        io_workers=int(os.environ.get('ASGI_IO_WORKERS', 0)) or None,
+        inference_mode=os.environ.get('ASGI_INFERENCE_EXECUTOR', 'thread')
+    )
+
+
+app = create_asgi_app()
@@ -2,13 +2,15 @@
 Flask Extensions
 Central extension initialization for the MirAI application.
 """
+from sqlalchemy import inspect, text
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 
-# Initialize extensions
-db = SQLAlchemy()
+# Initialize extensions. Sessions are request-scoped, so committed objects are
+# kept loaded rather than expired (which would cost a SELECT on next access).
+db = SQLAlchemy(session_options={'expire_on_commit': False})
 jwt = JWTManager()
 bcrypt = Bcrypt()
 cors = CORS()
@@ -24,3 +26,18 @@ def init_extensions(app):
     # Create database tables
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+
+
+def add_missing_columns():
+    """Add model columns that existing tables predate (create_all only creates tables)."""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
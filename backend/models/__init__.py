@@ -1,5 +1,6 @@
 """Database models package."""
 from .user import User
 from .assessment import Assessment
+from .risk_trend import RiskTrend
 
-__all__ = ['User', 'Assessment']
+__all__ = ['User', 'Assessment', 'RiskTrend']
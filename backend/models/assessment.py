@@ -44,6 +44,14 @@ class Assessment(db.Model):
     final_risk_score = db.Column(db.Float)
     final_risk_category = db.Column(db.String(20))
     escalation_recommendation = db.Column(db.Text)
+    # Exit stage of a provisional (triage) final result; NULL once the final covers all stages
+    provisional_stage = db.Column(db.Integer)
+    
+    # Dependency tags: hash of each stage's inputs, upstream tag and model version
+    stage1_hash = db.Column(db.String(16))
+    stage2_hash = db.Column(db.String(16))
+    stage3_hash = db.Column(db.String(16))
+    final_hash = db.Column(db.String(16))
     
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -79,12 +87,17 @@ class Assessment(db.Model):
         self.stage3_risk = risk_level
         self.stage3_completed = True
     
-    def update_final_results(self, final_score, category, recommendation):
-        """Update final risk assessment."""
+    def update_final_results(self, final_score, category, recommendation, provisional_stage=None):
+        """
+        Update final risk assessment. A provisional (triage early-exit)
+        result leaves the assessment open, since its later stages may
+        still be submitted.
+        """
         self.final_risk_score = final_score
         self.final_risk_category = category
         self.escalation_recommendation = recommendation
-        self.completed_at = datetime.utcnow()
+        self.provisional_stage = provisional_stage
+        self.completed_at = None if provisional_stage else datetime.utcnow()
     
     def to_dict(self):
         """Serialize assessment to dictionary."""
@@ -127,7 +140,8 @@ class Assessment(db.Model):
             'final': {
                 'score': self.final_risk_score,
                 'category': self.final_risk_category,
-                'recommendation': self.escalation_recommendation
+                'recommendation': self.escalation_recommendation,
+                'provisional': bool(self.provisional_stage)
             },
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
@@ -0,0 +1,197 @@
+"""
+Risk Trend Model
+Per-user rolling summary of completed assessments, maintained
+incrementally so the trend never needs the full history.
+"""
+from datetime import datetime
+from backend.extensions import db
+
+
+SERIES = ('final', 'stage1', 'stage2', 'stage3')
+HIGH_CATEGORY = 'High'
+SECONDS_PER_DAY = 86400.0
+
+
+def _days(moment, origin):
+    return (moment - origin).total_seconds() / SECONDS_PER_DAY
+
+
+class RiskTrend(db.Model):
+    """
+    One row per user, updated in O(1) whenever an assessment completes.
+
+    For every series (final score and each stage probability) the row
+    keeps the running sums of an ordinary least-squares fit of value
+    against time (days since `origin`), plus the latest and previous
+    values. A point can be removed exactly (when a completed assessment
+    is re-scored) by subtracting it from the sums; only when the removed
+    point was neither the latest nor tracked well enough to replace (an
+    older previous result) is the row marked stale and rebuilt from
+    history on the next read.
+    """
+    __tablename__ = 'risk_trends'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    assessment_count = db.Column(db.Integer, nullable=False, default=0)
+    origin = db.Column(db.DateTime)
+    first_completed_at = db.Column(db.DateTime)
+    last_completed_at = db.Column(db.DateTime)
+    last_score = db.Column(db.Float)
+    last_category = db.Column(db.String(20))
+    previous_completed_at = db.Column(db.DateTime)
+    previous_score = db.Column(db.Float)
+    high_count = db.Column(db.Integer, nullable=False, default=0)
+    last_high_at = db.Column(db.DateTime)
+    previous_high_at = db.Column(db.DateTime)
+    # series -> [n, sum_t, sum_tt, sum_y, sum_ty, last_t, last_y, previous_t, previous_y]
+    series = db.Column(db.JSON)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.reset()
+
+    def reset(self):
+        """Clear the summary (before a rebuild)."""
+        self.assessment_count = 0
+        self.origin = None
+        self.first_completed_at = self.last_completed_at = self.previous_completed_at = None
+        self.last_score = self.previous_score = None
+        self.last_category = None
+        self.high_count = 0
+        self.last_high_at = self.previous_high_at = None
+        self.series = {name: [0, 0.0, 0.0, 0.0, 0.0, None, None, None, None] for name in SERIES}
+        self.stale = False
+
+    @staticmethod
+    def point_values(final_score, stage1, stage2, stage3):
+        return dict(zip(SERIES, (final_score, stage1, stage2, stage3)))
+
+    def add_point(self, completed_at, category, values):
+        """Add one completed assessment (values: series -> value or None)."""
+        if self.origin is None:
+            self.origin = completed_at
+        t = _days(completed_at, self.origin)
+        series = {name: list(acc) for name, acc in self.series.items()}
+        for name, y in values.items():
+            if y is None:
+                continue
+            acc = series[name]
+            acc[0] += 1
+            acc[1] += t
+            acc[2] += t * t
+            acc[3] += y
+            acc[4] += t * y
+            if acc[5] is None or t >= acc[5]:
+                acc[7], acc[8] = acc[5], acc[6]
+                acc[5], acc[6] = t, y
+        self.series = series   # reassign so the JSON column is marked dirty
+
+        self.assessment_count += 1
+        if self.first_completed_at is None or completed_at < self.first_completed_at:
+            self.first_completed_at = completed_at
+        if self.last_completed_at is None or completed_at >= self.last_completed_at:
+            self.previous_completed_at, self.previous_score = self.last_completed_at, self.last_score
+            self.last_completed_at = completed_at
+            self.last_score = values['final']
+            self.last_category = category
+        if category == HIGH_CATEGORY:
+            self.high_count += 1
+            if self.last_high_at is None or completed_at > self.last_high_at:
+                self.previous_high_at, self.last_high_at = self.last_high_at, completed_at
+            elif self.previous_high_at is None or completed_at > self.previous_high_at:
+                self.previous_high_at = completed_at
+
+    def remove_point(self, completed_at, category, values):
+        """Remove a previously added assessment (before it is re-added with new results)."""
+        t = _days(completed_at, self.origin)
+        series = {name: list(acc) for name, acc in self.series.items()}
+        for name, y in values.items():
+            if y is None:
+                continue
+            acc = series[name]
+            acc[0] -= 1
+            acc[1] -= t
+            acc[2] -= t * t
+            acc[3] -= y
+            acc[4] -= t * y
+            if acc[5] == t:
+                acc[5], acc[6], acc[7], acc[8] = acc[7], acc[8], None, None
+            elif acc[7] == t:
+                self.stale = True
+        self.series = series
+
+        self.assessment_count -= 1
+        if self.assessment_count <= 0:
+            origin, stale = self.origin, self.stale
+            self.reset()
+            self.origin, self.stale = origin, stale
+            return
+        if completed_at == self.last_completed_at:
+            # The previous result moves up; the re-added point becomes the latest again
+            self.last_completed_at, self.last_score = self.previous_completed_at, self.previous_score
+            self.last_category = None
+            self.previous_completed_at = self.previous_score = None
+        elif completed_at in (self.previous_completed_at, self.first_completed_at):
+            self.stale = True
+        if category == HIGH_CATEGORY:
+            self.high_count -= 1
+            if completed_at == self.last_high_at:
+                self.last_high_at, self.previous_high_at = self.previous_high_at, None
+            elif completed_at == self.previous_high_at:
+                self.previous_high_at = None
+            if self.last_high_at is None and self.high_count > 0:
+                self.stale = True
+
+    @staticmethod
+    def _slope(acc):
+        """Least-squares slope (per day) of a series, or None with fewer than two distinct times."""
+        n, st, stt, sy, sty = acc[:5]
+        denominator = n * stt - st * st
+        if n < 2 or denominator <= 1e-9 * n * stt:
+            return None
+        return (n * sty - st * sy) / denominator
+
+    def to_dict(self, now=None):
+        """Serialize the trend (rates per 30 days)."""
+        now = now or datetime.utcnow()
+        per_month = lambda rate: None if rate is None else rate * 30
+        stages = {}
+        for name in SERIES:
+            acc = self.series[name]
+            change = None
+            if acc[6] is not None and acc[8] is not None and acc[5] > acc[7]:
+                change = {
+                    'value': acc[6] - acc[8],
+                    'per_30_days': per_month((acc[6] - acc[8]) / (acc[5] - acc[7]))
+                }
+            stages[name] = {
+                'count': acc[0],
+                'latest': acc[6],
+                'previous': acc[8],
+                'mean': acc[3] / acc[0] if acc[0] else None,
+                'change_since_previous': change,
+                'slope_per_30_days': per_month(self._slope(acc))
+            }
+
+        final = stages.pop('final')
+        return {
+            'assessment_count': self.assessment_count,
+            'first_completed_at': self.first_completed_at.isoformat() if self.first_completed_at else None,
+            'last_completed_at': self.last_completed_at.isoformat() if self.last_completed_at else None,
+            'latest_score': self.last_score,
+            'latest_category': self.last_category,
+            'previous_score': self.previous_score,
+            'score_change': (self.last_score - self.previous_score
+                             if self.last_score is not None and self.previous_score is not None else None),
+            'final': final,
+            'stages': stages,
+            'high_risk_count': self.high_count,
+            'last_high_risk_at': self.last_high_at.isoformat() if self.last_high_at else None,
+            'days_since_high_risk': _days(now, self.last_high_at) if self.last_high_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<RiskTrend user={self.user_id} n={self.assessment_count}>'
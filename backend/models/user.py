@@ -3,7 +3,8 @@ User Model
 SQLAlchemy model for user authentication and profile data.
 """
 from datetime import datetime
-from backend.extensions import db, bcrypt
+from backend.extensions import db
+from backend.services.password_hasher import password_hasher
 
 
 class User(db.Model):
@@ -22,12 +23,20 @@ class User(db.Model):
     
     def __init__(self, email, password, full_name=None):
         self.email = email.lower().strip()
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.set_password(password)
         self.full_name = full_name
     
+    def set_password(self, password):
+        """Hash and store a new password (runs on the bcrypt pool)."""
+        self.password_hash = password_hasher.hash(password)
+    
     def check_password(self, password):
         """Verify password against stored hash."""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash uses an outdated bcrypt cost factor."""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Serialize user to dictionary."""
@@ -2,5 +2,7 @@
 from .auth import auth_bp
 from .predict import predict_bp
 from .results import results_bp
+from .admin import admin_bp
+from .jobs import jobs_bp
 
-__all__ = ['auth_bp', 'predict_bp', 'results_bp']
+__all__ = ['auth_bp', 'predict_bp', 'results_bp', 'admin_bp', 'jobs_bp']
@@ -0,0 +1,99 @@
+"""
+Admin Routes
+Operational endpoints: profile downloads behind the profiler token, and
+diagnostics (memory, drift) behind the admin token.
+"""
+import hmac
+import os
+from functools import wraps
+from flask import Blueprint, current_app, request, jsonify, send_file
+from backend.services.drift import drift_monitor
+from backend.services.model_loader import model_loader
+from backend.services.profiler import request_profiler
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+def profiler_token_required(view):
+    """Allow access only with a valid X-Profile token while profiling is enabled."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not request_profiler.enabled:
+            return jsonify({'error': 'Not found'}), 404
+        if not request_profiler.is_authorized(request.headers.get(request_profiler.HEADER)):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def admin_token_required(view):
+    """Allow access only with a valid X-Admin-Token while ADMIN_TOKEN is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': 'Not found'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@profiler_token_required
+def list_profiles():
+    """
+    List stored request profiles grouped by route, newest first.
+    """
+    profiles = request_profiler.list_profiles()
+    return jsonify({
+        'success': True,
+        'sample_rate': request_profiler.sample_rate,
+        'count': sum(len(files) for files in profiles.values()),
+        'profiles': profiles
+    }), 200
+
+
+@admin_bp.route('/profiles/<route>/<filename>', methods=['GET'])
+@profiler_token_required
+def download_profile(route, filename):
+    """
+    Download a pstats file (open with `python -m pstats` or snakeviz).
+    """
+    path = request_profiler.profile_path(route, filename)
+    if not path:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=filename)
+
+
+@admin_bp.route('/memory', methods=['GET'])
+@admin_token_required
+def memory():
+    """
+    Per-stage, per-artifact memory of this worker and, in compact mode,
+    the load-time accuracy check of each stage.
+    """
+    report = model_loader.memory_report()
+    report['rss_bytes'] = _resident_bytes()
+    return jsonify({'success': True, **report}), 200
+
+
+@admin_bp.route('/drift', methods=['GET'])
+@admin_token_required
+def drift():
+    """
+    Input and output drift: live sketches merged across workers, compared
+    with the reference built from the imputers' training matrices.
+    """
+    if not drift_monitor.enabled:
+        return jsonify({'success': False, 'error': 'Drift monitoring is disabled'}), 404
+    return jsonify({'success': True, **drift_monitor.report()}), 200
+
+
+def _resident_bytes():
+    """Current resident set size of this process (None where unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
@@ -11,11 +11,15 @@ from flask_jwt_extended import (
 )
 from backend.extensions import db
 from backend.models import User
+from backend.services.password_hasher import PasswordHasherBusy
+from backend.services.token_revocation import token_revocation
+from backend.services.queries import query_budget
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 
 @auth_bp.route('/register', methods=['POST'])
+@query_budget(2)
 def register():
     """
     Register a new user.
@@ -64,12 +68,16 @@ def register():
             'access_token': access_token
         }), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @auth_bp.route('/login', methods=['POST'])
+@query_budget(1)
 def login():
     """
     Login user and return JWT token.
@@ -98,6 +106,11 @@ def login():
         if not user or not user.check_password(password):
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
+        # Transparently upgrade hashes made with a different cost factor
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        
         # Generate token
         access_token = create_access_token(identity=str(user.id))
         
@@ -108,16 +121,23 @@ def login():
             'access_token': access_token
         }), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @auth_bp.route('/logout', methods=['POST'])
+@query_budget(0)
 @jwt_required()
 def logout():
     """
-    Logout user (client should discard token).
+    Logout user by revoking the current token until it expires.
     """
+    claims = get_jwt()
+    token_revocation.revoke(claims['jti'], claims['exp'])
     return jsonify({
         'success': True,
         'message': 'Logout successful'
@@ -125,6 +145,7 @@ def logout():
 
 
 @auth_bp.route('/me', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_current_user():
     """
@@ -132,7 +153,7 @@ def get_current_user():
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
@@ -0,0 +1,133 @@
+"""
+Job Routes
+Batch uploads scored in the background by the job workers.
+"""
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
+from backend.services.jobs import job_queue, parse_upload, JobError, COMPLETED
+from backend.services.queries import query_budget
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+
+def job_links(job):
+    """Add polling and download URLs to a job dict."""
+    job['status_url'] = f"/api/jobs/{job['id']}"
+    job['results_url'] = f"/api/jobs/{job['id']}/results"
+    return job
+
+
+def read_capped(stream, max_bytes):
+    """Read at most max_bytes; raise RequestEntityTooLarge if the stream holds more."""
+    data = stream.read(max_bytes)
+    if stream.read(1):
+        raise RequestEntityTooLarge()
+    return data
+
+
+@jobs_bp.route('', methods=['POST'])
+@query_budget(0)
+@jwt_required()
+def submit_job():
+    """
+    Upload a batch of patients for background scoring.
+
+    Accepts a multipart upload ("file") or a raw request body: CSV with
+    the request field names as columns (plus an optional patient_id), a
+    JSON list of objects, or JSON lines. Set "triage" (form field or
+    query parameter) to score in early-exit triage mode.
+
+    Returns 202 with the job id and the URLs to poll and download.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+
+        max_bytes = current_app.config.get('JOBS_MAX_UPLOAD_BYTES', 32 << 20)
+        too_large = jsonify({'success': False, 'error': f'Upload exceeds {max_bytes} bytes'}), 413
+        if request.content_length and request.content_length > max_bytes:
+            return too_large
+
+        # Chunked uploads have no Content-Length, so the read itself is capped
+        try:
+            upload = request.files.get('file')
+            if upload is not None:
+                filename, data = upload.filename or '', read_capped(upload, max_bytes)
+            else:
+                filename = 'upload.csv' if request.mimetype == 'text/csv' else ''
+                data = read_capped(request.stream, max_bytes)
+        except RequestEntityTooLarge:
+            return too_large
+        if not data:
+            return jsonify({'success': False, 'error': 'No file provided'}), 400
+
+        triage = (request.form.get('triage') or request.args.get('triage') or '').lower() in ('1', 'true', 'yes')
+        records = parse_upload(data, filename)
+        job = job_queue.submit(user_id, records, filename=filename or None, triage=triage)
+        return jsonify({'success': True, 'job': job_links(job)}), 202
+
+    except (JobError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@jobs_bp.route('', methods=['GET'])
+@query_budget(0)
+@jwt_required()
+def list_jobs():
+    """
+    List the current user's recent jobs.
+    """
+    user_id = int(get_jwt_identity())
+    jobs = [job_links(job) for job in job_queue.list(user_id)]
+    return jsonify({'success': True, 'count': len(jobs), 'jobs': jobs}), 200
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@query_budget(0)
+@jwt_required()
+def get_job(job_id):
+    """
+    Job status and progress (processed_rows / total_rows).
+    """
+    job = job_queue.get(job_id, int(get_jwt_identity()))
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_links(job)}), 200
+
+
+@jobs_bp.route('/<job_id>', methods=['DELETE'])
+@query_budget(0)
+@jwt_required()
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job.
+    """
+    user_id = int(get_jwt_identity())
+    if not job_queue.cancel(job_id, user_id):
+        job = job_queue.get(job_id, user_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': False, 'error': f"Job is already {job['status']}"}), 409
+    return jsonify({'success': True, 'job': job_links(job_queue.get(job_id, user_id))}), 200
+
+
+@jobs_bp.route('/<job_id>/results', methods=['GET'])
+@query_budget(0)
+@jwt_required()
+def job_results(job_id):
+    """
+    Stream a completed job's results as CSV, one stored chunk at a time.
+    """
+    job = job_queue.get(job_id, int(get_jwt_identity()))
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] != COMPLETED:
+        return jsonify({'success': False, 'error': f"Job is {job['status']}", 'job': job_links(job)}), 409
+
+    return Response(
+        stream_with_context(job_queue.iter_results(job_id)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="mirai_job_{job_id}.csv"'}
+    )
@@ -6,13 +6,67 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.extensions import db
 from backend.models import Assessment
-from backend.services import InferenceService, RiskEngine
+from backend.services import RiskEngine
+from backend.services.cascade import cascade_pipeline
+from backend.services.idempotency import idempotent
+from backend.services.journal import (
+    prediction_journal, SOURCE_STAGE1, SOURCE_STAGE2, SOURCE_STAGE3, SOURCE_FULL,
+    COMPUTED_STAGE1, COMPUTED_STAGE2, COMPUTED_STAGE3, COMPUTED_FINAL
+)
+from backend.services.metrics import span
+from backend.services.rescoring import assessment_scorer
+from backend.services.surrogate import surrogate_models
+from backend.services.queries import query_budget
 
 predict_bp = Blueprint('predict', __name__, url_prefix='/api/predict')
 
 
+def add_downstream(result, outcome, stage):
+    """Attach downstream stages (and final result) that an edit re-scored."""
+    downstream = [s for s in outcome['rescored'] if s > stage]
+    if downstream:
+        result['rescored_stages'] = downstream
+        for s in downstream:
+            result[f'stage{s}'] = outcome['results'][s]
+    if outcome['final_assessment'] and 'final_assessment' not in result:
+        result['final_assessment'] = outcome['final_assessment']
+    if outcome['fallback'] and 'fallback' not in result:
+        result['fallback'] = surrogate_models.flag(outcome['fallback'])
+    return result
+
+
+FLAG_VALUES = {'1': True, 'true': True, 'yes': True, '0': False, 'false': False, 'no': False}
+
+
+def parse_flag(value):
+    """
+    A request flag: a JSON boolean or null, or one of the FLAG_VALUES
+    spellings as a string or 0/1. Raises ValueError on anything else, so a
+    typo is rejected rather than read as False.
+    """
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, (int, str)):
+        flag = FLAG_VALUES.get(str(value).strip().lower())
+        if flag is not None:
+            return flag
+    raise ValueError(f'Invalid flag value: {value!r}')
+
+
+def journal_outcome(source, assessment, outcome):
+    """Journal what a stage request (re)computed."""
+    computed = sum((COMPUTED_STAGE1, COMPUTED_STAGE2, COMPUTED_STAGE3)[s - 1] for s in outcome['rescored'])
+    if outcome['final_assessment']:
+        computed |= COMPUTED_FINAL
+    prediction_journal.record_assessment(source, assessment, computed,
+                                         provisional=bool(outcome['final_assessment'] and assessment.provisional_stage),
+                                         fallback=bool(outcome['fallback']))
+
+
 @predict_bp.route('/stage1', methods=['POST'])
+@query_budget(4)
 @jwt_required()
+@idempotent
 def predict_stage1():
     """
     Stage 1: Clinical Screening
@@ -27,24 +81,28 @@ def predict_stage1():
             "ecogTotal": 2.0,
             "assessment_id": 123 (optional, to continue existing assessment)
         }
+    
+    Editing an existing assessment re-scores only what the change affects:
+    Stage 2, Stage 3 and the final result are recomputed if they were
+    completed and are listed in rescored_stages.
+    
+    Results scored by the distilled fallback models (primary models
+    unavailable, or shedding load) carry a "fallback" object and an
+    X-Model-Fallback header; this applies to every prediction endpoint.
     """
     try:
         user_id = int(get_jwt_identity())
-        data = request.get_json()
+        with span('json_parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Run inference
-        result = InferenceService.predict_stage1(data)
-        
-        if not result['success']:
-            return jsonify(result), 500
-        
         # Create or update assessment
         assessment_id = data.get('assessment_id')
         if assessment_id:
-            assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
+            with span('db_query'):
+                assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
         else:
             assessment = None
         
@@ -52,15 +110,17 @@ def predict_stage1():
             assessment = Assessment(user_id=user_id)
             db.session.add(assessment)
         
-        # Update Stage 1 data
-        assessment.update_stage1(
-            data=data,
-            probability=result['probability'],
-            risk_level=result['risk_level']
-        )
-        db.session.commit()
+        # Score Stage 1 and whatever depends on a changed answer, in one transaction
+        outcome = assessment_scorer.apply(assessment, 1, data, fallback=surrogate_models.fallback_reason())
+        if not outcome['success']:
+            db.session.rollback()
+            return jsonify(outcome), 500
+        with span('db_commit'):
+            db.session.commit()
+        journal_outcome(SOURCE_STAGE1, assessment, outcome)
         
         # Add assessment ID to result
+        result = add_downstream(outcome['results'][1], outcome, 1)
         result['assessment_id'] = assessment.id
         result['message'] = 'Stage 1 complete. Proceed to Stage 2 for genetic analysis.'
         
@@ -72,7 +132,9 @@ def predict_stage1():
 
 
 @predict_bp.route('/stage2', methods=['POST'])
+@query_budget(4)
 @jwt_required()
+@idempotent
 def predict_stage2():
     """
     Stage 2: Genetic Stratification
@@ -85,7 +147,8 @@ def predict_stage2():
     """
     try:
         user_id = int(get_jwt_identity())
-        data = request.get_json()
+        with span('json_parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
@@ -95,29 +158,25 @@ def predict_stage2():
         if not assessment_id:
             return jsonify({'success': False, 'error': 'assessment_id is required'}), 400
         
-        assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
+        with span('db_query'):
+            assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
         if not assessment:
             return jsonify({'success': False, 'error': 'Assessment not found'}), 404
         
         if not assessment.stage1_completed:
             return jsonify({'success': False, 'error': 'Stage 1 must be completed first'}), 400
         
-        # Run inference with Stage 1 probability
-        result = InferenceService.predict_stage2(data, assessment.stage1_probability)
-        
-        if not result['success']:
-            return jsonify(result), 500
-        
-        # Update Stage 2 data
-        assessment.update_stage2(
-            data=data,
-            probability=result['probability'],
-            risk_level=result['risk_level'],
-            apoe4_count=result['apoe4_count']
-        )
-        db.session.commit()
+        # Score Stage 2 (and Stage 3 / final if already completed) in one transaction
+        outcome = assessment_scorer.apply(assessment, 2, data, fallback=surrogate_models.fallback_reason())
+        if not outcome['success']:
+            db.session.rollback()
+            return jsonify(outcome), 500
+        with span('db_commit'):
+            db.session.commit()
+        journal_outcome(SOURCE_STAGE2, assessment, outcome)
         
         # Add context to result
+        result = add_downstream(outcome['results'][2], outcome, 2)
         result['assessment_id'] = assessment.id
         result['stage1_probability'] = assessment.stage1_probability
         result['message'] = 'Stage 2 complete. Proceed to Stage 3 for biomarker analysis.'
@@ -130,7 +189,9 @@ def predict_stage2():
 
 
 @predict_bp.route('/stage3', methods=['POST'])
+@query_budget(4)
 @jwt_required()
+@idempotent
 def predict_stage3():
     """
     Stage 3: Biomarker Analysis
@@ -146,7 +207,8 @@ def predict_stage3():
     """
     try:
         user_id = int(get_jwt_identity())
-        data = request.get_json()
+        with span('json_parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
@@ -156,42 +218,34 @@ def predict_stage3():
         if not assessment_id:
             return jsonify({'success': False, 'error': 'assessment_id is required'}), 400
         
-        assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
+        with span('db_query'):
+            assessment = Assessment.query.filter_by(id=assessment_id, user_id=user_id).first()
         if not assessment:
             return jsonify({'success': False, 'error': 'Assessment not found'}), 404
         
         if not assessment.stage2_completed:
             return jsonify({'success': False, 'error': 'Stage 2 must be completed first'}), 400
         
-        # Run inference with Stage 2 probability
-        result = InferenceService.predict_stage3(data, assessment.stage2_probability)
-        
-        if not result['success']:
-            return jsonify(result), 500
-        
-        # Update Stage 3 data
-        assessment.update_stage3(
-            data=data,
-            probability=result['probability'],
-            risk_level=result['risk_level']
-        )
-        
-        # Calculate final risk using Risk Engine
-        final_assessment = RiskEngine.generate_full_assessment(
-            assessment.stage1_probability,
-            assessment.stage2_probability,
-            result['probability']
-        )
-        
-        # Update final results
-        assessment.update_final_results(
-            final_score=final_assessment['final_risk_probability'],
-            category=final_assessment['risk_category'],
-            recommendation=final_assessment['escalation_recommendation']
-        )
-        db.session.commit()
+        # Score Stage 3 and the final result (skipped if nothing changed)
+        outcome = assessment_scorer.apply(assessment, 3, data, fallback=surrogate_models.fallback_reason())
+        if not outcome['success']:
+            db.session.rollback()
+            return jsonify(outcome), 500
+        with span('db_commit'):
+            db.session.commit()
+        journal_outcome(SOURCE_STAGE3, assessment, outcome)
+        
+        final_assessment = outcome['final_assessment']
+        if final_assessment is None:
+            # Unchanged resubmission: rebuild the report from the stored probabilities
+            final_assessment = RiskEngine.generate_full_assessment(
+                assessment.stage1_probability,
+                assessment.stage2_probability,
+                assessment.stage3_probability
+            )
         
         # Combine results
+        result = outcome['results'][3]
         result['assessment_id'] = assessment.id
         result['final_assessment'] = final_assessment
         result['message'] = 'Assessment complete. View your full risk report.'
@@ -204,7 +258,9 @@ def predict_stage3():
 
 
 @predict_bp.route('/full', methods=['POST'])
+@query_budget(3)
 @jwt_required()
+@idempotent
 def predict_full():
     """
     Run all 3 stages in one request.
@@ -221,60 +277,79 @@ def predict_full():
             "ptau217": 0.5,
             "ab42": 15.2,
             "ab40": 180.5,
-            "nfl": 22.0
+            "nfl": 22.0,
+            "triage": false
         }
+    
+    With "triage": true the cascade stops early once Stage 1 or Stage 2 is
+    confident; skipped stages are null, stay incomplete on the assessment,
+    and the final assessment is marked provisional. The assessment stays
+    open (no completed_at) and later stage submissions refit its
+    provisional final until all three stages are complete.
     """
     try:
         user_id = int(get_jwt_identity())
-        data = request.get_json()
+        with span('json_parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        # Stage 1
-        stage1_result = InferenceService.predict_stage1(data)
-        if not stage1_result['success']:
-            return jsonify(stage1_result), 500
-        
-        # Stage 2
-        stage2_result = InferenceService.predict_stage2(data, stage1_result['probability'])
-        if not stage2_result['success']:
-            return jsonify(stage2_result), 500
-        
-        # Stage 3
-        stage3_result = InferenceService.predict_stage3(data, stage2_result['probability'])
-        if not stage3_result['success']:
-            return jsonify(stage3_result), 500
-        
-        # Final Assessment
-        final_assessment = RiskEngine.generate_full_assessment(
-            stage1_result['probability'],
-            stage2_result['probability'],
-            stage3_result['probability']
-        )
+        try:
+            triage = parse_flag(data.get('triage'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'triage must be true or false'}), 400
+        
+        # All 3 stages and the final assessment in one fused pass
+        fallback = surrogate_models.fallback_reason()
+        cascade = cascade_pipeline.run(data, triage=triage, fallback=fallback)
+        if not cascade['success']:
+            return jsonify(cascade), 500
+        
+        stage1_result = cascade['stage1']
+        stage2_result = cascade['stage2']
+        stage3_result = cascade['stage3']
+        final_assessment = cascade['final_assessment']
         
         # Create and save assessment
         assessment = Assessment(user_id=user_id)
         db.session.add(assessment)
         
         assessment.update_stage1(data, stage1_result['probability'], stage1_result['risk_level'])
-        assessment.update_stage2(data, stage2_result['probability'], stage2_result['risk_level'], stage2_result['apoe4_count'])
-        assessment.update_stage3(data, stage3_result['probability'], stage3_result['risk_level'])
+        if stage2_result:
+            assessment.update_stage2(data, stage2_result['probability'], stage2_result['risk_level'], stage2_result['apoe4_count'])
+        if stage3_result:
+            assessment.update_stage3(data, stage3_result['probability'], stage3_result['risk_level'])
         assessment.update_final_results(
             final_assessment['final_risk_probability'],
             final_assessment['risk_category'],
-            final_assessment['escalation_recommendation']
+            final_assessment['escalation_recommendation'],
+            provisional_stage=final_assessment.get('early_exit_stage')
+        )
+        assessment_scorer.tag(assessment, data, fallback)
+        with span('db_commit'):
+            db.session.commit()
+        prediction_journal.record_assessment(
+            SOURCE_FULL, assessment,
+            COMPUTED_STAGE1 | (COMPUTED_STAGE2 if stage2_result else 0) |
+            (COMPUTED_STAGE3 if stage3_result else 0) | COMPUTED_FINAL,
+            provisional=final_assessment.get('provisional', False),
+            fallback=bool(fallback)
         )
-        db.session.commit()
         
-        return jsonify({
+        response = {
             'success': True,
             'assessment_id': assessment.id,
             'stage1': stage1_result,
             'stage2': stage2_result,
             'stage3': stage3_result,
             'final_assessment': final_assessment
-        }), 200
+        }
+        if 'triage' in cascade:
+            response['triage'] = cascade['triage']
+        if 'fallback' in cascade:
+            response['fallback'] = cascade['fallback']
+        return jsonify(response), 200
         
     except Exception as e:
         db.session.rollback()
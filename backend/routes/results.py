@@ -2,18 +2,23 @@
 Results Routes
 Endpoints for retrieving user assessment history.
 """
+from datetime import datetime
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.models import Assessment
+from backend.services.archive import assessment_archive
+from backend.services.trends import risk_trends
+from backend.services.queries import query_budget
 
 results_bp = Blueprint('results', __name__, url_prefix='/api/results')
 
 
 @results_bp.route('', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_all_results():
     """
-    Get all assessments for the current user.
+    Get all assessments for the current user (hot table and archive).
     """
     try:
         user_id = int(get_jwt_identity())
@@ -22,6 +27,16 @@ def get_all_results():
             Assessment.created_at.desc()
         ).all()
         
+        # Merge archived history; the hot copy wins if a row exists in both
+        hot_ids = {a.id for a in assessments}
+        archived = [a for a in assessment_archive.get_user_assessments(user_id) if a.id not in hot_ids]
+        if archived:
+            assessments = sorted(
+                assessments + archived,
+                key=lambda a: a.created_at or datetime.min,
+                reverse=True
+            )
+        
         return jsonify({
             'success': True,
             'count': len(assessments),
@@ -33,6 +48,7 @@ def get_all_results():
 
 
 @results_bp.route('/<int:assessment_id>', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_result(assessment_id):
     """
@@ -46,6 +62,9 @@ def get_result(assessment_id):
             user_id=user_id
         ).first()
         
+        if not assessment:
+            assessment = assessment_archive.get_assessment(assessment_id, user_id)
+        
         if not assessment:
             return jsonify({'success': False, 'error': 'Assessment not found'}), 404
         
@@ -59,6 +78,7 @@ def get_result(assessment_id):
 
 
 @results_bp.route('/latest', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_latest_result():
     """
@@ -71,6 +91,10 @@ def get_latest_result():
             Assessment.completed_at.isnot(None)
         ).order_by(Assessment.completed_at.desc()).first()
         
+        # Only archived (older) results exist when the hot table has none
+        if not assessment:
+            assessment = assessment_archive.get_latest_completed(user_id)
+        
         if not assessment:
             return jsonify({'success': False, 'error': 'No completed assessments found'}), 404
         
@@ -83,7 +107,30 @@ def get_latest_result():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@results_bp.route('/trend', methods=['GET'])
+@query_budget(3)
+@jwt_required()
+def get_trend():
+    """
+    Get the user's longitudinal risk trend (maintained as assessments
+    complete, so no history is read).
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        
+        trend = risk_trends.get(user_id)
+        
+        return jsonify({
+            'success': True,
+            'trend': trend.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @results_bp.route('/in-progress', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_in_progress():
     """
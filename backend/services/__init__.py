@@ -1,6 +1,11 @@
 """Services package."""
-from .model_loader import ModelLoader
+from .model_loader import ModelLoader, ArtifactSet
 from .inference import InferenceService
 from .risk_engine import RiskEngine
+from .archive import AssessmentArchive, assessment_archive
+from .cascade import CascadePipeline, cascade_pipeline
 
-__all__ = ['ModelLoader', 'InferenceService', 'RiskEngine']
+__all__ = [
+    'ModelLoader', 'ArtifactSet', 'InferenceService', 'RiskEngine', 'AssessmentArchive', 'assessment_archive',
+    'CascadePipeline', 'cascade_pipeline'
+]
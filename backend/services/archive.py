@@ -0,0 +1,254 @@
+"""
+Assessment Archive Service
+Moves old completed assessments out of the hot table into a compressed,
+month-partitioned archive database and reads them back transparently.
+"""
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+
+
+# Assessment columns stored in the archive (order defines the block layout)
+ARCHIVE_COLUMNS = [
+    'id', 'user_id',
+    'age', 'gender', 'education', 'faq_score', 'ecog_mem', 'ecog_total',
+    'stage1_probability', 'stage1_risk', 'stage1_completed',
+    'apoe_genotype', 'apoe4_count', 'stage2_probability', 'stage2_risk', 'stage2_completed',
+    'ptau217', 'ab42', 'ab40', 'nfl', 'stage3_probability', 'stage3_risk', 'stage3_completed',
+    'final_risk_score', 'final_risk_category', 'escalation_recommendation',
+    'created_at', 'completed_at',
+    'stage1_hash', 'stage2_hash', 'stage3_hash', 'final_hash'
+]
+DATETIME_COLUMNS = ('created_at', 'completed_at')
+
+
+class AssessmentArchive:
+    """
+    Cold storage for completed assessments.
+
+    Rows are grouped into one block per (user, month of creation). Each block
+    is stored column-oriented (one list per column) and zlib-compressed, so a
+    user's history in a month is a single read and repeated values such as
+    risk labels and recommendations compress well.
+    """
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS partitions (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            PRIMARY KEY (user_id, month)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS archived_ids (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL
+        )
+        """,
+    )
+
+    def __init__(self, path=None, archive_after_days=180, batch_size=500):
+        self.path = path
+        self.archive_after_days = archive_after_days
+        self.batch_size = batch_size
+
+    def init_app(self, app):
+        """Configure archive location and policy from the Flask config."""
+        self.path = app.config.get('ARCHIVE_DATABASE_PATH', self.path)
+        self.archive_after_days = app.config.get('ARCHIVE_AFTER_DAYS', self.archive_after_days)
+        self.batch_size = app.config.get('ARCHIVE_BATCH_SIZE', self.batch_size)
+
+    def is_enabled(self):
+        """Archive is usable only when a path is configured."""
+        return bool(self.path)
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    # ------------------------------------------------------------------
+    # Block encoding
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _encode_block(rows):
+        """Encode a list of row dicts as a compressed column-oriented block."""
+        columns = {name: [] for name in ARCHIVE_COLUMNS}
+        for row in rows:
+            for name in ARCHIVE_COLUMNS:
+                value = row.get(name)
+                if name in DATETIME_COLUMNS and value is not None:
+                    value = value.isoformat()
+                columns[name].append(value)
+        raw = json.dumps(columns, separators=(',', ':')).encode('utf-8')
+        return zlib.compress(raw, 9)
+
+    @staticmethod
+    def _decode_block(payload):
+        """Decode a compressed block back into a list of row dicts."""
+        columns = json.loads(zlib.decompress(payload).decode('utf-8'))
+        count = len(columns['id'])
+        rows = []
+        for i in range(count):
+            row = {name: columns.get(name, [None] * count)[i] for name in ARCHIVE_COLUMNS}
+            for name in DATETIME_COLUMNS:
+                if row[name] is not None:
+                    row[name] = datetime.fromisoformat(row[name])
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _to_assessment(row):
+        """Build a detached Assessment so archived rows serialize like hot rows."""
+        from backend.models import Assessment
+        return Assessment(**row)
+
+    # ------------------------------------------------------------------
+    # Archival
+    # ------------------------------------------------------------------
+    def archive_completed(self, older_than_days=None):
+        """
+        Move completed assessments older than the cutoff into the archive.
+
+        Rows are written to the archive and committed there before they are
+        deleted from the hot table; readers de-duplicate by id, so a crash
+        between the two steps never loses or doubles a result. The row with
+        the highest id always stays hot so SQLite never reuses an archived id.
+
+        Returns:
+            Number of assessments moved
+        """
+        from backend.extensions import db
+        from backend.models import Assessment
+
+        if not self.is_enabled():
+            return 0
+
+        days = self.archive_after_days if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        max_id = db.session.query(db.func.max(Assessment.id)).scalar()
+        if max_id is None:
+            return 0
+        moved = 0
+
+        while True:
+            batch = Assessment.query.filter(
+                Assessment.completed_at.isnot(None),
+                Assessment.completed_at < cutoff,
+                Assessment.id < max_id
+            ).order_by(Assessment.id).limit(self.batch_size).all()
+            if not batch:
+                break
+
+            rows = [{name: getattr(a, name) for name in ARCHIVE_COLUMNS} for a in batch]
+            self._write_rows(rows)
+
+            Assessment.query.filter(
+                Assessment.id.in_([row['id'] for row in rows])
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            moved += len(rows)
+
+        return moved
+
+    def _write_rows(self, rows):
+        """Merge rows into their (user, month) blocks in a single transaction."""
+        groups = {}
+        for row in rows:
+            created = row['created_at'] or row['completed_at']
+            month = created.strftime('%Y-%m')
+            groups.setdefault((row['user_id'], month), []).append(row)
+
+        conn = self._connect()
+        try:
+            with conn:
+                for (user_id, month), new_rows in groups.items():
+                    existing = conn.execute(
+                        'SELECT payload FROM partitions WHERE user_id = ? AND month = ?',
+                        (user_id, month)
+                    ).fetchone()
+                    merged = self._decode_block(existing[0]) if existing else []
+                    new_ids = {row['id'] for row in new_rows}
+                    merged = [row for row in merged if row['id'] not in new_ids] + new_rows
+                    merged.sort(key=lambda r: r['id'])
+
+                    conn.execute(
+                        'INSERT OR REPLACE INTO partitions (user_id, month, row_count, payload) '
+                        'VALUES (?, ?, ?, ?)',
+                        (user_id, month, len(merged), self._encode_block(merged))
+                    )
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO archived_ids (id, user_id, month) VALUES (?, ?, ?)',
+                        [(row['id'], user_id, month) for row in new_rows]
+                    )
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get_user_assessments(self, user_id):
+        """Return all archived assessments for a user, newest first."""
+        if not self.is_enabled() or not os.path.exists(self.path):
+            return []
+
+        conn = self._connect()
+        try:
+            blocks = conn.execute(
+                'SELECT payload FROM partitions WHERE user_id = ? ORDER BY month DESC',
+                (user_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        rows = []
+        for (payload,) in blocks:
+            rows.extend(self._decode_block(payload))
+        rows.sort(key=lambda r: r['created_at'] or datetime.min, reverse=True)
+        return [self._to_assessment(row) for row in rows]
+
+    def get_assessment(self, assessment_id, user_id):
+        """Return a single archived assessment owned by the user, or None."""
+        if not self.is_enabled() or not os.path.exists(self.path):
+            return None
+
+        conn = self._connect()
+        try:
+            located = conn.execute(
+                'SELECT month FROM archived_ids WHERE id = ? AND user_id = ?',
+                (assessment_id, user_id)
+            ).fetchone()
+            if not located:
+                return None
+            block = conn.execute(
+                'SELECT payload FROM partitions WHERE user_id = ? AND month = ?',
+                (user_id, located[0])
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if not block:
+            return None
+        for row in self._decode_block(block[0]):
+            if row['id'] == assessment_id:
+                return self._to_assessment(row)
+        return None
+
+    def get_latest_completed(self, user_id):
+        """Return the most recently completed archived assessment, or None."""
+        completed = [a for a in self.get_user_assessments(user_id) if a.completed_at]
+        if not completed:
+            return None
+        return max(completed, key=lambda a: a.completed_at)
+
+
+# Global singleton instance
+assessment_archive = AssessmentArchive()
@@ -0,0 +1,432 @@
+"""
+Cascade Pipeline
+Single-pass, fused evaluation of all three stages plus risk fusion. Used by
+/api/predict/full and for batch scoring, optionally in early-exit triage
+mode.
+"""
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+
+from .inference import InferenceService
+from .drift import drift_monitor
+from .journal import prediction_journal
+from .metrics import metrics, span
+from .model_loader import model_loader
+from .risk_engine import RiskEngine
+from .surrogate import surrogate_models
+
+
+# Column layout of the shared per-row buffer
+STAGE1_COLUMNS = slice(0, 6)    # AGE, PTGENDER, PTEDUCAT, FAQ, EcogPtMem, EcogPtTotal
+STAGE2_COLUMNS = slice(6, 8)    # Stage1_Prob, APOE4_Count
+STAGE3_COLUMNS = slice(8, 13)   # Stage2_Prob, pT217_F, AB42_F, AB40_F, NfL_Q
+STAGE1_PROB_COLUMN = 6
+APOE4_COLUMN = 7
+STAGE2_PROB_COLUMN = 8
+BUFFER_WIDTH = 13
+
+# Buffer column of each request field, for marking omitted ones as missing
+OBSERVED_FIELDS = (
+    (0, 'age'), (1, 'gender'), (2, 'education'), (3, 'faq'), (4, 'ecogMem'), (5, 'ecogTotal'),
+    (APOE4_COLUMN, 'genotype'), (9, 'ptau217'), (10, 'ab42'), (11, 'ab40'), (12, 'nfl')
+)
+
+# Default triage bands: a stage's result is confident outside [low, high]
+DEFAULT_TRIAGE_BANDS = {1: (0.10, 0.90), 2: (0.10, 0.90)}
+
+
+class CompiledStage:
+    """
+    Inference-only view of one stage's imputer, scaler and booster.
+
+    Work that the sklearn/xgboost wrappers redo on every call is done once
+    here: scaler statistics are pulled out as arrays, the imputer is skipped
+    for rows without missing values when it provably returns them unchanged,
+    and the booster is called through inplace_predict.
+    """
+
+    def __init__(self, imputer, scaler, model):
+        self.imputer = imputer
+        self.scaler = scaler
+        self.identity_impute = self._imputer_is_identity(imputer)
+
+        n_features = getattr(scaler, 'n_features_in_', None)
+        mean = getattr(scaler, 'mean_', None) if getattr(scaler, 'with_mean', False) else None
+        scale = getattr(scaler, 'scale_', None) if getattr(scaler, 'with_std', False) else None
+        if n_features is not None and hasattr(scaler, 'with_mean'):
+            self.mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+            self.scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        else:
+            self.mean = self.scale = None
+
+        self.booster = model.get_booster()
+        self.missing = getattr(model, 'missing', np.nan)
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except (AttributeError, TypeError):
+            self.iteration_range = (0, 0)
+
+    @staticmethod
+    def _imputer_is_identity(imputer):
+        """True if transform() returns complete rows unchanged (no dropped or added columns)."""
+        if getattr(imputer, 'add_indicator', False):
+            # Missing-indicator columns are appended even for complete rows
+            return False
+        valid_mask = getattr(imputer, '_valid_mask', None)           # KNNImputer
+        if valid_mask is not None:
+            return bool(np.all(valid_mask))
+        statistics = getattr(imputer, 'statistics_', None)           # SimpleImputer
+        if statistics is not None:
+            return not np.isnan(np.asarray(statistics, dtype=np.float64)).any()
+        return False
+
+    def predict(self, X):
+        """Return positive-class probabilities for the rows of X."""
+        with span('impute'):
+            if not self.identity_impute or np.isnan(X).any():
+                X = self.imputer.transform(X)
+        with span('scale'):
+            if self.mean is not None:
+                X = (X - self.mean) / self.scale
+            else:
+                X = self.scaler.transform(X)
+        with span('booster'):
+            proba = self.booster.inplace_predict(
+                X, iteration_range=self.iteration_range, missing=self.missing
+            )
+        return proba[:, 1] if proba.ndim == 2 else proba
+
+
+class CascadePipeline:
+    """
+    Runs Stage 1 -> Stage 2 -> Stage 3 -> RiskEngine in one pass.
+
+    Every stage's inputs live in one preallocated (n, 13) buffer; each
+    stage's probability is written straight into the next stage's column.
+    Outputs match InferenceService.predict_stage1/2/3 and
+    RiskEngine.generate_full_assessment.
+
+    In triage mode the cascade stops after Stage 1 or Stage 2 once that
+    stage's probability falls outside its confidence band, and reports a
+    provisional RiskEngine assessment from the stages that did run.
+    """
+
+    def __init__(self, loader=None):
+        self.loader = loader or model_loader
+        self.triage_bands = dict(DEFAULT_TRIAGE_BANDS)
+        self._stages = None
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read and validate the triage confidence bands (0 <= low < high <= 1)."""
+        bands = {}
+        for stage in (1, 2):
+            key = f'TRIAGE_STAGE{stage}_BAND'
+            band = tuple(app.config.get(key, DEFAULT_TRIAGE_BANDS[stage]))
+            if len(band) != 2 or not 0 <= band[0] < band[1] <= 1:
+                raise ValueError(f'{key} must be "low,high" with 0 <= low < high <= 1, got {band}')
+            bands[stage] = band
+        self.triage_bands = bands
+
+    def confident(self, stage, probability):
+        """True where a stage's probability lies outside its band (scalars or arrays)."""
+        low, high = self.triage_bands[stage]
+        return (probability < low) | (probability > high)
+
+    @staticmethod
+    def record_triage(exit_stages):
+        """Count rows per exit stage and the stage evaluations they skipped."""
+        counts = np.bincount(np.asarray(exit_stages, dtype=np.int64), minlength=4)
+        for stage in (1, 2, 3):
+            if counts[stage]:
+                metrics.increment('triage_rows', int(counts[stage]), exit_stage=stage)
+        skipped = {2: int(counts[1]), 3: int(counts[1] + counts[2])}
+        for stage, count in skipped.items():
+            if count:
+                metrics.increment('triage_skipped_stages', count, stage=stage)
+        return {
+            'rows': int(counts[1:].sum()),
+            'exit_after_stage1': int(counts[1]),
+            'exit_after_stage2': int(counts[2]),
+            'completed': int(counts[3]),
+            'stage2_skipped': skipped[2],
+            'stage3_skipped': skipped[3]
+        }
+
+    def stages(self):
+        """Compiled stages, rebuilt whenever the loader reloads artifacts."""
+        if self._stages is None or self._generation != self.loader.generation:
+            with self._lock:
+                self.loader.load_all()
+                if self._stages is None or self._generation != self.loader.generation:
+                    self._stages = [
+                        CompiledStage(
+                            self.loader.get_imputer(stage),
+                            self.loader.get_scaler(stage),
+                            self.loader.get_model(stage)
+                        )
+                        for stage in (1, 2, 3)
+                    ]
+                    self._generation = self.loader.generation
+        return self._stages
+
+    # ------------------------------------------------------------------
+    # Buffer construction
+    # ------------------------------------------------------------------
+    @staticmethod
+    def fill_stage1(buffer, row, data):
+        f1 = InferenceService.build_stage1_features(data)
+        buffer[row, 0] = f1['AGE']
+        buffer[row, 1] = f1['PTGENDER']
+        buffer[row, 2] = f1['PTEDUCAT']
+        buffer[row, 3] = f1['FAQ']
+        buffer[row, 4] = f1['EcogPtMem']
+        buffer[row, 5] = f1['EcogPtTotal']
+
+    @staticmethod
+    def fill_stage2(buffer, row, data):
+        buffer[row, APOE4_COLUMN] = InferenceService.count_apoe4(data.get('genotype', ''))
+
+    @staticmethod
+    def fill_stage3(buffer, row, data):
+        buffer[row, 9] = float(data.get('ptau217') or 0)
+        buffer[row, 10] = float(data.get('ab42') or 0)
+        buffer[row, 11] = float(data.get('ab40') or 0)
+        buffer[row, 12] = float(data.get('nfl') or 0)
+
+    @classmethod
+    def fill_row(cls, buffer, row, data):
+        """Write one request's stage inputs into buffer[row] (probabilities filled later)."""
+        cls.fill_stage1(buffer, row, data)
+        cls.fill_stage2(buffer, row, data)
+        cls.fill_stage3(buffer, row, data)
+
+    @classmethod
+    def build_buffer(cls, records):
+        """Build the (n, 13) input buffer for a list of request dicts."""
+        buffer = np.empty((len(records), BUFFER_WIDTH), dtype=np.float64)
+        for row, data in enumerate(records):
+            cls.fill_row(buffer, row, data)
+        return buffer
+
+    @staticmethod
+    def build_observed(records, buffer):
+        """
+        The drift monitor's copy of a filled buffer: NaN wherever a request
+        omitted the field, instead of the default the buffer holds. None
+        when drift is not being recorded on this thread.
+        """
+        if not drift_monitor.active():
+            return None
+        observed = buffer.copy()
+        for column, field in OBSERVED_FIELDS:
+            missing = np.fromiter((data.get(field) in (None, '') for data in records), dtype=bool, count=len(records))
+            observed[missing, column] = np.nan
+        return observed
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def score_buffer(self, buffer, triage=False, observed=None):
+        """
+        Score a filled buffer in place through all three stages.
+
+        In triage mode only rows still inside a stage's confidence band go
+        on to the next stage; skipped probabilities are NaN. The drift
+        monitor records `observed` (the rows' inputs as given, from
+        build_observed) when passed, otherwise the buffer itself.
+
+        Returns:
+            (p1, p2, p3, exit_stage) arrays
+        """
+        stage1, stage2, stage3 = self.stages()
+        n = buffer.shape[0]
+        p2 = np.full(n, np.nan)
+        p3 = np.full(n, np.nan)
+        exit_stage = np.full(n, 3, dtype=np.int8)
+        if observed is None:
+            observed = buffer
+
+        p1 = stage1.predict(buffer[:, STAGE1_COLUMNS]).astype(np.float64)
+        drift_monitor.observe_batch(1, observed[:, STAGE1_COLUMNS], p1)
+        buffer[:, STAGE1_PROB_COLUMN] = p1
+        observed[:, STAGE1_PROB_COLUMN] = p1
+        rows = np.arange(n)
+        if triage:
+            done = self.confident(1, p1)
+            exit_stage[done] = 1
+            rows = rows[~done]
+
+        if len(rows):
+            p2[rows] = stage2.predict(buffer[rows, STAGE2_COLUMNS]).astype(np.float64)
+            drift_monitor.observe_batch(2, observed[rows, STAGE2_COLUMNS], p2[rows])
+            buffer[rows, STAGE2_PROB_COLUMN] = p2[rows]
+            observed[rows, STAGE2_PROB_COLUMN] = p2[rows]
+            if triage:
+                done = self.confident(2, p2[rows])
+                exit_stage[rows[done]] = 2
+                rows = rows[~done]
+
+        if len(rows):
+            p3[rows] = stage3.predict(buffer[rows, STAGE3_COLUMNS]).astype(np.float64)
+            drift_monitor.observe_batch(3, observed[rows, STAGE3_COLUMNS], p3[rows])
+        return p1, p2, p3, exit_stage
+
+    @staticmethod
+    def fuse(p1, p2, p3, exit_stage=None):
+        """
+        Vectorized RiskEngine fusion: (final probabilities, categories).
+
+        Rows that exited early are fused over the stages that ran, with the
+        weights renormalized as in RiskEngine.generate_provisional_assessment.
+        """
+        final = (
+            RiskEngine.STAGE1_WEIGHT * p1 +
+            RiskEngine.STAGE2_WEIGHT * p2 +
+            RiskEngine.STAGE3_WEIGHT * p3
+        )
+        if exit_stage is not None:
+            w1, w2 = RiskEngine.provisional_weights(2)
+            final = np.where(exit_stage == 1, p1, np.where(exit_stage == 2, w1 * p1 + w2 * p2, final))
+        final = np.clip(final, 0.0, 1.0)
+        categories = np.where(
+            final < RiskEngine.LOW_THRESHOLD, 'Low',
+            np.where(final < RiskEngine.HIGH_THRESHOLD, 'Moderate', 'High')
+        )
+        return final, categories
+
+    def score_batch(self, records, triage=False):
+        """
+        Score many requests at once.
+
+        Returns:
+            dict of arrays: stage1/stage2/stage3 probabilities (NaN where a
+            stage was skipped), final probability and risk category; in
+            triage mode also exit_stage and the triage summary
+        """
+        with span('features'):
+            buffer = self.build_buffer(records)
+            observed = self.build_observed(records, buffer)
+        p1, p2, p3, exit_stage = self.score_buffer(buffer, triage=triage, observed=observed)
+        with span('fusion'):
+            final, categories = self.fuse(p1, p2, p3, exit_stage if triage else None)
+        prediction_journal.record_batch(buffer, p1, p2, p3, final, categories, exit_stage if triage else None)
+        result = {
+            'stage1_probability': p1,
+            'stage2_probability': p2,
+            'stage3_probability': p3,
+            'final_risk_probability': final,
+            'risk_category': categories
+        }
+        if triage:
+            result['exit_stage'] = exit_stage
+            result['triage'] = self.record_triage(exit_stage)
+        return result
+
+    def run(self, data, triage=False, fallback=None):
+        """
+        Score one full request, with the distilled surrogate stages when a
+        fallback reason is given (the result then carries a fallback flag).
+
+        Returns:
+            dict with success, stage1, stage2, stage3 (shaped like the
+            InferenceService results, None for stages skipped by triage)
+            and final_assessment; in triage mode also the triage outcome.
+            On failure success is False with the failing stage and error
+        """
+        # Surrogate outputs are not the monitored models' outputs
+        with drift_monitor.suppressed() if fallback else nullcontext():
+            result = self._run(data, triage, fallback)
+        if fallback and result['success']:
+            result['fallback'] = surrogate_models.flag(fallback)
+        return result
+
+    def _run(self, data, triage, fallback):
+        stage = 1
+        try:
+            stages = surrogate_models.stage_models() if fallback else self.stages()
+            with span('features'):
+                buffer = np.empty((1, BUFFER_WIDTH), dtype=np.float64)
+                self.fill_stage1(buffer, 0, data)
+
+            p1 = float(stages[0].predict(buffer[:, STAGE1_COLUMNS])[0])
+            row1 = buffer[0, STAGE1_COLUMNS].tolist()
+            drift_monitor.observe(1, InferenceService.drift_values(1, data), p1)
+            features1 = dict(zip(InferenceService.STAGE1_FEATURES, row1))
+            result = {
+                'success': True,
+                'stage1': {
+                    'success': True,
+                    'stage': 1,
+                    'probability': p1,
+                    'risk_level': InferenceService.get_risk_level(p1),
+                    'factors': InferenceService.stage1_factors(features1)
+                },
+                'stage2': None,
+                'stage3': None
+            }
+            if triage and self.confident(1, p1):
+                return self._early_exit(result, 1, p1)
+
+            buffer[0, STAGE1_PROB_COLUMN] = p1
+            stage = 2
+            # Later stages' inputs are parsed only when reached, so an invalid
+            # field fails the same stage as in InferenceService
+            with span('features'):
+                self.fill_stage2(buffer, 0, data)
+            p2 = float(stages[1].predict(buffer[:, STAGE2_COLUMNS])[0])
+            drift_monitor.observe(2, InferenceService.drift_values(2, data, p1), p2)
+            apoe4_count = int(buffer[0, APOE4_COLUMN])
+            result['stage2'] = {
+                'success': True,
+                'stage': 2,
+                'probability': p2,
+                'risk_level': InferenceService.get_risk_level(p2),
+                'apoe4_count': apoe4_count,
+                'genetic_insight': InferenceService.genetic_insight(apoe4_count, data.get('genotype', ''))
+            }
+            if triage and self.confident(2, p2):
+                return self._early_exit(result, 2, p1, p2)
+
+            buffer[0, STAGE2_PROB_COLUMN] = p2
+            stage = 3
+            with span('features'):
+                self.fill_stage3(buffer, 0, data)
+            p3 = float(stages[2].predict(buffer[:, STAGE3_COLUMNS])[0])
+            drift_monitor.observe(3, InferenceService.drift_values(3, data, p2), p3)
+            result['stage3'] = {
+                'success': True,
+                'stage': 3,
+                'probability': p3,
+                'risk_level': InferenceService.get_risk_level(p3, thresholds=InferenceService.STAGE3_THRESHOLDS),
+                'biomarker_insight': InferenceService.biomarker_insight(float(buffer[0, 9]))
+            }
+
+            with span('fusion'):
+                result['final_assessment'] = RiskEngine.generate_full_assessment(p1, p2, p3)
+            if triage:
+                result['triage'] = {'exit_stage': 3, 'skipped_stages': []}
+                self.record_triage([3])
+            return result
+
+        except Exception as e:
+            return {
+                'success': False,
+                'stage': stage,
+                'error': str(e)
+            }
+
+    def _early_exit(self, result, exit_stage, p1, p2=None):
+        """Finish a triaged request with a provisional assessment."""
+        with span('fusion'):
+            result['final_assessment'] = RiskEngine.generate_provisional_assessment(p1, p2)
+        result['triage'] = {'exit_stage': exit_stage, 'skipped_stages': list(range(exit_stage + 1, 4))}
+        self.record_triage([exit_stage])
+        return result
+
+
+# Global singleton instance
+cascade_pipeline = CascadePipeline()
@@ -0,0 +1,166 @@
+"""
+Compact Artifacts
+Inference-only, reduced-memory forms of the per-stage artifacts: float32
+KNN imputer matrices, scalers without fit-time statistics and XGBoost
+ensembles flattened into plain node arrays.
+"""
+import copy
+import json
+import sys
+
+import numpy as np
+
+
+# Per-node cost of an XGBoost RegTree node plus its stats (RTreeNodeStat)
+XGB_NODE_BYTES = 20 + 16
+
+# Scaler attributes only needed for fitting, not for transform()
+SCALER_FIT_ONLY = ('var_', 'n_samples_seen_')
+
+
+class CompactTreeEnsemble:
+    """
+    Binary-logistic gradient-boosted trees as flat numpy arrays.
+
+    Mirrors XGBoost's prediction rules: features are compared as float32,
+    a value goes left when it is below the split condition, missing values
+    follow the default direction, and leaf values are summed in tree order
+    onto the base margin. Exposes the slice of the XGBClassifier / Booster
+    API the inference paths use.
+    """
+
+    def __init__(self, model):
+        config = json.loads(model.get_booster().save_raw('json'))['learner']
+        objective = config['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective: {objective}")
+
+        trees = config['gradient_booster']['model']['trees']
+        lefts, rights, features, conditions, defaults, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError('Categorical splits are not supported')
+            left = np.asarray(tree['left_children'], dtype=np.int32)
+            right = np.asarray(tree['right_children'], dtype=np.int32)
+            is_leaf = left == -1
+            lefts.append(np.where(is_leaf, -1, left + offset))
+            rights.append(np.where(is_leaf, -1, right + offset))
+            features.append(tree['split_indices'])
+            conditions.append(tree['split_conditions'])
+            defaults.append(tree['default_left'])
+            roots.append(offset)
+            offset += len(left)
+
+        self.left = np.concatenate(lefts).astype(np.int32)
+        self.right = np.concatenate(rights).astype(np.int32)
+        self.feature = np.concatenate(features).astype(np.int32)
+        # Split condition for inner nodes, leaf value for leaves (as in XGBoost)
+        self.value = np.concatenate(conditions).astype(np.float32)
+        self.default_left = np.concatenate(defaults).astype(bool)
+        self.roots = np.asarray(roots, dtype=np.int32)
+
+        base_score = float(config['learner_model_param']['base_score'].strip('[]'))
+        self.base_margin = np.float32(np.log(base_score / (1.0 - base_score)))
+        self.n_features_in_ = int(config['learner_model_param']['num_feature'])
+        self.missing = getattr(model, 'missing', np.nan)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.left, self.right, self.feature, self.value,
+                                      self.default_left, self.roots))
+
+    def get_booster(self):
+        return self
+
+    def inplace_predict(self, X, iteration_range=(0, 0), missing=np.nan):
+        """Positive-class probabilities for the rows of X."""
+        X = np.asarray(X, dtype=np.float32)
+        if missing is not None and not np.isnan(missing):
+            X = np.where(X == missing, np.float32(np.nan), X)
+
+        start, stop = iteration_range or (0, 0)
+        roots = self.roots[start:stop or None]
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+
+        inner = self.left[node] != -1
+        while inner.any():
+            fvalue = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(fvalue), self.default_left[node], fvalue < self.value[node])
+            node = np.where(inner, np.where(go_left, self.left[node], self.right[node]), node)
+            inner = self.left[node] != -1
+
+        leaves = self.value[node]
+        margin = np.full(X.shape[0], self.base_margin, dtype=np.float32)
+        for t in range(leaves.shape[1]):
+            margin += leaves[:, t]
+        one = np.float32(1.0)
+        return one / (one + np.exp(-margin))
+
+    def predict_proba(self, X):
+        """(n, 2) class probabilities, like XGBClassifier.predict_proba."""
+        positive = self.inplace_predict(X, missing=self.missing)
+        return np.column_stack([1 - positive, positive])
+
+
+def compact_imputer(imputer):
+    """Copy of a fitted imputer with its training matrix stored as float32."""
+    compact = copy.copy(imputer)
+    fit_X = getattr(imputer, '_fit_X', None)
+    if fit_X is not None:
+        compact._fit_X = np.asarray(fit_X, dtype=np.float32)
+    return compact
+
+
+def compact_scaler(scaler):
+    """Copy of a fitted scaler without its fit-only statistics."""
+    compact = copy.copy(scaler)
+    for attr in SCALER_FIT_ONLY:
+        compact.__dict__.pop(attr, None)
+    return compact
+
+
+def verify_stage(original, compact, probe, tolerance, thresholds):
+    """
+    Compare original and compact (imputer, scaler, model) on probe rows.
+
+    A stage passes when no probability moves by more than `tolerance` and
+    no row crosses any of `thresholds`.
+
+    Returns:
+        dict with rows, max_abs_diff, category_changes and passed
+    """
+    def score(imputer, scaler, model):
+        return model.predict_proba(scaler.transform(imputer.transform(probe)))[:, 1].astype(np.float64)
+
+    before = score(*original)
+    after = score(*compact)
+    changes = sum(int(np.count_nonzero((before < t) != (after < t))) for t in thresholds)
+    max_diff = float(np.max(np.abs(before - after))) if len(before) else 0.0
+    return {
+        'rows': int(len(before)),
+        'max_abs_diff': max_diff,
+        'category_changes': changes,
+        'passed': max_diff <= tolerance and changes == 0
+    }
+
+
+def artifact_nbytes(obj):
+    """
+    Approximate resident size of an artifact in bytes.
+
+    Returns:
+        (bytes, estimated) - estimated is True for native XGBoost boosters,
+        whose memory is derived from their node count
+    """
+    if isinstance(obj, CompactTreeEnsemble):
+        return obj.nbytes, False
+    if hasattr(obj, 'get_booster'):
+        trees = json.loads(obj.get_booster().save_raw('json'))['learner']['gradient_booster']['model']['trees']
+        nodes = sum(int(tree['tree_param']['num_nodes']) for tree in trees)
+        return nodes * XGB_NODE_BYTES, True
+    total = sys.getsizeof(obj)
+    for value in vars(obj).values():
+        total += value.nbytes if isinstance(value, np.ndarray) else sys.getsizeof(value)
+    return total, False
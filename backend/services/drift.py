@@ -0,0 +1,344 @@
+"""
+Drift Monitor
+Streaming, fixed-size sketches of every stage feature and stage output on
+the inference path, compared against a reference built from the
+imputers' training matrices. Sketches are plain bin counts, so workers
+merge them by addition through JSON snapshots (as /metrics does).
+Monitoring turns itself off, with a warning, when an imputer keeps no
+training matrix to build the reference from.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from .metrics import remove_snapshot
+from .model_loader import model_loader
+
+
+OUTPUT_COLUMN = 'probability'
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+PSI_EPSILON = 1e-4
+
+_local = threading.local()
+
+
+class ColumnSketch:
+    """
+    Histogram over fixed, reference-derived bin edges plus missing count
+    and extremes. Bin i counts values in [edges[i-1], edges[i]); bin 0 and
+    the last bin catch values outside the reference range.
+    """
+    __slots__ = ('edges', 'counts', 'missing', 'low', 'high')
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.missing = 0
+        self.low = math.inf
+        self.high = -math.inf
+
+    def update(self, value):
+        if value is None or value != value:
+            self.missing += 1
+            return
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        values = values[~nan]
+        if not len(values):
+            return
+        bins = np.bincount(np.searchsorted(self.edges, values, side='right'), minlength=len(self.counts))
+        self.counts = [a + int(b) for a, b in zip(self.counts, bins)]
+        self.low = min(self.low, float(values.min()))
+        self.high = max(self.high, float(values.max()))
+
+    def to_dict(self):
+        return {'counts': self.counts, 'missing': self.missing,
+                'low': self.low if self.low != math.inf else None,
+                'high': self.high if self.high != -math.inf else None}
+
+    def merge(self, data):
+        self.counts = [a + b for a, b in zip(self.counts, data['counts'])]
+        self.missing += data['missing']
+        if data['low'] is not None:
+            self.low = min(self.low, data['low'])
+        if data['high'] is not None:
+            self.high = max(self.high, data['high'])
+
+    @property
+    def total(self):
+        return sum(self.counts) + self.missing
+
+    def quantile(self, q):
+        """Quantile of the non-missing values, interpolated within bins."""
+        n = sum(self.counts)
+        if not n:
+            return None
+        target = q * n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                lo = self.edges[i - 1] if i > 0 else self.low
+                hi = self.edges[i] if i < len(self.edges) else self.high
+                lo, hi = max(lo, self.low), min(hi, self.high)
+                return float(lo + (hi - lo) * (target - seen) / count)
+            seen += count
+        return float(self.high)
+
+
+def psi(expected, actual):
+    """Population stability index between two bin-count vectors."""
+    e_total, a_total = sum(expected), sum(actual)
+    if not e_total or not a_total:
+        return None
+    value = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e / e_total, PSI_EPSILON)
+        a = max(a / a_total, PSI_EPSILON)
+        value += (a - e) * math.log(a / e)
+    return value
+
+
+class DriftMonitor:
+    """
+    Per-worker sketches of stage inputs and outputs.
+
+    Bin edges are reference quantiles, so every worker (same artifacts)
+    uses the same edges and snapshots merge by addition. Memory is fixed
+    by the number of columns and bins, independent of traffic.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.directory = None
+        self.flush_interval = 10.0
+        self.bins = 20
+        self.psi_threshold = 0.2
+        self.version = None
+        self.columns = {}
+        self._reference = None   # stage -> column -> ColumnSketch
+        self._live = None
+        self._generation = None
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+
+    def init_app(self, app):
+        """Configure the monitor and its snapshot directory."""
+        self.enabled = app.config.get('DRIFT_ENABLED', True)
+        self.directory = app.config.get('DRIFT_DIR')
+        self.flush_interval = app.config.get('DRIFT_FLUSH_SECONDS', self.flush_interval)
+        self.bins = app.config.get('DRIFT_BINS', self.bins)
+        self.psi_threshold = app.config.get('DRIFT_PSI_THRESHOLD', self.psi_threshold)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        if self.enabled and model_loader.is_loaded():
+            # Build the reference now rather than on the first request
+            self._ensure()
+
+    # ------------------------------------------------------------------
+    # Reference
+    # ------------------------------------------------------------------
+    def _edges(self, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return [0.0]
+        quantiles = np.quantile(values, np.linspace(0, 1, self.bins + 1)[1:-1])
+        return sorted(set(float(q) for q in quantiles)) or [float(values[0])]
+
+    def _build(self):
+        """
+        Reference sketches from the imputers' training rows and their scored
+        outputs. Disables monitoring if an imputer does not keep its
+        training rows (KNNImputer's _fit_X).
+        """
+        from .inference import InferenceService
+
+        reference, live = {}, {}
+        versions = []
+        self.columns = {
+            1: InferenceService.STAGE1_FEATURES,
+            2: InferenceService.STAGE2_FEATURES,
+            3: InferenceService.STAGE3_FEATURES
+        }
+        for stage, columns in self.columns.items():
+            imputer = model_loader.get_imputer(stage)
+            fit_X = getattr(imputer, '_fit_X', None)
+            if fit_X is None:
+                print(f"⚠️ Drift monitoring disabled: the stage {stage} imputer "
+                      f"({type(imputer).__name__}) keeps no training rows to build a reference from")
+                self.enabled = False
+                self._reference = self._live = None
+                self._generation = model_loader.generation
+                return
+            fit_X = np.asarray(fit_X, dtype=np.float64)
+            scores = model_loader.get_model(stage).predict_proba(
+                model_loader.get_scaler(stage).transform(imputer.transform(fit_X))
+            )[:, 1]
+            reference[stage], live[stage] = {}, {}
+            for name, values in list(zip(columns, fit_X.T)) + [(OUTPUT_COLUMN, scores)]:
+                edges = self._edges(values)
+                reference[stage][name] = ColumnSketch(edges)
+                reference[stage][name].update_many(values)
+                live[stage][name] = ColumnSketch(edges)
+            versions.append(model_loader.get_version(stage))
+        self._reference, self._live = reference, live
+        self.version = '-'.join(versions)
+        self._generation = model_loader.generation
+
+    def _ensure(self):
+        if self._live is None or self._generation != model_loader.generation:
+            with self._lock:
+                if self._live is None or self._generation != model_loader.generation:
+                    self._build()
+        return self._live
+
+    # ------------------------------------------------------------------
+    # Observation
+    # ------------------------------------------------------------------
+    @staticmethod
+    @contextmanager
+    def suppressed():
+        """Skip observations on this thread (synthetic traffic)."""
+        _local.suppressed = True
+        try:
+            yield
+        finally:
+            _local.suppressed = False
+
+    def active(self):
+        """True if observations on this thread are recorded."""
+        return self.enabled and not getattr(_local, 'suppressed', False)
+
+    def observe(self, stage, values, probability):
+        """Record one row of stage features (in model column order, NaN where missing) and its output."""
+        if not self.active():
+            return
+        live = self._ensure()
+        if live is None:
+            return
+        sketches = live[stage]
+        with self._lock:
+            for name, value in zip(self.columns[stage], values):
+                sketches[name].update(value)
+            sketches[OUTPUT_COLUMN].update(probability)
+        self._maybe_flush()
+
+    def observe_batch(self, stage, X, probabilities):
+        """Record many rows at once (vectorized)."""
+        if not self.active() or not len(X):
+            return
+        live = self._ensure()
+        if live is None:
+            return
+        sketches = live[stage]
+        with self._lock:
+            for name, values in zip(self.columns[stage], np.asarray(X).T):
+                sketches[name].update_many(values)
+            sketches[OUTPUT_COLUMN].update_many(probabilities)
+        self._maybe_flush()
+
+    # ------------------------------------------------------------------
+    # Cross-worker snapshots
+    # ------------------------------------------------------------------
+    def _maybe_flush(self):
+        now = time.time()
+        if self.directory and now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.flush()
+
+    def snapshot(self):
+        """This worker's live sketches as JSON-ready data."""
+        live = self._ensure()
+        with self._lock:
+            return {
+                'version': self.version,
+                'stages': {str(stage): {name: sketch.to_dict() for name, sketch in columns.items()}
+                           for stage, columns in live.items()}
+            }
+
+    def flush(self):
+        """Write this worker's snapshot for other workers to merge."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'drift_{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _merged(self):
+        """
+        Live sketches summed over every live worker with the same artifacts.
+        Snapshots left by exited workers are deleted.
+        """
+        own = self.snapshot()
+        merged = {
+            int(stage): {name: ColumnSketch(self._live[int(stage)][name].edges) for name in columns}
+            for stage, columns in own['stages'].items()
+        }
+        snapshots = [own]
+        if self.directory:
+            own_file = f'drift_{os.getpid()}.json'
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json') or filename == own_file:
+                    continue
+                path = os.path.join(self.directory, filename)
+                try:
+                    os.kill(int(filename[len('drift_'):-len('.json')]), 0)
+                    with open(path) as f:
+                        data = json.load(f)
+                except ProcessLookupError:
+                    remove_snapshot(path)
+                    continue
+                except (ValueError, OSError):
+                    continue
+                if data.get('version') == self.version:
+                    snapshots.append(data)
+        for data in snapshots:
+            for stage, columns in data['stages'].items():
+                for name, sketch in columns.items():
+                    merged[int(stage)][name].merge(sketch)
+        return merged
+
+    def report(self):
+        """
+        Compare merged live sketches with the reference.
+
+        Returns:
+            dict per stage and column: observations, missing rates,
+            reference vs live quantiles, PSI and a drifted flag
+        """
+        merged = self._merged()
+        stages = {}
+        for stage, columns in merged.items():
+            stages[stage] = {}
+            for name, live in columns.items():
+                ref = self._reference[stage][name]
+                value = psi(ref.counts, live.counts)
+                stages[stage][name] = {
+                    'observations': live.total,
+                    'missing_rate': live.missing / live.total if live.total else None,
+                    'reference_missing_rate': ref.missing / ref.total if ref.total else None,
+                    'quantiles': {str(q): live.quantile(q) for q in QUANTILES},
+                    'reference_quantiles': {str(q): ref.quantile(q) for q in QUANTILES},
+                    'psi': value,
+                    'drifted': value is not None and value > self.psi_threshold
+                }
+        return {'version': self.version, 'psi_threshold': self.psi_threshold, 'stages': stages}
+
+
+# Global singleton instance
+drift_monitor = DriftMonitor()
@@ -0,0 +1,236 @@
+"""
+Idempotency Service
+Stores the first response for an Idempotency-Key so client retries are
+answered without re-running inference or inserting duplicate assessments.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify, make_response
+from flask_jwt_extended import get_jwt_identity
+
+
+# Claim outcomes
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+class MemoryIdempotencyStore:
+    """
+    Bounded in-process TTL store (one per worker).
+
+    Entries are kept in insertion order so the oldest are evicted first once
+    max_entries is reached.
+    """
+
+    def __init__(self, ttl_seconds=86400, max_entries=10000, pending_ttl_seconds=60):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, scope, fingerprint):
+        """Claim a key, or return the stored entry for a duplicate."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry and entry['expires_at'] <= now:
+                del self._entries[scope]
+                entry = None
+
+            if entry is None:
+                self._entries[scope] = {
+                    'fingerprint': fingerprint,
+                    'status': None,
+                    'body': None,
+                    'expires_at': now + self.pending_ttl_seconds
+                }
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                return CLAIMED, None
+
+            if entry['fingerprint'] != fingerprint:
+                return MISMATCH, None
+            if entry['status'] is None:
+                return IN_PROGRESS, None
+            return REPLAY, entry
+
+    def complete(self, scope, fingerprint, status, body):
+        """Store the response for a claimed key."""
+        with self._lock:
+            self._entries[scope] = {
+                'fingerprint': fingerprint,
+                'status': status,
+                'body': body,
+                'expires_at': time.time() + self.ttl_seconds
+            }
+
+    def release(self, scope):
+        """Drop a claim so the client can retry (e.g. after a server error)."""
+        with self._lock:
+            self._entries.pop(scope, None)
+
+
+class SQLiteIdempotencyStore:
+    """
+    SQLite-backed TTL store shared by all gunicorn workers on a host.
+
+    Claims are taken with an INSERT OR IGNORE inside an immediate transaction,
+    so two workers racing on the same key cannot both run the request.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path, ttl_seconds=86400, max_entries=10000, pending_ttl_seconds=60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS idempotency_keys ('
+                'scope TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, '
+                'status INTEGER, body BLOB, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_idempotency_expires ON idempotency_keys (expires_at)')
+            self._local.conn = conn
+        return conn
+
+    def claim(self, scope, fingerprint):
+        """Claim a key, or return the stored entry for a duplicate."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM idempotency_keys WHERE scope = ? AND expires_at <= ?', (scope, now))
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO idempotency_keys (scope, fingerprint, status, body, expires_at) '
+                'VALUES (?, ?, NULL, NULL, ?)',
+                (scope, fingerprint, now + self.pending_ttl_seconds)
+            ).rowcount
+            row = None if inserted else conn.execute(
+                'SELECT fingerprint, status, body FROM idempotency_keys WHERE scope = ?', (scope,)
+            ).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if inserted:
+            return CLAIMED, None
+        if row[0] != fingerprint:
+            return MISMATCH, None
+        if row[1] is None:
+            return IN_PROGRESS, None
+        return REPLAY, {'status': row[1], 'body': row[2]}
+
+    def complete(self, scope, fingerprint, status, body):
+        """Store the response for a claimed key."""
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO idempotency_keys (scope, fingerprint, status, body, expires_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (scope, fingerprint, status, body, time.time() + self.ttl_seconds)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune(conn)
+
+    def release(self, scope):
+        """Drop a claim so the client can retry (e.g. after a server error)."""
+        self._connect().execute('DELETE FROM idempotency_keys WHERE scope = ?', (scope,))
+
+    def _prune(self, conn):
+        """Remove expired entries and cap the table at max_entries."""
+        conn.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM idempotency_keys WHERE scope IN ('
+            'SELECT scope FROM idempotency_keys ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+
+class IdempotencyManager:
+    """Selects the configured store and exposes it to the route decorator."""
+
+    MAX_KEY_LENGTH = 255
+
+    def __init__(self):
+        self.store = MemoryIdempotencyStore()
+
+    def init_app(self, app):
+        """Build the store from the Flask config."""
+        ttl = app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400)
+        max_entries = app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000)
+        if app.config.get('IDEMPOTENCY_BACKEND', 'memory') == 'sqlite':
+            self.store = SQLiteIdempotencyStore(
+                app.config['IDEMPOTENCY_DATABASE_PATH'], ttl_seconds=ttl, max_entries=max_entries
+            )
+        else:
+            self.store = MemoryIdempotencyStore(ttl_seconds=ttl, max_entries=max_entries)
+
+
+# Global singleton instance
+idempotency = IdempotencyManager()
+
+
+def idempotent(view):
+    """
+    Honour an optional Idempotency-Key header on a JWT-protected route.
+
+    Keys are scoped to the user and route. Only 200 responses are stored;
+    any other outcome releases the key so the client may retry.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > IdempotencyManager.MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'error': 'Idempotency-Key is too long'}), 400
+
+        store = idempotency.store
+        scope = f"{get_jwt_identity()}:{request.path}:{key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        state, entry = store.claim(scope, fingerprint)
+        if state == REPLAY:
+            response = make_response(entry['body'], entry['status'])
+            response.mimetype = 'application/json'
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if state == IN_PROGRESS:
+            return jsonify({'success': False, 'error': 'A request with this Idempotency-Key is in progress'}), 409
+        if state == MISMATCH:
+            return jsonify({'success': False, 'error': 'Idempotency-Key was reused with a different payload'}), 422
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            store.release(scope)
+            raise
+
+        if response.status_code == 200:
+            store.complete(scope, fingerprint, response.status_code, response.get_data())
+        else:
+            store.release(scope)
+        return response
+
+    return wrapper
@@ -5,6 +5,12 @@ Stage-by-stage ML inference for the MirAI cascade model.
 import numpy as np
 import pandas as pd
 from .model_loader import model_loader
+from .metrics import span
+from .drift import drift_monitor
+from .surrogate import surrogate_models
+
+
+NAN = float('nan')
 
 
 class InferenceService:
@@ -41,62 +47,153 @@ class InferenceService:
         else:
             return 'High'
     
+    # Stage 3 uses a wider "Elevated" band
+    STAGE3_THRESHOLDS = (0.3, 0.7)
+    
+    @classmethod
+    def build_stage1_features(cls, data):
+        """Map a Stage 1 request body to model features."""
+        return {
+            'AGE': float(data.get('age', 65)),
+            'PTGENDER': cls.preprocess_gender(data.get('gender', 'Male')),
+            'PTEDUCAT': float(data.get('education', 16)),
+            'FAQ': float(data.get('faq', 0)),
+            'EcogPtMem': float(data.get('ecogMem', 1)),
+            'EcogPtTotal': float(data.get('ecogTotal', 1))
+        }
+    
+    @classmethod
+    def build_stage2_features(cls, data, stage1_probability):
+        """Map a Stage 2 request body and the Stage 1 output to model features."""
+        return {
+            'Stage1_Prob': float(stage1_probability),
+            'APOE4_Count': cls.count_apoe4(data.get('genotype', ''))
+        }
+    
+    @classmethod
+    def build_stage3_features(cls, data, stage2_probability):
+        """Map a Stage 3 request body and the Stage 2 output to model features."""
+        return {
+            'Stage2_Prob': float(stage2_probability),
+            'pT217_F': float(data.get('ptau217') or 0),
+            'AB42_F': float(data.get('ab42') or 0),
+            'AB40_F': float(data.get('ab40') or 0),
+            'NfL_Q': float(data.get('nfl') or 0)
+        }
+    
+    @staticmethod
+    def _given(value):
+        return NAN if value is None or value == '' else float(value)
+
+    @classmethod
+    def drift_values(cls, stage, data, upstream_probability=NAN):
+        """
+        A stage's model columns as the request gave them, for the drift
+        monitor: NaN where a field was omitted, before any default applies.
+        """
+        if stage == 1:
+            gender = data.get('gender')
+            return [
+                cls._given(data.get('age')),
+                NAN if gender in (None, '') else float(cls.preprocess_gender(gender)),
+                cls._given(data.get('education')),
+                cls._given(data.get('faq')),
+                cls._given(data.get('ecogMem')),
+                cls._given(data.get('ecogTotal'))
+            ]
+        if stage == 2:
+            genotype = data.get('genotype')
+            return [float(upstream_probability), NAN if genotype in (None, '') else float(cls.count_apoe4(genotype))]
+        return [float(upstream_probability)] + [cls._given(data.get(field)) for field in ('ptau217', 'ab42', 'ab40', 'nfl')]
+
+    @staticmethod
+    def stage1_factors(features):
+        """Explain which clinical inputs drive Stage 1 risk."""
+        factors = []
+        if features['FAQ'] >= 5:
+            factors.append(f"FAQ score of {features['FAQ']:.0f} indicates functional difficulty")
+        if features['EcogPtMem'] >= 2:
+            factors.append(f"Memory self-rating ({features['EcogPtMem']:.1f}) suggests subjective concern")
+        if features['AGE'] >= 75:
+            factors.append(f"Age ({features['AGE']:.0f}) is a significant risk factor")
+        if not factors:
+            factors.append("No significant clinical risk factors identified")
+        return factors
+    
+    @staticmethod
+    def genetic_insight(apoe4_count, genotype):
+        """Describe the APOE4 result."""
+        if apoe4_count == 2:
+            return "APOE4 Homozygous (ε4/ε4) - Two copies significantly increase risk"
+        elif apoe4_count == 1:
+            return "APOE4 Carrier (1 copy) - Moderately increases risk"
+        elif genotype:
+            return "No APOE4 alleles detected"
+        return "Genetic data not provided"
+    
+    @staticmethod
+    def biomarker_insight(ptau):
+        """Describe the pTau-217 result."""
+        if ptau > 0.6:
+            return f"pTau-217 ({ptau:.2f} pg/mL) is elevated - suggests tau pathology"
+        elif ptau > 0:
+            return f"pTau-217 ({ptau:.2f} pg/mL) is within normal range"
+        return "Biomarker data not provided"
+    
     @classmethod
-    def predict_stage1(cls, data):
+    def predict_stage1(cls, data, fallback=None):
         """
         Stage 1: Clinical Screening
         
         Args:
             data: dict with keys: age, gender, education, faq, ecogMem, ecogTotal
+            fallback: surrogate fallback reason, or None for the primary models
             
         Returns:
             dict with probability, risk_level, and factors
         """
         try:
-            # Prepare feature vector
-            features = {
-                'AGE': float(data.get('age', 65)),
-                'PTGENDER': cls.preprocess_gender(data.get('gender', 'Male')),
-                'PTEDUCAT': float(data.get('education', 16)),
-                'FAQ': float(data.get('faq', 0)),
-                'EcogPtMem': float(data.get('ecogMem', 1)),
-                'EcogPtTotal': float(data.get('ecogTotal', 1))
-            }
-            
-            # Create DataFrame
-            X = pd.DataFrame([features])[cls.STAGE1_FEATURES]
-            
-            # Get model artifacts
-            imputer = model_loader.get_imputer(1)
-            scaler = model_loader.get_scaler(1)
-            model = model_loader.get_model(1)
+            with span('features'):
+                # Prepare feature vector
+                features = cls.build_stage1_features(data)
+                
+                # Create DataFrame
+                X = pd.DataFrame([features])[cls.STAGE1_FEATURES]
             
-            # Transform and predict
-            X_imputed = imputer.transform(X)
-            X_scaled = scaler.transform(X_imputed)
-            probability = float(model.predict_proba(X_scaled)[0, 1])
+            if fallback:
+                # Distilled surrogate (primary artifacts unavailable or shedding load)
+                probability = surrogate_models.predict_one(1, [features[c] for c in cls.STAGE1_FEATURES])
+            else:
+                # Get model artifacts
+                imputer = model_loader.get_imputer(1)
+                scaler = model_loader.get_scaler(1)
+                model = model_loader.get_model(1)
+                
+                # Transform and predict
+                with span('impute'):
+                    X_imputed = imputer.transform(X)
+                with span('scale'):
+                    X_scaled = scaler.transform(X_imputed)
+                with span('booster'):
+                    probability = float(model.predict_proba(X_scaled)[0, 1])
+                drift_monitor.observe(1, cls.drift_values(1, data), probability)
             
             # Determine risk level
             risk_level = cls.get_risk_level(probability)
             
             # Generate factors
-            factors = []
-            if features['FAQ'] >= 5:
-                factors.append(f"FAQ score of {features['FAQ']:.0f} indicates functional difficulty")
-            if features['EcogPtMem'] >= 2:
-                factors.append(f"Memory self-rating ({features['EcogPtMem']:.1f}) suggests subjective concern")
-            if features['AGE'] >= 75:
-                factors.append(f"Age ({features['AGE']:.0f}) is a significant risk factor")
-            if not factors:
-                factors.append("No significant clinical risk factors identified")
+            factors = cls.stage1_factors(features)
             
-            return {
+            result = {
                 'success': True,
                 'stage': 1,
                 'probability': probability,
                 'risk_level': risk_level,
                 'factors': factors
             }
+            if fallback:
+                result['fallback'] = surrogate_models.flag(fallback)
+            return result
             
         except Exception as e:
             return {
@@ -106,55 +203,53 @@ class InferenceService:
             }
     
     @classmethod
-    def predict_stage2(cls, data, stage1_probability):
+    def predict_stage2(cls, data, stage1_probability, fallback=None):
         """
         Stage 2: Genetic Stratification
         
         Args:
             data: dict with key: genotype (e.g., '3/4')
             stage1_probability: float from Stage 1 output
+            fallback: surrogate fallback reason, or None for the primary models
             
         Returns:
             dict with probability, risk_level, apoe4_count, and insight
         """
         try:
-            # Parse APOE4 count
-            genotype = data.get('genotype', '')
-            apoe4_count = cls.count_apoe4(genotype)
-            
-            # Prepare feature vector
-            features = {
-                'Stage1_Prob': float(stage1_probability),
-                'APOE4_Count': apoe4_count
-            }
-            
-            # Create DataFrame
-            X = pd.DataFrame([features])[cls.STAGE2_FEATURES]
-            
-            # Get model artifacts
-            imputer = model_loader.get_imputer(2)
-            scaler = model_loader.get_scaler(2)
-            model = model_loader.get_model(2)
+            with span('features'):
+                # Prepare feature vector (parses the APOE4 count)
+                genotype = data.get('genotype', '')
+                features = cls.build_stage2_features(data, stage1_probability)
+                apoe4_count = features['APOE4_Count']
+                
+                # Create DataFrame
+                X = pd.DataFrame([features])[cls.STAGE2_FEATURES]
             
-            # Transform and predict
-            X_imputed = imputer.transform(X)
-            X_scaled = scaler.transform(X_imputed)
-            probability = float(model.predict_proba(X_scaled)[0, 1])
+            if fallback:
+                # Distilled surrogate (primary artifacts unavailable or shedding load)
+                probability = surrogate_models.predict_one(2, [features[c] for c in cls.STAGE2_FEATURES])
+            else:
+                # Get model artifacts
+                imputer = model_loader.get_imputer(2)
+                scaler = model_loader.get_scaler(2)
+                model = model_loader.get_model(2)
+                
+                # Transform and predict
+                with span('impute'):
+                    X_imputed = imputer.transform(X)
+                with span('scale'):
+                    X_scaled = scaler.transform(X_imputed)
+                with span('booster'):
+                    probability = float(model.predict_proba(X_scaled)[0, 1])
+                drift_monitor.observe(2, cls.drift_values(2, data, stage1_probability), probability)
             
             # Determine risk level
             risk_level = cls.get_risk_level(probability)
             
             # Generate genetic insight
-            if apoe4_count == 2:
-                insight = "APOE4 Homozygous (ε4/ε4) - Two copies significantly increase risk"
-            elif apoe4_count == 1:
-                insight = "APOE4 Carrier (1 copy) - Moderately increases risk"
-            elif genotype:
-                insight = "No APOE4 alleles detected"
-            else:
-                insight = "Genetic data not provided"
+            insight = cls.genetic_insight(apoe4_count, genotype)
             
-            return {
+            result = {
                 'success': True,
                 'stage': 2,
                 'probability': probability,
@@ -162,6 +257,9 @@ class InferenceService:
                 'apoe4_count': apoe4_count,
                 'genetic_insight': insight
             }
+            if fallback:
+                result['fallback'] = surrogate_models.flag(fallback)
+            return result
             
         except Exception as e:
             return {
@@ -171,59 +269,60 @@ class InferenceService:
             }
     
     @classmethod
-    def predict_stage3(cls, data, stage2_probability):
+    def predict_stage3(cls, data, stage2_probability, fallback=None):
         """
         Stage 3: Biomarker Analysis
         
         Args:
             data: dict with keys: ptau217, ab42, ab40, nfl
             stage2_probability: float from Stage 2 output
+            fallback: surrogate fallback reason, or None for the primary models
             
         Returns:
             dict with probability, risk_level, and biomarker_insight
         """
         try:
-            # Prepare feature vector
-            features = {
-                'Stage2_Prob': float(stage2_probability),
-                'pT217_F': float(data.get('ptau217') or 0),
-                'AB42_F': float(data.get('ab42') or 0),
-                'AB40_F': float(data.get('ab40') or 0),
-                'NfL_Q': float(data.get('nfl') or 0)
-            }
-            
-            # Create DataFrame
-            X = pd.DataFrame([features])[cls.STAGE3_FEATURES]
+            with span('features'):
+                # Prepare feature vector
+                features = cls.build_stage3_features(data, stage2_probability)
+                
+                # Create DataFrame
+                X = pd.DataFrame([features])[cls.STAGE3_FEATURES]
             
-            # Get model artifacts
-            imputer = model_loader.get_imputer(3)
-            scaler = model_loader.get_scaler(3)
-            model = model_loader.get_model(3)
-            
-            # Transform and predict
-            X_imputed = imputer.transform(X)
-            X_scaled = scaler.transform(X_imputed)
-            probability = float(model.predict_proba(X_scaled)[0, 1])
+            if fallback:
+                # Distilled surrogate (primary artifacts unavailable or shedding load)
+                probability = surrogate_models.predict_one(3, [features[c] for c in cls.STAGE3_FEATURES])
+            else:
+                # Get model artifacts
+                imputer = model_loader.get_imputer(3)
+                scaler = model_loader.get_scaler(3)
+                model = model_loader.get_model(3)
+                
+                # Transform and predict
+                with span('impute'):
+                    X_imputed = imputer.transform(X)
+                with span('scale'):
+                    X_scaled = scaler.transform(X_imputed)
+                with span('booster'):
+                    probability = float(model.predict_proba(X_scaled)[0, 1])
+                drift_monitor.observe(3, cls.drift_values(3, data, stage2_probability), probability)
             
             # Determine risk level
-            risk_level = cls.get_risk_level(probability, thresholds=(0.3, 0.7))
+            risk_level = cls.get_risk_level(probability, thresholds=cls.STAGE3_THRESHOLDS)
             
             # Generate biomarker insight
-            ptau = features['pT217_F']
-            if ptau > 0.6:
-                insight = f"pTau-217 ({ptau:.2f} pg/mL) is elevated - suggests tau pathology"
-            elif ptau > 0:
-                insight = f"pTau-217 ({ptau:.2f} pg/mL) is within normal range"
-            else:
-                insight = "Biomarker data not provided"
+            insight = cls.biomarker_insight(features['pT217_F'])
             
-            return {
+            result = {
                 'success': True,
                 'stage': 3,
                 'probability': probability,
                 'risk_level': risk_level,
                 'biomarker_insight': insight
             }
+            if fallback:
+                result['fallback'] = surrogate_models.flag(fallback)
+            return result
             
         except Exception as e:
             return {
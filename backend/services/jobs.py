@@ -0,0 +1,448 @@
+"""
+Batch Job Queue
+SQLite-backed queue for large batch uploads. An upload is split into
+chunks and stored with its job; separate worker processes claim chunks,
+score them through the cascade and store CSV results, so jobs survive
+restarts and never run inside a web worker.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Metrics route label for chunk timings
+ROUTE = 'job'
+
+RESULT_COLUMNS = ('row', 'id', 'stage1_probability', 'stage2_probability', 'stage3_probability',
+                  'final_risk_probability', 'risk_category', 'exit_stage', 'error')
+
+
+class JobError(Exception):
+    """A rejected submission (bad file, too large, too many active jobs)."""
+
+
+def parse_upload(data, filename=''):
+    """
+    Parse an uploaded CSV, JSON array or JSON-lines file into request dicts.
+
+    CSV cells that are empty are treated as missing fields.
+    """
+    text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+    stripped = text.lstrip()
+    if filename.lower().endswith('.csv') or not stripped.startswith(('[', '{')):
+        records = [{k: v for k, v in row.items() if k and v not in ('', None)}
+                   for row in csv.DictReader(io.StringIO(text))]
+    elif stripped.startswith('['):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise JobError('Upload must be a CSV file or a JSON list of objects')
+    return records
+
+
+def _pack(value):
+    return gzip.compress(value.encode('utf-8') if isinstance(value, str) else value, compresslevel=5)
+
+
+def _unpack(blob):
+    return gzip.decompress(blob).decode('utf-8')
+
+
+class JobQueue:
+    """
+    Jobs, their input chunks and result chunks in one SQLite file.
+
+    Chunks are claimed with a lease inside an immediate transaction, so
+    any number of worker processes can share a queue; a chunk whose
+    worker died is claimed again once its lease expires.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.chunk_size = 1000
+        self.max_rows = 100000
+        self.max_active_per_user = 2
+        self.lease_seconds = 300
+        self.retention_seconds = 7 * 86400
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Configure the queue from the Flask config (or any object with a config dict)."""
+        config = app.config
+        self.path = config.get('JOBS_DATABASE_PATH')
+        self.chunk_size = config.get('JOBS_CHUNK_SIZE', self.chunk_size)
+        self.max_rows = config.get('JOBS_MAX_ROWS', self.max_rows)
+        self.max_active_per_user = config.get('JOBS_MAX_ACTIVE_PER_USER', self.max_active_per_user)
+        self.lease_seconds = config.get('JOBS_LEASE_SECONDS', self.lease_seconds)
+        self.retention_seconds = config.get('JOBS_RETENTION_DAYS', 7) * 86400
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'path', None) != self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, status TEXT NOT NULL, '
+                'filename TEXT, triage INTEGER NOT NULL DEFAULT 0, total_rows INTEGER NOT NULL, '
+                'total_chunks INTEGER NOT NULL, processed_rows INTEGER NOT NULL DEFAULT 0, '
+                'failed_rows INTEGER NOT NULL DEFAULT 0, done_chunks INTEGER NOT NULL DEFAULT 0, '
+                'error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL);'
+                'CREATE INDEX IF NOT EXISTS ix_jobs_user ON jobs (user_id, created_at);'
+                'CREATE TABLE IF NOT EXISTS job_chunks ('
+                'job_id TEXT NOT NULL, chunk INTEGER NOT NULL, first_row INTEGER NOT NULL, rows INTEGER NOT NULL, '
+                'input BLOB, result BLOB, lease_until REAL, done INTEGER NOT NULL DEFAULT 0, '
+                'PRIMARY KEY (job_id, chunk));'
+                'CREATE INDEX IF NOT EXISTS ix_job_chunks_pending ON job_chunks (done, lease_until);'
+            )
+            self._local.conn = conn
+            self._local.path = self.path
+        return conn
+
+    # ------------------------------------------------------------------
+    # Web side
+    # ------------------------------------------------------------------
+    def submit(self, user_id, records, filename=None, triage=False):
+        """Store a new job and its input chunks; returns the job dict."""
+        if not records:
+            raise JobError('The upload contains no rows')
+        if len(records) > self.max_rows:
+            raise JobError(f'Too many rows ({len(records)}); the limit is {self.max_rows}')
+
+        conn = self._connect()
+        job_id = uuid.uuid4().hex
+        chunks = [records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size)]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            active = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)', (user_id, *ACTIVE_STATES)
+            ).fetchone()[0]
+            if active >= self.max_active_per_user:
+                raise JobError(f'You already have {active} active jobs; wait for one to finish')
+            conn.execute(
+                'INSERT INTO jobs (id, user_id, status, filename, triage, total_rows, total_chunks, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, QUEUED, filename, int(bool(triage)), len(records), len(chunks), time.time())
+            )
+            conn.executemany(
+                'INSERT INTO job_chunks (job_id, chunk, first_row, rows, input) VALUES (?, ?, ?, ?, ?)',
+                ((job_id, i, i * self.chunk_size, len(chunk), _pack(json.dumps(chunk)))
+                 for i, chunk in enumerate(chunks))
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return self.get(job_id, user_id)
+
+    @staticmethod
+    def _describe(row):
+        job = dict(row)
+        job['triage'] = bool(job['triage'])
+        job['progress'] = round(job['processed_rows'] / job['total_rows'], 4) if job['total_rows'] else 1.0
+        del job['total_chunks'], job['done_chunks']
+        return job
+
+    def get(self, job_id, user_id):
+        """A user's job as a dict, or None."""
+        row = self._connect().execute(
+            'SELECT * FROM jobs WHERE id = ? AND user_id = ?', (job_id, user_id)
+        ).fetchone()
+        return self._describe(row) if row else None
+
+    def list(self, user_id, limit=50):
+        rows = self._connect().execute(
+            'SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?', (user_id, limit)
+        ).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def cancel(self, job_id, user_id):
+        """Cancel a queued or running job; remaining chunks are dropped."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cancelled = conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND user_id = ? AND status IN (?, ?)',
+                (CANCELLED, time.time(), job_id, user_id, *ACTIVE_STATES)
+            ).rowcount
+            if cancelled:
+                conn.execute('DELETE FROM job_chunks WHERE job_id = ? AND done = 0', (job_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return bool(cancelled)
+
+    def iter_results(self, job_id):
+        """Yield the job's result CSV (header first), one chunk at a time."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(RESULT_COLUMNS)
+        yield buffer.getvalue()
+        conn = self._connect()
+        last = -1
+        while True:
+            row = conn.execute(
+                'SELECT chunk, result FROM job_chunks WHERE job_id = ? AND chunk > ? AND done = 1 '
+                'ORDER BY chunk LIMIT 1', (job_id, last)
+            ).fetchone()
+            if row is None:
+                return
+            last = row['chunk']
+            yield _unpack(row['result'])
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def claim(self):
+        """
+        Lease the next pending chunk, oldest job first.
+
+        Returns:
+            (job_id, chunk, first_row, triage, records) or None
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT c.job_id, c.chunk, c.first_row, c.input, j.triage FROM job_chunks c '
+                'JOIN jobs j ON j.id = c.job_id '
+                'WHERE c.done = 0 AND (c.lease_until IS NULL OR c.lease_until < ?) AND j.status IN (?, ?) '
+                'ORDER BY j.created_at, c.chunk LIMIT 1', (now, *ACTIVE_STATES)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE job_chunks SET lease_until = ? WHERE job_id = ? AND chunk = ?',
+                    (now + self.lease_seconds, row['job_id'], row['chunk'])
+                )
+                conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?) WHERE id = ? AND status = ?',
+                    (RUNNING, now, row['job_id'], QUEUED)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return (row['job_id'], row['chunk'], row['first_row'], bool(row['triage']),
+                json.loads(_unpack(row['input'])))
+
+    def complete_chunk(self, job_id, chunk, result_csv, rows, failed_rows):
+        """Store a chunk's results and advance the job (completing it after the last chunk)."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            updated = conn.execute(
+                'UPDATE job_chunks SET result = ?, input = NULL, done = 1, lease_until = NULL '
+                'WHERE job_id = ? AND chunk = ? AND done = 0', (_pack(result_csv), job_id, chunk)
+            ).rowcount
+            if updated:
+                conn.execute(
+                    'UPDATE jobs SET processed_rows = processed_rows + ?, failed_rows = failed_rows + ?, '
+                    'done_chunks = done_chunks + 1 WHERE id = ?', (rows, failed_rows, job_id)
+                )
+                conn.execute(
+                    'UPDATE jobs SET status = ?, finished_at = ? '
+                    'WHERE id = ? AND status = ? AND done_chunks = total_chunks',
+                    (COMPLETED, time.time(), job_id, RUNNING)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def fail(self, job_id, error):
+        """Mark a job failed (e.g. the models could not score it)."""
+        conn = self._connect()
+        conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)',
+            (FAILED, str(error)[:500], time.time(), job_id, *ACTIVE_STATES)
+        )
+        conn.execute('DELETE FROM job_chunks WHERE job_id = ? AND done = 0', (job_id,))
+
+    def prune(self):
+        """Delete finished jobs (and their results) past the retention period."""
+        conn = self._connect()
+        cutoff = time.time() - self.retention_seconds
+        old = [row[0] for row in conn.execute(
+            'SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,)
+        )]
+        for job_id in old:
+            conn.execute('DELETE FROM job_chunks WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return len(old)
+
+
+def score_chunk(records, triage=False, first_row=0):
+    """
+    Score one chunk through the cascade; rows with invalid fields get an
+    error instead of failing the chunk.
+
+    Returns:
+        (result CSV text without header, number of failed rows)
+    """
+    from .cascade import BUFFER_WIDTH, cascade_pipeline
+    from .journal import prediction_journal
+
+    buffer = np.empty((len(records), BUFFER_WIDTH), dtype=np.float64)
+    valid, errors = [], {}
+    for i, data in enumerate(records):
+        try:
+            cascade_pipeline.fill_row(buffer, len(valid), data)
+            valid.append(i)
+        except Exception as e:
+            errors[i] = str(e)
+    buffer = buffer[:len(valid)]
+
+    scored = {}
+    if valid:
+        observed = cascade_pipeline.build_observed([records[i] for i in valid], buffer)
+        p1, p2, p3, exit_stage = cascade_pipeline.score_buffer(buffer, triage=triage, observed=observed)
+        final, categories = cascade_pipeline.fuse(p1, p2, p3, exit_stage if triage else None)
+        prediction_journal.record_batch(buffer, p1, p2, p3, final, categories, exit_stage if triage else None)
+        if triage:
+            cascade_pipeline.record_triage(exit_stage)
+        scored = {
+            i: (p1[k], p2[k], p3[k], final[k], categories[k], int(exit_stage[k]))
+            for k, i in enumerate(valid)
+        }
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for i, data in enumerate(records):
+        row_id = data.get('patient_id', data.get('id', ''))
+        if i in errors:
+            writer.writerow((first_row + i, row_id, '', '', '', '', '', '', errors[i]))
+            continue
+        s1, s2, s3, final, category, exit_stage = scored[i]
+        writer.writerow((
+            first_row + i, row_id,
+            *('' if np.isnan(p) else f'{p:.6f}' for p in (s1, s2, s3)),
+            f'{final:.6f}', category, exit_stage, ''
+        ))
+    return out.getvalue(), len(errors)
+
+
+class _Settings:
+    """Plain config holder so services can be initialised without a Flask app."""
+
+    def __init__(self, config):
+        self.config = config
+
+
+def run_worker(config, stop_after_idle=None):
+    """
+    Worker process loop: claim, score and store chunks until stopped.
+
+    Runs at reduced CPU priority with a capped booster thread count, so
+    job scoring yields to interactive predictions on the same host.
+    """
+    from .cascade import cascade_pipeline
+    from .drift import drift_monitor
+    from .journal import prediction_journal
+    from .metrics import metrics
+    from .model_loader import model_loader
+
+    nice = config.get('JOBS_WORKER_NICE', 10)
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+    settings = _Settings(config)
+    model_loader.configure(compact=config.get('MODEL_COMPACT', False),
+                           tolerance=config.get('MODEL_COMPACT_TOLERANCE'))
+    model_loader.load_all()
+    cascade_pipeline.init_app(settings)
+    drift_monitor.init_app(settings)
+    prediction_journal.init_app(settings)
+    if config.get('METRICS_ENABLED', True):
+        metrics.directory = config.get('METRICS_DIR')
+    queue = JobQueue()
+    queue.init_app(settings)
+
+    threads = config.get('JOBS_WORKER_THREADS', 1)
+    for stage in cascade_pipeline.stages():
+        stage.booster.set_param({'nthread': threads})
+
+    poll = config.get('JOBS_POLL_SECONDS', 1.0)
+    pause = config.get('JOBS_CHUNK_PAUSE_SECONDS', 0.0)
+    idle_since = time.time()
+    next_prune = 0.0
+    while True:
+        if time.time() >= next_prune:
+            queue.prune()
+            next_prune = time.time() + 3600
+        claimed = queue.claim()
+        if claimed is None:
+            if stop_after_idle is not None and time.time() - idle_since >= stop_after_idle:
+                break
+            time.sleep(poll)
+            continue
+        job_id, chunk, first_row, triage, records = claimed
+        metrics.begin()
+        try:
+            result_csv, failed_rows = score_chunk(records, triage, first_row)
+        except Exception as e:
+            print(f"⚠️ Job {job_id} chunk {chunk} failed: {e}")
+            queue.fail(job_id, e)
+        else:
+            queue.complete_chunk(job_id, chunk, result_csv, len(records), failed_rows)
+            metrics.increment('job_rows', len(records))
+            if failed_rows:
+                metrics.increment('job_failed_rows', failed_rows)
+        metrics.end(ROUTE)
+        idle_since = time.time()
+        if pause:
+            time.sleep(pause)
+    prediction_journal.close()
+
+
+def start_workers(app, processes):
+    """Start `processes` worker processes (spawned, so no model state is shared) and wait."""
+    import multiprocessing
+
+    config = {key: value for key, value in app.config.items()
+              if key.startswith(('JOBS_', 'MODEL_', 'DRIFT_', 'JOURNAL_', 'TRIAGE_', 'METRICS_'))}
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(config,), name=f'mirai-job-worker-{i}', daemon=True)
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    # Stop the workers with the supervisor; chunks they held are re-leased later
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.join()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        for worker in workers:
+            worker.join(timeout=5)
+
+
+# Global singleton instance
+job_queue = JobQueue()
@@ -0,0 +1,349 @@
+"""
+Prediction Journal
+Append-only binary record of every inference (inputs, artifact versions,
+per-stage probabilities and timings) for audit and offline analysis.
+Requests only push a tuple onto an in-memory deque; a background thread
+writes fixed-layout records to rotating segment files, and older closed
+segments are gzip-compressed. Segments are read back with numpy
+(memory-mapped when uncompressed).
+"""
+import atexit
+import gzip
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .metrics import current_spans, metrics
+from .model_loader import model_loader
+
+
+MAGIC = b'MIRAIJ01'
+HEADER_SIZE = 16   # magic (8) + record size (4) + reserved (4)
+
+# Request sources
+SOURCE_STAGE1, SOURCE_STAGE2, SOURCE_STAGE3, SOURCE_FULL, SOURCE_BATCH = 1, 2, 3, 4, 5
+
+# Bits of the `computed` field: which results this request (re)computed
+COMPUTED_STAGE1, COMPUTED_STAGE2, COMPUTED_STAGE3, COMPUTED_FINAL = 1, 2, 4, 8
+
+# Bits of the `flags` field
+FLAG_PROVISIONAL = 1
+FLAG_FALLBACK = 2       # scored by the distilled surrogate models
+
+CATEGORY_CODES = {'Low': 1, 'Moderate': 2, 'High': 3}
+CATEGORY_NAMES = {code: name for name, code in CATEGORY_CODES.items()}
+
+INPUT_FIELDS = ('age', 'gender', 'education', 'faq', 'ecogMem', 'ecogTotal',
+                'apoe4_count', 'ptau217', 'ab42', 'ab40', 'nfl')
+TIMING_SPANS = ('features', 'impute', 'scale', 'booster', 'fusion', 'total')
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('assessment_id', '<i8'),
+    ('user_id', '<i8'),
+    ('source', 'u1'),
+    ('computed', 'u1'),
+    ('category', 'u1'),
+    ('flags', 'u1'),
+    ('model_version', '<u4', (3,)),         # first 32 bits of each stage's artifact digest
+    ('inputs', '<f4', (len(INPUT_FIELDS),)),  # NaN where not provided
+    ('probabilities', '<f4', (4,)),          # stage1, stage2, stage3, final (NaN if absent)
+    ('timings_us', '<u4', (len(TIMING_SPANS),))
+])
+
+NAN = float('nan')
+
+
+def _number(value):
+    return NAN if value is None else float(value)
+
+
+class PredictionJournal:
+    """
+    Per-worker journal writer.
+
+    Each worker appends to its own segment files
+    (journal_<start>_<pid>_<seq>.mpj, where start is the millisecond the
+    worker opened its first segment), so no cross-process locking is
+    needed and a restarted worker that gets a recycled pid never reuses an
+    earlier run's names. A segment is closed once it reaches
+    `segment_bytes` or `segment_seconds`; all but the newest `keep_raw`
+    closed segments are then compressed. Existing files are never
+    overwritten.
+    The queue is bounded: when the writer falls behind, the oldest queued
+    records are dropped (and counted) rather than blocking a response.
+    """
+
+    EXTENSION = '.mpj'
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.segment_bytes = 16 << 20
+        self.segment_seconds = 3600.0
+        self.flush_interval = 0.5
+        self.keep_raw = 2
+        self._queue = deque(maxlen=100000)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._opened_at = 0.0
+        self._sequence = 0
+        self._run = None
+        self._run_pid = None
+        self._versions = None
+        self._versions_generation = None
+
+    def init_app(self, app):
+        """Configure and, if enabled, start the writer thread."""
+        self.enabled = app.config.get('JOURNAL_ENABLED', False)
+        self.directory = app.config.get('JOURNAL_DIR')
+        self.segment_bytes = app.config.get('JOURNAL_SEGMENT_BYTES', self.segment_bytes)
+        self.segment_seconds = app.config.get('JOURNAL_SEGMENT_SECONDS', self.segment_seconds)
+        self.flush_interval = app.config.get('JOURNAL_FLUSH_SECONDS', self.flush_interval)
+        self.keep_raw = app.config.get('JOURNAL_KEEP_RAW_SEGMENTS', self.keep_raw)
+        self._queue = deque(maxlen=app.config.get('JOURNAL_QUEUE_SIZE', 100000))
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mirai-journal', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Request side (never blocks)
+    # ------------------------------------------------------------------
+    def _model_versions(self):
+        if self._versions_generation != model_loader.generation:
+            self._versions = tuple(int((model_loader.get_version(s) or '0')[:8], 16) for s in (1, 2, 3))
+            self._versions_generation = model_loader.generation
+        return self._versions
+
+    @staticmethod
+    def _timings():
+        spans, total = current_spans()
+        if spans is None:
+            return (0,) * len(TIMING_SPANS)
+        return tuple(min(int(spans.get(name, 0) // 1000), 0xFFFFFFFF) for name in TIMING_SPANS[:-1]) + \
+            (min(int(total // 1000), 0xFFFFFFFF),)
+
+    def _push(self, record):
+        if len(self._queue) == self._queue.maxlen:
+            metrics.increment('journal_dropped')
+        self._queue.append(record)
+
+    def record_assessment(self, source, assessment, computed, provisional=False, fallback=False):
+        """Journal the state of an assessment after a prediction request."""
+        if not self.enabled:
+            return
+        # Committed instances stay loaded (no expire on commit); reading the id
+        # still refreshes one that was expired, then columns are read directly
+        assessment_id = assessment.id or 0
+        row = vars(assessment)
+        get = row.get
+        final = get('final_risk_score') if computed & COMPUTED_FINAL else None
+        gender = get('gender')
+        self._push((
+            time.time(),
+            assessment_id,
+            get('user_id') or 0,
+            source,
+            computed,
+            CATEGORY_CODES.get(get('final_risk_category'), 0) if final is not None else 0,
+            (FLAG_PROVISIONAL if provisional else 0) | (FLAG_FALLBACK if fallback else 0),
+            self._model_versions(),
+            (
+                _number(get('age')),
+                NAN if gender is None else float(str(gender).lower() == 'male'),
+                _number(get('education')), _number(get('faq_score')),
+                _number(get('ecog_mem')), _number(get('ecog_total')),
+                _number(get('apoe4_count')),
+                _number(get('ptau217')), _number(get('ab42')),
+                _number(get('ab40')), _number(get('nfl'))
+            ),
+            (
+                _number(get('stage1_probability')),
+                _number(get('stage2_probability')),
+                _number(get('stage3_probability')),
+                _number(final)
+            ),
+            self._timings()
+        ))
+
+    def record_batch(self, buffer, p1, p2, p3, final, categories, exit_stage=None):
+        """Journal rows scored by CascadePipeline.score_batch (buffer in cascade layout)."""
+        if not self.enabled or not len(p1):
+            return
+        records = np.zeros(len(p1), dtype=RECORD_DTYPE)
+        records['timestamp'] = time.time()
+        records['source'] = SOURCE_BATCH
+        stages = np.full(len(p1), 3) if exit_stage is None else exit_stage
+        records['computed'] = np.choose(np.asarray(stages) - 1, (1, 3, 7)) | COMPUTED_FINAL
+        records['category'] = [CATEGORY_CODES.get(c, 0) for c in categories]
+        records['flags'] = np.where(np.asarray(stages) < 3, FLAG_PROVISIONAL, 0)
+        records['model_version'] = self._model_versions()
+        records['inputs'][:, :6] = buffer[:, 0:6]
+        records['inputs'][:, 6] = buffer[:, 7]
+        records['inputs'][:, 7:] = buffer[:, 9:13]
+        records['probabilities'] = np.column_stack([p1, p2, p3, final])
+        self._push(records)
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _segment_path(self, sequence):
+        return os.path.join(self.directory, f'journal_{self._run}_{sequence:06d}{self.EXTENSION}')
+
+    def _open(self):
+        pid = os.getpid()
+        if self._run_pid != pid:
+            # First segment of this process (or of a forked child)
+            self._run = f'{int(time.time() * 1000):013d}_{pid}'
+            self._run_pid = pid
+            self._sequence = 0
+        self._sequence += 1
+        path = self._segment_path(self._sequence)
+        while os.path.exists(path) or os.path.exists(f'{path}.gz'):
+            self._sequence += 1
+            path = self._segment_path(self._sequence)
+        self._file = open(path, 'xb')
+        self._file.write(MAGIC + RECORD_DTYPE.itemsize.to_bytes(4, 'little') + bytes(4))
+        self._opened_at = time.time()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        closed = self._sequence - self.keep_raw
+        if closed >= 1:
+            path = self._segment_path(closed)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as src, gzip.open(f'{path}.gz', 'xb') as dst:
+                        shutil.copyfileobj(src, dst)
+                except FileExistsError:
+                    # Leave the raw segment in place rather than replace data
+                    print(f"⚠️ Journal segment {path}.gz already exists; not compressing")
+                    return
+                os.remove(path)
+
+    def _drain(self):
+        """Write everything queued so far."""
+        rows, arrays = [], []
+        while True:
+            try:
+                item = self._queue.popleft()
+            except IndexError:
+                break
+            if isinstance(item, np.ndarray):
+                arrays.append(item)
+            else:
+                rows.append(item)
+        if rows:
+            arrays.insert(0, np.array(rows, dtype=RECORD_DTYPE))
+        if not arrays:
+            return
+        if self._file is None:
+            self._open()
+        for array in arrays:
+            self._file.write(array.tobytes())
+        self._file.flush()
+        if (self._file.tell() >= self.segment_bytes or
+                time.time() - self._opened_at >= self.segment_seconds):
+            self._rotate()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                print(f"⚠️ Journal write failed: {e}")
+
+    def flush(self):
+        """Write queued records now (used at shutdown and by tools)."""
+        if self.enabled:
+            self._drain()
+
+    def close(self):
+        """Stop the writer after writing whatever is queued."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class JournalReader:
+    """
+    Reads journal segments as numpy record arrays of RECORD_DTYPE.
+
+    Uncompressed segments (including ones still being written) are
+    memory-mapped and truncated to whole records; compressed ones are
+    decompressed in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def segments(self):
+        """Segment paths, oldest first per worker."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = [n for n in os.listdir(self.directory)
+                 if n.startswith('journal_') and (n.endswith('.mpj') or n.endswith('.mpj.gz'))]
+        return [os.path.join(self.directory, n) for n in sorted(names)]
+
+    @staticmethod
+    def _check_header(header, path):
+        if header[:8] != MAGIC or int.from_bytes(header[8:12], 'little') != RECORD_DTYPE.itemsize:
+            raise ValueError(f'Not a compatible journal segment: {path}')
+
+    def read_segment(self, path):
+        """Records of one segment."""
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as f:
+                data = f.read()
+            self._check_header(data[:HEADER_SIZE], path)
+            count = (len(data) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+            return np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            self._check_header(f.read(HEADER_SIZE), path)
+        count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count <= 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+    def scan(self, since=None, until=None):
+        """Yield per-segment record arrays, optionally filtered by timestamp."""
+        for path in self.segments():
+            records = self.read_segment(path)
+            if since is not None or until is not None:
+                mask = np.ones(len(records), dtype=bool)
+                if since is not None:
+                    mask &= records['timestamp'] >= since
+                if until is not None:
+                    mask &= records['timestamp'] < until
+                records = records[mask]
+            if len(records):
+                yield records
+
+    def read_all(self, since=None, until=None):
+        """All matching records in one array."""
+        chunks = list(self.scan(since, until))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE)
+
+
+# Global singleton instance
+prediction_journal = PredictionJournal()
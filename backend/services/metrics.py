@@ -0,0 +1,246 @@
+"""
+Metrics Service
+Per-stage request timing for the prediction path: spans are summed per
+request, exposed as a Server-Timing header, and folded into latency
+histograms that /metrics serves in Prometheus text format, aggregated
+across gunicorn workers. Simple labelled counters ride along in the same
+snapshots.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from time import perf_counter_ns
+
+from flask import request
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+           0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_local = threading.local()
+
+
+def remove_snapshot(path):
+    """Delete a snapshot left by an exited worker (another worker may have got there first)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _Span:
+    """Context manager adding its elapsed time to the active request's spans."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        spans = getattr(_local, 'spans', None)
+        if spans is not None:
+            spans[self.name] = spans.get(self.name, 0) + perf_counter_ns() - self.start
+        return False
+
+
+def span(name):
+    """Time a block on the current request (no-op outside instrumented requests)."""
+    return _Span(name)
+
+
+def current_spans():
+    """
+    Spans collected so far on this thread.
+
+    Returns:
+        (spans in ns, elapsed ns), or (None, None) outside instrumented requests
+    """
+    spans = getattr(_local, 'spans', None)
+    if spans is None:
+        return None, None
+    return spans, perf_counter_ns() - _local.started
+
+
+class RequestMetrics:
+    """
+    Collects span timings for instrumented routes.
+
+    Each worker keeps its histograms in memory and writes a JSON snapshot
+    to METRICS_DIR at most every `flush_interval` seconds; /metrics sums
+    the snapshots of all live workers.
+    """
+
+    PREFIXES = ('/api/predict/',)
+
+    def __init__(self):
+        self.enabled = True
+        self.directory = None
+        self.flush_interval = 5.0
+        self._histograms = {}   # (route, span) -> [bucket counts..., +Inf count, sum_seconds]
+        self._counters = {}     # (name, labels) -> [count]
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+
+    def init_app(self, app):
+        """Install request hooks and configure the snapshot directory."""
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_SECONDS', self.flush_interval)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        if self.enabled:
+            app.before_request(self._begin)
+            app.after_request(self._finish)
+            app.teardown_request(self._clear)
+
+    @staticmethod
+    def begin():
+        """Start collecting spans on the current thread."""
+        _local.spans = {}
+        _local.started = perf_counter_ns()
+
+    def end(self, route):
+        """
+        Stop collecting and record the spans under a route label.
+
+        Returns:
+            (spans in ns, total ns), or (None, None) if no collection was active
+        """
+        spans = getattr(_local, 'spans', None)
+        if spans is None:
+            return None, None
+        _local.spans = None
+        total = perf_counter_ns() - _local.started
+
+        with self._lock:
+            for name, ns in spans.items():
+                self._observe(route, name, ns / 1e9)
+            self._observe(route, 'total', total / 1e9)
+
+        now = time.time()
+        if self.directory and now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.flush()
+        return spans, total
+
+    def _begin(self):
+        if request.path.startswith(self.PREFIXES):
+            self.begin()
+        else:
+            _local.spans = None
+
+    def _finish(self, response):
+        # Label by URL rule, not raw path, so series stay bounded; paths that
+        # matched no rule (404s, probes) share one bucket
+        rule = request.url_rule
+        spans, total = self.end(rule.rule if rule is not None else 'unmatched')
+        if spans is not None:
+            response.headers['Server-Timing'] = ', '.join(
+                [f'{name};dur={ns / 1e6:.3f}' for name, ns in spans.items()] +
+                [f'total;dur={total / 1e6:.3f}']
+            )
+        return response
+
+    @staticmethod
+    def _clear(exc=None):
+        _local.spans = None
+
+    def _observe(self, route, name, seconds):
+        key = (route, name)
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+
+    def increment(self, name, amount=1, **labels):
+        """Add to a counter, exported as mirai_<name>_total{labels}."""
+        key = (name, ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())))
+        with self._lock:
+            counter = self._counters.setdefault(key, [0])
+            counter[0] += amount
+
+    def snapshot(self):
+        """Copy of this worker's histograms keyed by 'route|span' and counters by '#name|labels'."""
+        with self._lock:
+            data = {f'{route}|{name}': list(hist) for (route, name), hist in self._histograms.items()}
+            data.update({f'#{name}|{labels}': list(c) for (name, labels), c in self._counters.items()})
+            return data
+
+    def flush(self):
+        """Write this worker's snapshot for other workers to aggregate."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'metrics_{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _aggregate(self):
+        """
+        Sum snapshots from every live worker (this one is always current),
+        deleting those left by exited workers.
+        """
+        merged = self.snapshot()
+        if not self.directory:
+            return merged
+        own = f'metrics_{os.getpid()}.json'
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                pid = int(filename[len('metrics_'):-len('.json')])
+                os.kill(pid, 0)
+                with open(path) as f:
+                    data = json.load(f)
+            except ProcessLookupError:
+                remove_snapshot(path)
+                continue
+            except (ValueError, OSError):
+                continue
+            for key, hist in data.items():
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], hist)]
+                else:
+                    merged[key] = hist
+        return merged
+
+    def render_prometheus(self):
+        """Render aggregated histograms in Prometheus text exposition format."""
+        lines = [
+            '# HELP mirai_request_span_seconds Time spent per stage of a prediction request.',
+            '# TYPE mirai_request_span_seconds histogram'
+        ]
+        counters = {}
+        for key, hist in sorted(self._aggregate().items()):
+            if key.startswith('#'):
+                name, labels = key[1:].split('|', 1)
+                counters.setdefault(name, []).append((labels, hist[0]))
+                continue
+            route, name = key.split('|', 1)
+            labels = f'route="{route}",span="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist):
+                cumulative += count
+                lines.append(f'mirai_request_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += hist[len(BUCKETS)]
+            lines.append(f'mirai_request_span_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'mirai_request_span_seconds_sum{{{labels}}} {hist[-1]:.9f}')
+            lines.append(f'mirai_request_span_seconds_count{{{labels}}} {cumulative}')
+        for name, values in counters.items():
+            lines.append(f'# TYPE mirai_{name}_total counter')
+            for labels, value in values:
+                lines.append(f'mirai_{name}_total{{{labels}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Global singleton instance
+metrics = RequestMetrics()
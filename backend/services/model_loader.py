@@ -2,10 +2,55 @@
 Model Loader Service
 Loads XGBoost models, imputers, and scalers for all 3 stages.
 """
+import hashlib
 import os
 import joblib
 import xgboost as xgb
 
+from .compact import (
+    CompactTreeEnsemble, compact_imputer, compact_scaler, verify_stage, artifact_nbytes
+)
+
+
+def load_stage_artifacts(models_path, stage):
+    """
+    Read one stage's artifacts from a models directory.
+    
+    Returns:
+        (model, imputer, scaler, version), version being a digest of the
+        stage's artifact files
+    """
+    stage_path = os.path.join(models_path, f'stage{stage}')
+    
+    # Load XGBoost model
+    model_file = os.path.join(stage_path, f'stage{stage}_model.json')
+    if os.path.exists(model_file):
+        model = xgb.XGBClassifier()
+        model.load_model(model_file)
+    else:
+        raise FileNotFoundError(f"Model not found: {model_file}")
+    
+    # Load Imputer
+    imputer_file = os.path.join(stage_path, f'stage{stage}_imputer.pkl')
+    if os.path.exists(imputer_file):
+        imputer = joblib.load(imputer_file)
+    else:
+        raise FileNotFoundError(f"Imputer not found: {imputer_file}")
+    
+    # Load Scaler
+    scaler_file = os.path.join(stage_path, f'stage{stage}_scaler.pkl')
+    if os.path.exists(scaler_file):
+        scaler = joblib.load(scaler_file)
+    else:
+        raise FileNotFoundError(f"Scaler not found: {scaler_file}")
+    
+    # Version = digest of the stage's artifact files
+    digest = hashlib.sha256()
+    for path in (model_file, imputer_file, scaler_file):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return model, imputer, scaler, digest.hexdigest()[:16]
+
 
 class ModelLoader:
     """
@@ -15,7 +60,16 @@ class ModelLoader:
     _models = {}
     _imputers = {}
     _scalers = {}
+    _versions = {}
     _loaded = False
+    _generation = 0  # Bumped on every successful load so caches can detect reloads
+    
+    # Compact (float32 / flat-tree) artifacts, verified against the originals
+    compact = False
+    compact_tolerance = 1e-5
+    _verification = {}
+    # Every risk threshold a stage probability is compared against
+    COMPACT_THRESHOLDS = (0.3, 0.6, 0.7)
     
     def __new__(cls, models_path=None):
         if cls._instance is None:
@@ -38,7 +92,10 @@ class ModelLoader:
         try:
             for stage in [1, 2, 3]:
                 self._load_stage(stage)
+                if self.compact:
+                    self._compact_stage(stage)
             self._loaded = True
+            self._generation += 1
             print("✅ MirAI ML models loaded successfully!")
             return True
         except Exception as e:
@@ -47,30 +104,79 @@ class ModelLoader:
     
     def _load_stage(self, stage):
         """Load artifacts for a specific stage."""
-        stage_path = os.path.join(self.models_path, f'stage{stage}')
-        
-        # Load XGBoost model
-        model_file = os.path.join(stage_path, f'stage{stage}_model.json')
-        if os.path.exists(model_file):
-            model = xgb.XGBClassifier()
-            model.load_model(model_file)
-            self._models[stage] = model
-        else:
-            raise FileNotFoundError(f"Model not found: {model_file}")
-        
-        # Load Imputer
-        imputer_file = os.path.join(stage_path, f'stage{stage}_imputer.pkl')
-        if os.path.exists(imputer_file):
-            self._imputers[stage] = joblib.load(imputer_file)
-        else:
-            raise FileNotFoundError(f"Imputer not found: {imputer_file}")
+        model, imputer, scaler, version = load_stage_artifacts(self.models_path, stage)
+        self._models[stage] = model
+        self._imputers[stage] = imputer
+        self._scalers[stage] = scaler
+        self._versions[stage] = version
+    
+    def _compact_stage(self, stage):
+        """Swap in compact artifacts for a stage where they reproduce its predictions."""
+        imputer, scaler, model = original = (self._imputers[stage], self._scalers[stage], self._models[stage])
+        try:
+            trees = CompactTreeEnsemble(model)
+            small_scaler = compact_scaler(scaler)
+            # float32 distances can reorder near-tied KNN neighbours, so the
+            # float64 imputer is kept whenever its float32 copy changes results
+            candidates = (
+                (compact_imputer(imputer), small_scaler, trees),
+                (imputer, small_scaler, trees)
+            )
+            for compact in candidates:
+                # Probe with the imputer's own training rows
+                result = verify_stage(original, compact, imputer._fit_X,
+                                      self.compact_tolerance, self.COMPACT_THRESHOLDS)
+                result['float32_imputer'] = compact[0] is not imputer
+                if result['passed']:
+                    break
+        except Exception as e:
+            result = {'passed': False, 'error': str(e)}
         
-        # Load Scaler
-        scaler_file = os.path.join(stage_path, f'stage{stage}_scaler.pkl')
-        if os.path.exists(scaler_file):
-            self._scalers[stage] = joblib.load(scaler_file)
+        self._verification[stage] = result
+        if result['passed']:
+            self._imputers[stage], self._scalers[stage], self._models[stage] = compact
         else:
-            raise FileNotFoundError(f"Scaler not found: {scaler_file}")
+            print(f"⚠️ Keeping full artifacts for stage {stage}: compact check failed ({result})")
+    
+    def configure(self, compact=False, tolerance=None):
+        """Choose compact or full artifacts; takes effect on the next load."""
+        self.compact = compact
+        if tolerance is not None:
+            self.compact_tolerance = tolerance
+    
+    def memory_report(self):
+        """Per-stage, per-artifact memory in bytes, plus compact verification results."""
+        if not self._loaded:
+            self.load_all()
+        stages = {}
+        for stage in [1, 2, 3]:
+            stages[stage] = {}
+            for name, store in (('model', self._models), ('imputer', self._imputers), ('scaler', self._scalers)):
+                artifact = store.get(stage)
+                if artifact is None:
+                    continue
+                nbytes, estimated = artifact_nbytes(artifact)
+                stages[stage][name] = {
+                    'type': type(artifact).__name__,
+                    'bytes': nbytes,
+                    'estimated': estimated
+                }
+            if stage in self._verification:
+                stages[stage]['compact_check'] = self._verification[stage]
+        return {
+            'compact': self.compact,
+            'total_bytes': sum(a['bytes'] for s in stages.values() for k, a in s.items() if k != 'compact_check'),
+            'stages': stages
+        }
+    
+    def reset(self):
+        """Drop all loaded artifacts so the next access reloads them."""
+        self._models.clear()
+        self._imputers.clear()
+        self._scalers.clear()
+        self._versions.clear()
+        self._verification.clear()
+        self._loaded = False
     
     def get_model(self, stage):
         """Get XGBoost model for a stage."""
@@ -90,9 +196,64 @@ class ModelLoader:
             self.load_all()
         return self._scalers.get(stage)
     
+    def get_version(self, stage):
+        """Get the artifact version (content digest) for a stage."""
+        if not self._loaded:
+            self.load_all()
+        return self._versions.get(stage)
+    
     def is_loaded(self):
         """Check if models are loaded."""
         return self._loaded
+    
+    @property
+    def generation(self):
+        """Load counter; changes whenever artifacts are (re)loaded."""
+        return self._generation
+
+
+class ArtifactSet:
+    """
+    A standalone (non-singleton) set of stage artifacts, e.g. a candidate
+    release to compare against the live ones. Exposes the ModelLoader
+    accessors, so it can back a CascadePipeline.
+    """
+    
+    def __init__(self, models_path):
+        self.models_path = models_path
+        self._models, self._imputers, self._scalers, self._versions = {}, {}, {}, {}
+        self._loaded = False
+    
+    def load_all(self):
+        if not self._loaded:
+            for stage in [1, 2, 3]:
+                (self._models[stage], self._imputers[stage],
+                 self._scalers[stage], self._versions[stage]) = load_stage_artifacts(self.models_path, stage)
+            self._loaded = True
+        return True
+    
+    def get_model(self, stage):
+        self.load_all()
+        return self._models.get(stage)
+    
+    def get_imputer(self, stage):
+        self.load_all()
+        return self._imputers.get(stage)
+    
+    def get_scaler(self, stage):
+        self.load_all()
+        return self._scalers.get(stage)
+    
+    def get_version(self, stage):
+        self.load_all()
+        return self._versions.get(stage)
+    
+    def is_loaded(self):
+        return self._loaded
+    
+    @property
+    def generation(self):
+        return 1 if self._loaded else 0
 
 
 # Global singleton instance
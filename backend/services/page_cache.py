@@ -0,0 +1,94 @@
+"""
+Page Cache Service
+Holds the HTML pages in memory with precompressed variants and ETags, so
+page hits never touch the filesystem.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import Response, request
+
+from .static_assets import brotli, negotiate_encoding
+
+
+class PageCache:
+    """
+    In-memory cache of the frontend HTML pages.
+
+    Pages are read, rewritten to fingerprinted asset URLs and compressed
+    once at startup. With auto_reload enabled (development), each hit
+    checks the file's mtime and rebuilds the entry when it changed.
+    """
+
+    def __init__(self):
+        self.templates_dir = None
+        self.auto_reload = False
+        self.rewrite = None
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, templates_dir, pages, rewrite=None):
+        """Load every page into memory."""
+        self.templates_dir = templates_dir
+        self.auto_reload = app.config.get('PAGE_CACHE_AUTO_RELOAD', app.debug)
+        self.rewrite = rewrite
+        self._pages = {}
+        for name in pages:
+            self._load(name)
+
+    def _load(self, name):
+        path = os.path.join(self.templates_dir, name)
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        if self.rewrite is not None:
+            html = self.rewrite(html)
+
+        body = html.encode('utf-8')
+        variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11)
+
+        entry = {
+            'body': body,
+            'variants': variants,
+            'etag': hashlib.sha256(body).hexdigest()[:16],
+            'mtime': mtime
+        }
+        with self._lock:
+            self._pages[name] = entry
+        return entry
+
+    def _get(self, name):
+        entry = self._pages.get(name)
+        if entry is None:
+            return self._load(name)
+        if self.auto_reload:
+            if os.stat(os.path.join(self.templates_dir, name)).st_mtime_ns != entry['mtime']:
+                return self._load(name)
+        return entry
+
+    def serve(self, name):
+        """Serve a cached page, honouring If-None-Match and Accept-Encoding."""
+        entry = self._get(name)
+        encoding = negotiate_encoding(entry['variants'])
+        etag = f"{entry['etag']}-{encoding}" if encoding else entry['etag']
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = entry['variants'][encoding] if encoding else entry['body']
+            response = Response(body, mimetype='text/html')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+# Global singleton instance
+page_cache = PageCache()
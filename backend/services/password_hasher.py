@@ -0,0 +1,81 @@
+"""
+Password Hasher Service
+Runs bcrypt hashing and verification on a small bounded thread pool so a
+burst of logins or registrations cannot occupy every request thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.extensions import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated and the wait timed out."""
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt executor.
+
+    At most `pool_size` hashes run at once and at most `max_pending` may be
+    queued or running; callers beyond that wait up to `queue_timeout` seconds
+    and then get PasswordHasherBusy. bcrypt releases the GIL while hashing,
+    so with threaded workers prediction requests keep running meanwhile.
+    A pool_size of 0 hashes inline on the calling thread.
+    """
+
+    def __init__(self, pool_size=2, max_pending=8, queue_timeout=5.0, log_rounds=12):
+        self._executor = None
+        self._slots = None
+        self.configure(pool_size, max_pending, queue_timeout, log_rounds)
+
+    def init_app(self, app):
+        """Configure pool limits and bcrypt cost from the Flask config."""
+        self.configure(
+            pool_size=app.config.get('BCRYPT_POOL_SIZE', 2),
+            max_pending=app.config.get('BCRYPT_MAX_PENDING', 8),
+            queue_timeout=app.config.get('BCRYPT_QUEUE_TIMEOUT', 5.0),
+            log_rounds=app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        )
+
+    def configure(self, pool_size, max_pending, queue_timeout, log_rounds):
+        """(Re)build the executor with new limits."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.pool_size = pool_size
+        self.max_pending = max(max_pending, pool_size)
+        self.queue_timeout = queue_timeout
+        self.log_rounds = log_rounds
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix='bcrypt'
+        ) if pool_size > 0 else None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy('Password hashing is busy, please retry')
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password at the configured cost."""
+        return self._run(bcrypt.generate_password_hash, password, self.log_rounds).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different cost factor."""
+        try:
+            return int(password_hash.split('$')[2]) != self.log_rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+
+# Global singleton instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,119 @@
+"""
+Request Profiler Service
+Opt-in cProfile hook for production latency investigations. When disabled
+no request hooks are installed, so it costs nothing.
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+
+from flask import request
+
+
+class RequestProfiler:
+    """
+    Profiles a sampled fraction of requests, or any request that carries
+    the configured token in the X-Profile header.
+
+    Each profile is written as a pstats file under <directory>/<route>/ and
+    only the newest `keep` files per route are retained.
+    """
+
+    HEADER = 'X-Profile'
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.sample_rate = 0.0
+        self.token = None
+        self.keep = 20
+
+    def init_app(self, app):
+        """Install the profiling hooks only when PROFILER_ENABLED is set."""
+        self.enabled = app.config.get('PROFILER_ENABLED', False)
+        self.directory = app.config.get('PROFILER_DIR')
+        self.sample_rate = app.config.get('PROFILER_SAMPLE_RATE', 0.0)
+        self.token = app.config.get('PROFILER_TOKEN') or None
+        self.keep = app.config.get('PROFILER_KEEP', 20)
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.teardown_request(self._stop)
+
+    def is_authorized(self, value):
+        """Constant-time check of a caller-supplied token."""
+        return bool(self.token and value) and hmac.compare_digest(value, self.token)
+
+    def _should_profile(self):
+        if self.is_authorized(request.headers.get(self.HEADER)):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self):
+        if not self._should_profile():
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler is already active on this thread
+            return
+        request.environ['mirai.profile'] = (profile, request.endpoint or 'unknown')
+
+    def _stop(self, exc=None):
+        entry = request.environ.pop('mirai.profile', None)
+        if entry is None:
+            return
+        profile, route = entry
+        profile.disable()
+
+        route_dir = os.path.join(self.directory, self._slug(route))
+        os.makedirs(route_dir, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}_{int(time.time() * 1000) % 1000:03d}_{os.getpid()}.prof"
+        profile.dump_stats(os.path.join(route_dir, filename))
+        self._rotate(route_dir)
+
+    @staticmethod
+    def _slug(route):
+        return re.sub(r'[^A-Za-z0-9_.-]+', '_', route)
+
+    def _rotate(self, route_dir):
+        files = sorted(f for f in os.listdir(route_dir) if f.endswith('.prof'))
+        for stale in files[:-self.keep] if self.keep > 0 else []:
+            try:
+                os.remove(os.path.join(route_dir, stale))
+            except OSError:
+                pass
+
+    def list_profiles(self):
+        """List stored profiles, newest first, grouped by route."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return {}
+        listing = {}
+        for route in sorted(os.listdir(self.directory)):
+            route_dir = os.path.join(self.directory, route)
+            if not os.path.isdir(route_dir):
+                continue
+            listing[route] = [
+                {
+                    'file': name,
+                    'size': os.path.getsize(os.path.join(route_dir, name)),
+                    'created_at': os.path.getmtime(os.path.join(route_dir, name))
+                }
+                for name in sorted(os.listdir(route_dir), reverse=True) if name.endswith('.prof')
+            ]
+        return listing
+
+    def profile_path(self, route, filename):
+        """Resolve a stored profile file, or None if it does not exist."""
+        if self._slug(route) != route or not re.fullmatch(r'[\w.-]+\.prof', filename):
+            return None
+        path = os.path.join(self.directory, route, filename)
+        return path if os.path.isfile(path) else None
+
+
+# Global singleton instance
+request_profiler = RequestProfiler()
@@ -0,0 +1,133 @@
+"""
+Query Accounting Service
+Counts and times the SQL statements each request runs on the main
+database, reports them per request (X-Query-Count / X-Query-Time headers,
+an "sql" span in Server-Timing) and per route (/metrics counters), and
+checks routes against the query budget they declare with @query_budget.
+"""
+import threading
+from time import perf_counter_ns
+
+from flask import current_app, request
+from sqlalchemy import event
+
+from backend.extensions import db
+from backend.services.metrics import metrics, current_spans
+
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A route ran more statements than its declared budget (strict mode)."""
+
+
+def query_budget(limit):
+    """
+    Declare the most SQL statements a route may run per request.
+
+    Place directly under the blueprint's route decorator so the budget is
+    attached to the registered view function.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class QueryAccounting:
+    """
+    Engine event hooks feeding thread-local per-request counters.
+
+    Over-budget requests are logged and counted; with SQL_BUDGET_STRICT
+    (the testing config) they raise QueryBudgetExceeded instead, listing
+    the statements that ran, so a regression fails loudly.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.strict = False
+
+    def init_app(self, app):
+        """Attach the engine listeners and request hooks."""
+        self.enabled = app.config.get('SQL_ACCOUNTING_ENABLED', True)
+        self.strict = app.config.get('SQL_BUDGET_STRICT', False)
+        if not self.enabled:
+            return
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+        app.teardown_request(self._clear)
+
+    @staticmethod
+    def begin():
+        """Start counting statements on the current thread."""
+        _local.count = 0
+        _local.ns = 0
+        _local.statements = []
+
+    @staticmethod
+    def end():
+        """
+        Stop counting.
+
+        Returns:
+            (statement count, total ns, statements), or (None, None, None) if not counting
+        """
+        count = getattr(_local, 'count', None)
+        if count is None:
+            return None, None, None
+        _local.count = None
+        return count, _local.ns, _local.statements
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, 'count', None) is not None:
+            conn.info.setdefault('mirai.query_start', []).append(perf_counter_ns())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, 'count', None) is None:
+            return
+        starts = conn.info.get('mirai.query_start')
+        if not starts:
+            return
+        elapsed = perf_counter_ns() - starts.pop()
+        _local.count += 1
+        _local.ns += elapsed
+        if self.strict:
+            _local.statements.append(statement)
+        spans, _ = current_spans()
+        if spans is not None:
+            spans['sql'] = spans.get('sql', 0) + elapsed
+
+    def _begin(self):
+        self.begin()
+
+    def _finish(self, response):
+        count, ns, statements = self.end()
+        if count is None:
+            return response
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if count or budget is not None:
+            response.headers['X-Query-Count'] = str(count)
+            response.headers['X-Query-Time'] = f'{ns / 1e6:.3f}'
+            metrics.increment('sql_queries', count, route=request.endpoint)
+            metrics.increment('sql_query_seconds', round(ns / 1e9, 6), route=request.endpoint)
+        if budget is not None and count > budget:
+            metrics.increment('sql_budget_exceeded', route=request.endpoint)
+            message = f'{request.endpoint} ran {count} SQL statements (budget {budget})'
+            if self.strict:
+                raise QueryBudgetExceeded(message + ':\n' + '\n'.join(statements))
+            current_app.logger.warning(message)
+        return response
+
+    @staticmethod
+    def _clear(exc=None):
+        _local.count = None
+
+
+# Global singleton instance
+query_accounting = QueryAccounting()
@@ -0,0 +1,198 @@
+"""
+Rate Limiter Service
+Per-user token-bucket admission control. Requests over budget get a 429
+with Retry-After before any JSON parsing or model work happens.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+
+class MemoryBucketStore:
+    """
+    Token buckets held in this worker's memory.
+
+    Stand-in for the shared store on single-worker and development setups;
+    each gunicorn worker enforces its own copy of the budget.
+    """
+
+    def __init__(self, max_keys=50000):
+        self.max_keys = max_keys
+        self.idle_seconds = 3600.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Take one token; return seconds until one is available (0 if taken)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict_idle(now)
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _evict_idle(self, now):
+        """Drop buckets idle for idle_seconds (refilled, so equal to a new bucket)."""
+        idle = [k for k, (_, updated) in self._buckets.items() if now - updated > self.idle_seconds]
+        for key in idle or list(self._buckets)[:len(self._buckets) // 2]:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite file shared by all workers on a host.
+
+    Durability is not needed for counters, so the file runs with
+    synchronous=OFF to keep each take() to a single short transaction.
+    Every PRUNE_INTERVAL seconds a worker deletes buckets idle for
+    idle_seconds, which have refilled and so equal a new bucket; without
+    this the table would keep one row per user and client address ever seen.
+    """
+
+    PRUNE_INTERVAL = 300.0
+
+    def __init__(self, path):
+        self.path = path
+        self.idle_seconds = 3600.0
+        self._local = threading.local()
+        self._next_prune = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        """Take one token; return seconds until one is available (0 if taken)."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if tokens >= 1:
+                tokens -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if now >= self._next_prune:
+            self.prune(now)
+        return wait
+
+    def prune(self, now):
+        """Delete buckets idle for idle_seconds; returns how many were removed."""
+        self._next_prune = now + self.PRUNE_INTERVAL
+        cursor = self._connect().execute('DELETE FROM buckets WHERE updated < ?', (now - self.idle_seconds,))
+        return cursor.rowcount
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter with separate budgets for inference and other API routes.
+
+    Buckets are keyed on the JWT identity, falling back to the client
+    address for unauthenticated requests.
+    """
+
+    INFERENCE_PREFIX = '/api/predict'
+    EXEMPT_PATHS = ('/api/health',)
+
+    def __init__(self):
+        self.enabled = False
+        self.store = MemoryBucketStore()
+        self.budgets = {
+            'inference': (10, 0.5),
+            'default': (60, 5.0)
+        }
+
+    def init_app(self, app):
+        """Configure budgets and store, and install the admission check."""
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.budgets = {
+            'inference': (
+                app.config.get('RATELIMIT_INFERENCE_CAPACITY', 10),
+                app.config.get('RATELIMIT_INFERENCE_PER_SECOND', 0.5)
+            ),
+            'default': (
+                app.config.get('RATELIMIT_DEFAULT_CAPACITY', 60),
+                app.config.get('RATELIMIT_DEFAULT_PER_SECOND', 5.0)
+            )
+        }
+        if app.config.get('RATELIMIT_BACKEND', 'memory') == 'sqlite':
+            self.store = SQLiteBucketStore(app.config['RATELIMIT_DATABASE_PATH'])
+        else:
+            self.store = MemoryBucketStore()
+        # Idle buckets may be dropped once even the slowest budget has refilled
+        self.store.idle_seconds = max(
+            [self.store.idle_seconds] + [capacity / rate for capacity, rate in self.budgets.values() if rate > 0]
+        )
+
+        app.before_request(self._admit)
+
+    def budget_for(self, path):
+        """Return the budget name for a request path, or None if unlimited."""
+        if not path.startswith('/api/') or path in self.EXEMPT_PATHS:
+            return None
+        if path.startswith(self.INFERENCE_PREFIX):
+            return 'inference'
+        return 'default'
+
+    def acquire(self, identity, budget, now=None):
+        """Take a token for identity under budget; return Retry-After seconds (0 = admitted)."""
+        capacity, rate = self.budgets[budget]
+        return self.store.take(f'{budget}:{identity}', capacity, rate, time.time() if now is None else now)
+
+    @staticmethod
+    def _identity():
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        return f'user:{identity}' if identity else f'ip:{request.remote_addr}'
+
+    def _admit(self):
+        if not self.enabled or request.method == 'OPTIONS':
+            return None
+        budget = self.budget_for(request.path)
+        if budget is None:
+            return None
+
+        retry_after = self.acquire(self._identity(), budget)
+        if retry_after > 0:
+            response = jsonify({'success': False, 'error': 'Rate limit exceeded'})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+            return response
+        return None
+
+
+# Global singleton instance
+rate_limiter = RateLimiter()
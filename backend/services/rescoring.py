@@ -0,0 +1,301 @@
+"""
+Assessment Scorer
+Dependency-tracked scoring of stored assessments. Every stage's stored
+output is tagged with a hash of its inputs, its upstream stage's tag and
+the model version, so an edit recomputes only the stages downstream of
+the change and a model upgrade only touches results that would move.
+"""
+import hashlib
+import json
+
+from .inference import InferenceService
+from .metrics import span
+from .model_loader import model_loader
+from .risk_engine import RiskEngine
+from .surrogate import surrogate_models
+
+
+# Request fields feeding each stage
+STAGE_FIELDS = {
+    1: ('age', 'gender', 'education', 'faq', 'ecogMem', 'ecogTotal'),
+    2: ('genotype',),
+    3: ('ptau217', 'ab42', 'ab40', 'nfl')
+}
+
+# Assessment columns holding each stage's stored inputs, by request field
+STORED_FIELDS = {
+    'age': 'age', 'gender': 'gender', 'education': 'education', 'faq': 'faq_score',
+    'ecogMem': 'ecog_mem', 'ecogTotal': 'ecog_total',
+    'genotype': 'apoe_genotype',
+    'ptau217': 'ptau217', 'ab42': 'ab42', 'ab40': 'ab40', 'nfl': 'nfl'
+}
+
+
+def _digest(*parts):
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class AssessmentScorer:
+    """
+    Applies stage inputs to an Assessment and recomputes what they affect.
+
+    A stage's tag covers its model features (the same mapping the models
+    see), the upstream stage's tag and the stage's artifact version. The
+    final tag covers the three stage tags and the RiskEngine parameters.
+    A stage whose tag already matches is left untouched.
+
+    While the distilled surrogates serve a request, recomputed stages are
+    tagged with the surrogate version, and stored results tagged with the
+    primary version still count as current. A later pass with the primary
+    models (an edit, or rescore-assessments) replaces surrogate results.
+    """
+
+    FUSION_VERSION = _digest(
+        RiskEngine.STAGE1_WEIGHT, RiskEngine.STAGE2_WEIGHT, RiskEngine.STAGE3_WEIGHT,
+        RiskEngine.LOW_THRESHOLD, RiskEngine.HIGH_THRESHOLD
+    )
+
+    @staticmethod
+    def stored_inputs(assessment, stage):
+        """
+        The request-style inputs an assessment holds for a stage. Fields the
+        submission omitted are stored as NULL and left out here, so the
+        request defaults apply exactly as they did when the stage was scored.
+        """
+        inputs = {}
+        for field in STAGE_FIELDS[stage]:
+            value = getattr(assessment, STORED_FIELDS[field])
+            if value is not None:
+                inputs[field] = value
+        return inputs
+
+    @staticmethod
+    def features(stage, data):
+        """Model features of a stage, excluding the upstream probability."""
+        if stage == 1:
+            return InferenceService.build_stage1_features(data)
+        if stage == 2:
+            return {'APOE4_Count': InferenceService.count_apoe4(data.get('genotype', ''))}
+        features = InferenceService.build_stage3_features(data, 0.0)
+        del features['Stage2_Prob']
+        return features
+
+    @classmethod
+    def stage_tag(cls, stage, data, upstream_tag, version=None):
+        """Tag identifying a stage's output: its features, upstream tag and model version."""
+        version = version or model_loader.get_version(stage)
+        return _digest(stage, cls.features(stage, data), upstream_tag, version)
+
+    @classmethod
+    def current_tags(cls, stage, data, upstream_tag, fallback=None):
+        """Tags a stored result may carry and still be current; a recomputed result takes the first."""
+        if not fallback:
+            return (cls.stage_tag(stage, data, upstream_tag),)
+        return (
+            cls.stage_tag(stage, data, upstream_tag, surrogate_models.get_version(stage)),
+            cls.stage_tag(stage, data, upstream_tag, surrogate_models.primary_version(stage))
+        )
+
+    @classmethod
+    def final_tag(cls, assessment):
+        return _digest(assessment.stage1_hash, assessment.stage2_hash, assessment.stage3_hash, cls.FUSION_VERSION)
+
+    @classmethod
+    def provisional_tag(cls, assessment, exit_stage):
+        """Tag of a provisional final fused over stages 1..exit_stage."""
+        hashes = [getattr(assessment, f'stage{s}_hash') for s in range(1, exit_stage + 1)]
+        return _digest('provisional', *hashes, cls.FUSION_VERSION)
+
+    @staticmethod
+    def stored_result(assessment, stage, data):
+        """Rebuild a stage's InferenceService-style result from stored values."""
+        if stage == 1:
+            return {
+                'success': True,
+                'stage': 1,
+                'probability': assessment.stage1_probability,
+                'risk_level': assessment.stage1_risk,
+                'factors': InferenceService.stage1_factors(InferenceService.build_stage1_features(data))
+            }
+        if stage == 2:
+            return {
+                'success': True,
+                'stage': 2,
+                'probability': assessment.stage2_probability,
+                'risk_level': assessment.stage2_risk,
+                'apoe4_count': assessment.apoe4_count,
+                'genetic_insight': InferenceService.genetic_insight(assessment.apoe4_count, data.get('genotype', ''))
+            }
+        return {
+            'success': True,
+            'stage': 3,
+            'probability': assessment.stage3_probability,
+            'risk_level': assessment.stage3_risk,
+            'biomarker_insight': InferenceService.biomarker_insight(float(data.get('ptau217') or 0))
+        }
+
+    @staticmethod
+    def _predict(stage, data, upstream_probability, fallback=None):
+        if stage == 1:
+            return InferenceService.predict_stage1(data, fallback=fallback)
+        if stage == 2:
+            return InferenceService.predict_stage2(data, upstream_probability, fallback=fallback)
+        return InferenceService.predict_stage3(data, upstream_probability, fallback=fallback)
+
+    @staticmethod
+    def _store(assessment, stage, data, result):
+        if stage == 1:
+            assessment.update_stage1(data, result['probability'], result['risk_level'])
+        elif stage == 2:
+            assessment.update_stage2(data, result['probability'], result['risk_level'], result['apoe4_count'])
+        else:
+            assessment.update_stage3(data, result['probability'], result['risk_level'])
+
+    @staticmethod
+    def _completed(assessment, stage):
+        return bool(getattr(assessment, f'stage{stage}_completed'))
+
+    def apply(self, assessment, stage=None, data=None, fallback=None):
+        """
+        Apply new inputs for one stage (or none, to re-check after a model
+        upgrade) and recompute every stage whose tag no longer matches,
+        with the surrogate models when a fallback reason is given.
+
+        Only stages that are completed, or the stage being submitted, are
+        considered. Nothing is committed; the caller commits once.
+
+        Returns:
+            dict with results (stage -> result, recomputed or rebuilt from
+            stored values), rescored (list of recomputed stages),
+            final_assessment (set if the final result was recomputed; a
+            provisional final is refitted over the stages now completed),
+            fallback (the reason, if the surrogates recomputed a stage), and
+            on failure success False with the failing stage and error
+        """
+        results = {}
+        rescored = []
+        upstream_tag = None
+        upstream_probability = None
+
+        for s in (1, 2, 3):
+            if s != stage and not self._completed(assessment, s):
+                break
+            inputs = data if s == stage else self.stored_inputs(assessment, s)
+            tags = self.current_tags(s, inputs, upstream_tag, fallback)
+            stored_tag = getattr(assessment, f'stage{s}_hash')
+
+            if stored_tag in tags and self._completed(assessment, s):
+                tag = stored_tag
+                results[s] = self.stored_result(assessment, s, inputs)
+            else:
+                tag = tags[0]
+                result = self._predict(s, inputs, upstream_probability, fallback)
+                if not result['success']:
+                    return {'success': False, 'stage': s, 'error': result.get('error')}
+                self._store(assessment, s, inputs, result)
+                setattr(assessment, f'stage{s}_hash', tag)
+                results[s] = result
+                rescored.append(s)
+
+            upstream_tag = tag
+            upstream_probability = results[s]['probability']
+
+        outcome = {'success': True, 'results': results, 'rescored': rescored, 'final_assessment': None,
+                   'fallback': fallback if rescored else None}
+        if all(self._completed(assessment, s) for s in (1, 2, 3)):
+            tag = self.final_tag(assessment)
+            if tag != assessment.final_hash:
+                with span('fusion'):
+                    final_assessment = RiskEngine.generate_full_assessment(
+                        assessment.stage1_probability,
+                        assessment.stage2_probability,
+                        assessment.stage3_probability
+                    )
+                assessment.update_final_results(
+                    final_score=final_assessment['final_risk_probability'],
+                    category=final_assessment['risk_category'],
+                    recommendation=final_assessment['escalation_recommendation']
+                )
+                assessment.final_hash = tag
+                outcome['final_assessment'] = final_assessment
+        elif assessment.provisional_stage:
+            exit_stage = 2 if self._completed(assessment, 2) else 1
+            tag = self.provisional_tag(assessment, exit_stage)
+            if tag != assessment.final_hash:
+                with span('fusion'):
+                    final_assessment = RiskEngine.generate_provisional_assessment(
+                        assessment.stage1_probability,
+                        assessment.stage2_probability if exit_stage == 2 else None
+                    )
+                assessment.update_final_results(
+                    final_score=final_assessment['final_risk_probability'],
+                    category=final_assessment['risk_category'],
+                    recommendation=final_assessment['escalation_recommendation'],
+                    provisional_stage=exit_stage
+                )
+                assessment.final_hash = tag
+                outcome['final_assessment'] = final_assessment
+        return outcome
+
+    def tag(self, assessment, data, fallback=None):
+        """Tag stages that were scored elsewhere (e.g. the fused cascade) from their request data."""
+        upstream_tag = None
+        for s in (1, 2, 3):
+            if not self._completed(assessment, s):
+                if assessment.provisional_stage:
+                    assessment.final_hash = self.provisional_tag(assessment, s - 1)
+                return
+            upstream_tag = self.current_tags(s, data, upstream_tag, fallback)[0]
+            setattr(assessment, f'stage{s}_hash', upstream_tag)
+        assessment.final_hash = self.final_tag(assessment)
+
+    def rescore_all(self, batch_size=500):
+        """
+        Re-check every hot assessment after a model upgrade, committing per
+        batch. Each assessment is rescored completely or not at all; those
+        whose tags all match are skipped without inference.
+
+        Returns:
+            dict of counts: examined, unchanged, failed, and per-stage /
+            final recomputations
+        """
+        from backend.extensions import db
+        from backend.models import Assessment
+
+        stats = {'examined': 0, 'unchanged': 0, 'failed': 0, 'stage1': 0, 'stage2': 0, 'stage3': 0, 'final': 0}
+        last_id = 0
+        while True:
+            batch = Assessment.query.filter(
+                Assessment.id > last_id,
+                Assessment.stage1_completed.is_(True)
+            ).order_by(Assessment.id).limit(batch_size).all()
+            if not batch:
+                break
+            for assessment in batch:
+                stats['examined'] += 1
+                # One savepoint per assessment: a failure part-way rolls back the
+                # stages it already re-stored, so none is left half rescored
+                savepoint = db.session.begin_nested()
+                try:
+                    outcome = self.apply(assessment)
+                except Exception as e:
+                    outcome = {'success': False, 'error': str(e)}
+                if not outcome['success']:
+                    savepoint.rollback()
+                    stats['failed'] += 1
+                    continue
+                savepoint.commit()
+                for s in outcome['rescored']:
+                    stats[f'stage{s}'] += 1
+                if outcome['final_assessment'] is not None:
+                    stats['final'] += 1
+                if not outcome['rescored'] and outcome['final_assessment'] is None:
+                    stats['unchanged'] += 1
+            db.session.commit()
+            last_id = batch[-1].id
+        return stats
+
+
+# Global singleton instance
+assessment_scorer = AssessmentScorer()
@@ -90,6 +90,63 @@ class RiskEngine:
         }
         return recommendations.get(risk_category, recommendations['Low'])
     
+    @classmethod
+    def provisional_weights(cls, completed_stages):
+        """
+        Fusion weights renormalized over the first `completed_stages` stages.
+
+        Args:
+            completed_stages: 1, 2 or 3
+
+        Returns:
+            Tuple of weights summing to 1
+        """
+        weights = (cls.STAGE1_WEIGHT, cls.STAGE2_WEIGHT, cls.STAGE3_WEIGHT)[:completed_stages]
+        total = sum(weights)
+        return tuple(w / total for w in weights)
+
+    @classmethod
+    def generate_provisional_assessment(cls, stage1_prob, stage2_prob=None):
+        """
+        Generate a provisional assessment when the cascade exits early.
+
+        Stages that were not run are left out and the remaining weights are
+        renormalized, so a confident Stage 1 result stands on its own.
+
+        Args:
+            stage1_prob: Clinical screening probability
+            stage2_prob: Genetic stratification probability, or None if Stage 2 was skipped
+
+        Returns:
+            dict shaped like generate_full_assessment, marked provisional
+        """
+        probs = [stage1_prob] if stage2_prob is None else [stage1_prob, stage2_prob]
+        weights = cls.provisional_weights(len(probs))
+        final_risk = min(max(sum(w * p for w, p in zip(weights, probs)), 0.0), 1.0)
+        category = cls.get_risk_category(final_risk)
+
+        return {
+            'final_risk_score': round(final_risk * 100, 1),
+            'final_risk_probability': final_risk,
+            'risk_category': category,
+            'escalation_recommendation': cls.get_escalation_recommendation(category),
+            'provisional': True,
+            'early_exit_stage': len(probs),
+            'pipeline_breakdown': {
+                f'stage{i}': {
+                    'probability': round(p * 100, 1),
+                    'weight': f"{w * 100:.0f}%",
+                    'contribution': round(w * p * 100, 1)
+                }
+                for i, (w, p) in enumerate(zip(weights, probs), start=1)
+            },
+            'disclaimer': (
+                "IMPORTANT: This is a provisional screening result from an early-exit triage run "
+                "and is NOT a diagnosis. Later stages were skipped because earlier results were "
+                "confident. Please consult a qualified healthcare provider for proper clinical evaluation."
+            )
+        }
+
     @classmethod
     def generate_full_assessment(cls, stage1_prob, stage2_prob, stage3_prob):
         """
@@ -0,0 +1,191 @@
+"""
+Static Asset Pipeline
+Build-time fingerprinting and gzip/brotli precompression of static assets,
+and a request-time server that picks the right variant without compressing.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+
+# Text assets worth precompressing (images and fonts are already compressed)
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.scss'}
+MANIFEST_NAME = 'manifest.json'
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'public, no-cache'
+
+ASSET_REFERENCE = re.compile(r'((?:href|src)=")(assets/[^"?#]+)(")')
+
+
+def negotiate_encoding(variants):
+    """Pick the best precompressed variant the client accepts (br, then gzip)."""
+    if not variants:
+        return None
+    accepted = request.accept_encodings
+    if 'br' in variants and accepted['br']:
+        return 'br'
+    if 'gzip' in variants and accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def fingerprinted_name(path, digest):
+    """Insert a content hash before the extension: main.css -> main.<hash>.css."""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+
+class StaticAssetPipeline:
+    """
+    Serves files under the static directory using a build manifest.
+
+    Each manifest entry maps a logical path (e.g. 'assets/css/main.css') to
+    its fingerprinted name, strong ETag, MIME type and precompressed
+    variants. Fingerprinted URLs are cached as immutable; logical URLs are
+    revalidated against the ETag.
+    """
+
+    def __init__(self, static_dir=None, output_dir=None):
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.manifest = {}
+        self._by_fingerprint = {}
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(self, source_subdir='assets'):
+        """
+        Fingerprint and precompress every file under static_dir/source_subdir.
+
+        Returns:
+            The manifest dict (also written to output_dir/manifest.json)
+        """
+        manifest = {}
+        source_root = os.path.join(self.static_dir, source_subdir)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        for dirpath, _, filenames in os.walk(source_root):
+            for filename in sorted(filenames):
+                full_path = os.path.join(dirpath, filename)
+                logical = os.path.relpath(full_path, self.static_dir).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    content = f.read()
+
+                digest = hashlib.sha256(content).hexdigest()[:12]
+                entry = {
+                    'fingerprinted': fingerprinted_name(logical, digest),
+                    'etag': digest,
+                    'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    'size': len(content),
+                    'variants': {}
+                }
+
+                if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                    compressed = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+                    if brotli is not None:
+                        compressed['br'] = brotli.compress(content, quality=11)
+                    for encoding, data in compressed.items():
+                        if len(data) >= len(content):
+                            continue
+                        suffix = '.br' if encoding == 'br' else '.gz'
+                        variant = entry['fingerprinted'] + suffix
+                        variant_path = os.path.join(self.output_dir, variant)
+                        os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+                        with open(variant_path, 'wb') as f:
+                            f.write(data)
+                        entry['variants'][encoding] = variant
+
+                manifest[logical] = entry
+
+        with open(os.path.join(self.output_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+        self._set_manifest(manifest)
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Runtime
+    # ------------------------------------------------------------------
+    def init_app(self, app, static_dir, output_dir):
+        """Load the build manifest if one exists; otherwise serve files as-is."""
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._set_manifest(json.load(f))
+        else:
+            self._set_manifest({})
+
+    def _set_manifest(self, manifest):
+        self.manifest = manifest
+        self._by_fingerprint = {entry['fingerprinted']: logical for logical, entry in manifest.items()}
+
+    def is_built(self):
+        """True when a manifest is loaded."""
+        return bool(self.manifest)
+
+    def asset_url(self, logical):
+        """Return the fingerprinted path for a logical asset path, if known."""
+        entry = self.manifest.get(logical)
+        return entry['fingerprinted'] if entry else logical
+
+    def rewrite_html(self, html):
+        """Point href/src references to assets/... at their fingerprinted names."""
+        if not self.manifest:
+            return html
+        return ASSET_REFERENCE.sub(
+            lambda m: m.group(1) + self.asset_url(m.group(2)) + m.group(3), html
+        )
+
+    def serve(self, path):
+        """
+        Serve a logical or fingerprinted path from the manifest.
+
+        Returns:
+            A response, or None if the path is not in the manifest
+        """
+        logical = self._by_fingerprint.get(path)
+        immutable = logical is not None
+        if logical is None:
+            logical = path
+        entry = self.manifest.get(logical)
+        if entry is None:
+            return None
+
+        encoding = negotiate_encoding(entry['variants'])
+        etag = f"{entry['etag']}-{encoding}" if encoding else entry['etag']
+        cache_control = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            if encoding:
+                file_path = os.path.join(self.output_dir, entry['variants'][encoding])
+            else:
+                file_path = os.path.join(self.static_dir, logical)
+            response = send_file(file_path, mimetype=entry['mimetype'], etag=False, conditional=False)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        if entry['variants']:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+# Global singleton instance
+static_assets = StaticAssetPipeline()
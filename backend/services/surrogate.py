@@ -0,0 +1,219 @@
+"""
+Surrogate Models
+Distilled fallback for the three stage models: one small regression tree
+per stage, fitted to the primary pipeline's outputs by build_surrogates.py
+and stored as plain arrays in a JSON file. Scoring a row is a handful of
+comparisons, with no imputer, scaler or booster. The surrogates serve
+automatically while the primary artifacts cannot be loaded, and optionally
+shed load when requests have queued for too long. Every response they
+produce is flagged.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from flask import has_request_context, request
+
+from .metrics import metrics
+from .model_loader import model_loader
+
+
+SURROGATE_FORMAT = 1
+
+PRIMARY_UNAVAILABLE = 'primary_unavailable'
+LOAD_SHEDDING = 'load_shedding'
+
+
+class SurrogateTree:
+    """
+    One stage's distilled tree.
+
+    Internal nodes send a row left when feature <= threshold, and a
+    missing (NaN) feature the way the fitted tree learned to route it;
+    leaves (feature -1) hold the probability.
+    """
+
+    def __init__(self, spec):
+        self.features = spec['features']
+        self.feature = spec['feature']
+        self.threshold = spec['threshold']
+        self.left = spec['left']
+        self.right = spec['right']
+        self.missing_left = spec['missing_left']
+        self.value = spec['value']
+        self.fidelity = spec.get('fidelity', {})
+
+    def predict_one(self, row):
+        """Probability for one row of stage features (in model column order)."""
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        node = 0
+        f = feature[0]
+        while f >= 0:
+            x = row[f]
+            if x <= threshold[node]:
+                node = left[node]
+            elif x != x:   # NaN
+                node = left[node] if self.missing_left[node] else right[node]
+            else:
+                node = right[node]
+            f = feature[node]
+        return self.value[node]
+
+    def predict(self, X):
+        """Probabilities for the rows of a 2-D array (the CompiledStage interface)."""
+        return np.array([self.predict_one(row) for row in np.asarray(X, dtype=np.float64).tolist()])
+
+
+class SurrogateModels:
+    """
+    Loads the surrogate file and decides, per prediction request, whether
+    the fallback serves it.
+
+    The decision is made once per request (before the view runs) and read
+    back with fallback_reason(), so every stage a request scores uses the
+    same models. Load shedding compares a moving average of how long
+    prediction requests waited before reaching the app (the ASGI inference
+    queue, or the proxy's X-Request-Start) against SURROGATE_SHED_QUEUE_MS.
+    """
+
+    PREFIXES = ('/api/predict/',)
+    SHED_SMOOTHING = 0.2
+
+    def __init__(self):
+        self.enabled = True
+        self.path = None
+        self.retry_seconds = 30.0
+        self.shed_queue_ms = 0.0
+        self.stages = {}
+        self.version = None
+        self.teacher_versions = {}
+        self.created_at = None
+        self.queue_ms = 0.0
+        self._next_retry = 0.0
+
+    def init_app(self, app):
+        """Load the surrogates and install the per-request decision hooks."""
+        self.enabled = app.config.get('SURROGATE_ENABLED', True)
+        self.path = app.config.get('SURROGATE_PATH') or os.path.join(
+            app.config.get('ML_MODELS_PATH', model_loader.models_path), 'surrogates.json')
+        self.retry_seconds = app.config.get('SURROGATE_RETRY_SECONDS', self.retry_seconds)
+        self.shed_queue_ms = app.config.get('SURROGATE_SHED_QUEUE_MS', self.shed_queue_ms)
+        if not self.enabled:
+            return
+        self.load()
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+
+    def load(self, path=None):
+        """Read a surrogate file; returns False (surrogates unavailable) if it is missing or unreadable."""
+        path = path or self.path
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw)
+            if data.get('format') != SURROGATE_FORMAT:
+                raise ValueError(f"unsupported format {data.get('format')}")
+            self.stages = {int(stage): SurrogateTree(spec) for stage, spec in data['stages'].items()}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Surrogate models unavailable ({path}): {e}")
+            self.stages = {}
+            return False
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        self.teacher_versions = {int(stage): v for stage, v in data.get('teacher_versions', {}).items()}
+        self.created_at = data.get('created_at')
+        return True
+
+    def is_loaded(self):
+        return len(self.stages) == 3
+
+    def stage_models(self):
+        """Surrogate stages 1-3, in the order CascadePipeline.stages() returns them."""
+        return [self.stages[stage] for stage in (1, 2, 3)]
+
+    def predict_one(self, stage, row):
+        return self.stages[stage].predict_one(row)
+
+    def get_version(self, stage):
+        """Version recorded in stage tags of surrogate-scored results (one per surrogate file)."""
+        return f'surrogate-{self.version}'
+
+    def primary_version(self, stage):
+        """The primary stage version, without forcing a load attempt while it is unavailable."""
+        if model_loader.is_loaded():
+            return model_loader.get_version(stage)
+        return self.teacher_versions.get(stage)
+
+    # ------------------------------------------------------------------
+    # Per-request decision
+    # ------------------------------------------------------------------
+    def primary_available(self):
+        """True once the primary artifacts are loaded; retries a failed load every retry_seconds."""
+        if model_loader.is_loaded():
+            return True
+        now = time.monotonic()
+        if now < self._next_retry:
+            return False
+        self._next_retry = now + self.retry_seconds
+        return model_loader.load_all()
+
+    def decide(self, queue_ms=None):
+        """Fallback reason for a request that waited queue_ms before reaching the app, or None."""
+        if not self.enabled or not self.is_loaded():
+            return None
+        if not self.primary_available():
+            return PRIMARY_UNAVAILABLE
+        if self.shed_queue_ms > 0:
+            if queue_ms is not None:
+                self.queue_ms += self.SHED_SMOOTHING * (queue_ms - self.queue_ms)
+            if self.queue_ms > self.shed_queue_ms:
+                return LOAD_SHEDDING
+        return None
+
+    def fallback_reason(self):
+        """The current request's fallback reason (None: use the primary models)."""
+        if has_request_context() and 'mirai.fallback' in request.environ:
+            return request.environ['mirai.fallback']
+        return self.decide()
+
+    def flag(self, reason):
+        """Mark the current response as served by the surrogates; returns the response flag."""
+        if has_request_context():
+            request.environ['mirai.fallback_served'] = reason
+        return {
+            'model': 'surrogate',
+            'reason': reason,
+            'version': self.version,
+            'message': 'Scored by the distilled fallback model; results are approximate.'
+        }
+
+    @staticmethod
+    def queue_wait_ms():
+        """How long this request queued before reaching the app, if known."""
+        enqueued = request.environ.get('mirai.enqueued')
+        if enqueued is None:
+            header = request.headers.get('X-Request-Start', '')
+            try:
+                enqueued = float(header[2:] if header.startswith('t=') else header)
+            except ValueError:
+                return None
+            # Proxies send seconds, milliseconds or microseconds since the epoch
+            while enqueued > 1e11:
+                enqueued /= 1000.0
+        return max((time.time() - enqueued) * 1000.0, 0.0)
+
+    def _begin(self):
+        if request.path.startswith(self.PREFIXES):
+            request.environ['mirai.fallback'] = self.decide(self.queue_wait_ms())
+
+    def _finish(self, response):
+        reason = request.environ.pop('mirai.fallback_served', None)
+        if reason is not None:
+            response.headers['X-Model-Fallback'] = f'surrogate; reason={reason}'
+            metrics.increment('fallback_responses', reason=reason, route=request.endpoint)
+        return response
+
+
+# Global singleton instance
+surrogate_models = SurrogateModels()
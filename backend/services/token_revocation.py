@@ -0,0 +1,116 @@
+"""
+Token Revocation Service
+In-memory, expiry-bucketed revocation list for JWTs, kept in sync across
+gunicorn workers through a small shared SQLite file.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenRevocationList:
+    """
+    Revoked `jti` values grouped into buckets by expiry time.
+
+    The per-request check is a dict lookup. Whole buckets are dropped once
+    every token in them has expired, so memory is bounded by the number of
+    tokens revoked within one JWT lifetime. Other workers' revocations are
+    pulled from the shared store at most once per `sync_interval` seconds,
+    reading only rows newer than the last one seen.
+    """
+
+    def __init__(self, path=None, bucket_seconds=300, sync_interval=1.0):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.sync_interval = sync_interval
+        self._index = {}      # jti -> bucket
+        self._buckets = {}    # bucket -> set of jti
+        self._last_rowid = 0
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Configure the shared store and register the JWT blocklist check."""
+        from backend.extensions import jwt
+
+        self.path = app.config.get('TOKEN_REVOCATION_DATABASE_PATH', self.path)
+        self.sync_interval = app.config.get('TOKEN_REVOCATION_SYNC_SECONDS', self.sync_interval)
+
+        @jwt.token_in_blocklist_loader
+        def check_if_token_revoked(jwt_header, jwt_payload):
+            return self.is_revoked(jwt_payload.get('jti'))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS revoked_tokens ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'jti TEXT UNIQUE NOT NULL, expires_at INTEGER NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def _add_local(self, jti, expires_at):
+        bucket = int(expires_at) // self.bucket_seconds
+        self._index[jti] = bucket
+        self._buckets.setdefault(bucket, set()).add(jti)
+
+    def _prune(self, now):
+        """Drop buckets whose tokens have all expired."""
+        current = int(now) // self.bucket_seconds
+        for bucket in [b for b in self._buckets if b < current]:
+            for jti in self._buckets.pop(bucket):
+                self._index.pop(jti, None)
+        self._next_prune = (current + 1) * self.bucket_seconds
+
+    def _sync(self, now):
+        """Pull revocations written by other workers since the last sync."""
+        self._next_sync = now + self.sync_interval
+        if not self.path:
+            return
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT seq, jti, expires_at FROM revoked_tokens WHERE seq > ? ORDER BY seq',
+            (self._last_rowid,)
+        ).fetchall()
+        for seq, jti, expires_at in rows:
+            if expires_at > now:
+                self._add_local(jti, expires_at)
+            self._last_rowid = seq
+
+    def revoke(self, jti, expires_at):
+        """Revoke a token until its expiry time (epoch seconds)."""
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._add_local(jti, expires_at)
+        if self.path:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                (jti, int(expires_at))
+            )
+            conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (int(now),))
+
+    def is_revoked(self, jti):
+        """Return True if the token id has been revoked."""
+        now = time.time()
+        if now >= self._next_sync or now >= self._next_prune:
+            with self._lock:
+                if now >= self._next_prune:
+                    self._prune(now)
+                if now >= self._next_sync:
+                    self._sync(now)
+        return jti in self._index
+
+
+# Global singleton instance
+token_revocation = TokenRevocationList()
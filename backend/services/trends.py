@@ -0,0 +1,129 @@
+"""
+Risk Trend Tracker
+Keeps each user's RiskTrend row in step with their assessments. Every
+flush that completes (or re-scores) an assessment updates the row in the
+same transaction, so reading a trend is a single primary-key lookup.
+"""
+from sqlalchemy import event, inspect
+
+from .archive import assessment_archive
+
+
+# Assessment attributes that define a trend point
+POINT_ATTRIBUTES = ('completed_at', 'final_risk_score', 'final_risk_category',
+                    'stage1_probability', 'stage2_probability', 'stage3_probability')
+
+
+class RiskTrendTracker:
+    """
+    Session hook plus read/rebuild helpers for RiskTrend.
+
+    A re-scored assessment is removed from the summary with its old
+    values and added back with the new ones. Rows created for users who
+    may already have history, and rows whose exact update needs history
+    (see RiskTrend.remove_point), are marked stale and rebuilt once on
+    the next read.
+    """
+
+    def init_app(self, app):
+        """Install the before_flush hook on the app's session."""
+        from backend.extensions import db
+
+        if not event.contains(db.session, 'before_flush', self._before_flush):
+            event.listen(db.session, 'before_flush', self._before_flush)
+
+    @staticmethod
+    def _point(values):
+        from backend.models.risk_trend import RiskTrend
+
+        if values['completed_at'] is None or values['final_risk_score'] is None:
+            return None
+        return values['completed_at'], values['final_risk_category'], RiskTrend.point_values(
+            values['final_risk_score'], values['stage1_probability'],
+            values['stage2_probability'], values['stage3_probability']
+        )
+
+    def _before_flush(self, session, flush_context, instances):
+        from backend.models import Assessment, RiskTrend
+
+        for obj in list(session.new) + list(session.dirty):
+            if not isinstance(obj, Assessment) or obj.user_id is None:
+                continue
+            state = inspect(obj)
+            old, new, changed = {}, {}, False
+            for name in POINT_ATTRIBUTES:
+                history = state.attrs[name].history
+                changed |= history.has_changes()
+                old[name] = (history.deleted or history.unchanged or [None])[0]
+                new[name] = getattr(obj, name)
+            if not changed:
+                continue
+            old_point = None if obj in session.new else self._point(old)
+            new_point = self._point(new)
+            if old_point == new_point:
+                continue
+
+            with session.no_autoflush:
+                trend = session.get(RiskTrend, obj.user_id)
+                if trend is None:
+                    trend = RiskTrend(obj.user_id)
+                    trend.stale = True   # earlier history (if any) is folded in on first read
+                    session.add(trend)
+            if old_point is not None and trend.origin is not None:
+                trend.remove_point(*old_point)
+            if new_point is not None:
+                trend.add_point(*new_point)
+
+    def rebuild(self, user_id):
+        """Recompute a user's trend from the full history (hot table and archive)."""
+        from backend.extensions import db
+        from backend.models import RiskTrend
+
+        return self._rebuild(user_id, db.session.get(RiskTrend, user_id))
+
+    def _rebuild(self, user_id, trend):
+        """Rebuild into an already-loaded row (None creates it)."""
+        from backend.extensions import db
+        from backend.models import Assessment, RiskTrend
+
+        hot = Assessment.query.filter(
+            Assessment.user_id == user_id,
+            Assessment.completed_at.isnot(None),
+            Assessment.final_risk_score.isnot(None)
+        ).all()
+        hot_ids = {a.id for a in hot}
+        archived = [a for a in assessment_archive.get_user_assessments(user_id)
+                    if a.id not in hot_ids and a.completed_at is not None and a.final_risk_score is not None]
+
+        if trend is None:
+            trend = RiskTrend(user_id)
+            db.session.add(trend)
+        trend.reset()
+        for a in sorted(hot + archived, key=lambda a: a.completed_at):
+            trend.add_point(*self._point({name: getattr(a, name) for name in POINT_ATTRIBUTES}))
+        trend.stale = False
+        db.session.commit()
+        return trend
+
+    def get(self, user_id):
+        """A user's trend, rebuilt first only if missing or stale."""
+        from backend.extensions import db
+        from backend.models import RiskTrend
+
+        trend = db.session.get(RiskTrend, user_id)
+        if trend is None or trend.stale:
+            trend = self._rebuild(user_id, trend)
+        return trend
+
+    def rebuild_all(self):
+        """Rebuild every user's trend; returns the number of users."""
+        from backend.models import User
+
+        user_ids = [row[0] for row in User.query.with_entities(User.id).all()]
+        for user_id in user_ids:
+            self.rebuild(user_id)
+        return len(user_ids)
+
+
+# Global singleton instance
+risk_trends = RiskTrendTracker()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Async vs. Sync Serving Benchmark
+Starts the app under gunicorn sync workers and under the ASGI server
+(asgi.py on uvicorn) with the same worker count, then drives a mixed load:
+full-cascade predictions alongside bcrypt-heavy logins. Reports prediction
+throughput and latency percentiles for each mode.
+
+    python bench_async_serving.py --workers 2 --concurrency 16 --requests 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FULL_PAYLOAD = {
+    'age': 72, 'gender': 'Female', 'education': 16, 'faq': 5, 'ecogMem': 2.5, 'ecogTotal': 2.0,
+    'genotype': '3/4', 'ptau217': 0.5, 'ab42': 15.2, 'ab40': 180.5, 'nfl': 22.0
+}
+
+
+def post(url, payload, token=None, timeout=60):
+    """POST JSON and return (status, parsed body)."""
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(), headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b'{}')
+    except urllib.error.HTTPError as e:
+        return e.code, {}
+
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/health', timeout=2):
+                return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def drive(base_url, concurrency, total, login_share):
+    """Run the mixed load and return prediction latencies (ms) and elapsed seconds."""
+    credentials = {'email': 'bench-async@example.com', 'password': 'bench-password'}
+    post(f'{base_url}/api/auth/register', credentials)
+    _, body = post(f'{base_url}/api/auth/login', credentials)
+    token = body['access_token']
+
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        for i in counter:
+            if login_share and i % login_share == 0:
+                post(f'{base_url}/api/auth/login', credentials)
+                continue
+            t0 = time.perf_counter()
+            status, _ = post(f'{base_url}/api/predict/full', FULL_PAYLOAD, token)
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes (same for both modes)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--login-every', type=int, default=5, help='Every Nth request is a login (0 = none)')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mirai-bench-'), 'bench.db')}"
+    env['RATELIMIT_ENABLED'] = 'false'
+    env['FLASK_ENV'] = 'production'
+
+    modes = {
+        'gunicorn sync': ['gunicorn', 'app:app', '--workers', str(args.workers), '--bind', '127.0.0.1:{port}'],
+        'asgi executor': ['uvicorn', 'asgi:app', '--workers', str(args.workers), '--port', '{port}', '--log-level', 'warning'],
+    }
+
+    print("=" * 72)
+    print(f"{args.workers} workers, concurrency {args.concurrency}, {args.requests} requests, "
+          f"login every {args.login_every}")
+    print("=" * 72)
+    print(f"{'mode':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    for port, (label, command) in enumerate(modes.items(), start=8701):
+        command = [part.format(port=port) for part in command]
+        server = subprocess.Popen(command, cwd=BASE_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            if not wait_until_up(base_url):
+                print(f"{label:<16} failed to start ({' '.join(command)})")
+                continue
+            latencies, errors, elapsed = drive(base_url, args.concurrency, args.requests, args.login_every)
+            if not latencies:
+                print(f"{label:<16} no successful predictions ({errors} errors)")
+                continue
+            print(f"{label:<16}{len(latencies) / elapsed:>10.1f}{statistics.median(latencies):>10.1f}"
+                  f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}{errors:>8}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+"""
+Inference Microbenchmark Suite
+Times the inference stack offline (no server, no database) at a range of
+batch sizes, saves the results as JSON and compares them with a stored
+baseline. Each case is repeated for a minimum time and compared by its
+median. The gate widens to the measured noise (within a run, and between
+the --baseline-runs passes the baseline is recorded from), cases shorter
+than --min-gated-ms are reported but never fail it, and a case only
+fails when it is still slow after --confirm fresh re-measurements.
+Exits non-zero when any gated benchmark regresses beyond its tolerance.
+
+    python bench_inference.py                          # run and compare with bench_baseline.json
+    python bench_inference.py --save-baseline          # record a new baseline (commit it)
+    python bench_inference.py --batch-sizes 1,100,100000 --only stage1,full
+
+A "batch" of N means N independent records pushed through the API under
+test (the services score one record per call).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'bench_baseline.json')
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'bench_results.json')
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000)
+# A run is repeated until it has taken this long and at least --repeats times
+MIN_TIME_S = 1.0
+MAX_SAMPLES = 1000
+# Tolerance in units of measured noise (relative median absolute deviation)
+NOISE_FACTOR = 3
+GENOTYPES = ('2/2', '2/3', '2/4', '3/3', '3/4', '4/4', '')
+
+
+def make_records(count, seed=42):
+    """Deterministic, realistic full-cascade inputs (with some missing values)."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        records.append({
+            'age': rng.randint(55, 90),
+            'gender': rng.choice(('Male', 'Female')),
+            'education': rng.randint(8, 20),
+            'faq': rng.choice((0, 0, 0, 1, 2, 5, 8, 12, 20)),
+            'ecogMem': round(rng.uniform(1, 4), 2),
+            'ecogTotal': round(rng.uniform(1, 4), 2),
+            'genotype': rng.choice(GENOTYPES),
+            'ptau217': None if rng.random() < 0.3 else round(rng.uniform(0.1, 1.5), 3),
+            'ab42': None if rng.random() < 0.3 else round(rng.uniform(5, 30), 2),
+            'ab40': None if rng.random() < 0.3 else round(rng.uniform(100, 300), 1),
+            'nfl': None if rng.random() < 0.3 else round(rng.uniform(5, 60), 1),
+        })
+    return records
+
+
+def build_benchmarks():
+    """Return {name: (setup(batch) -> state, run(state))} for every benchmark."""
+    from datetime import datetime as dt
+    from backend.models import Assessment
+    from backend.services import InferenceService, RiskEngine, cascade_pipeline
+    from backend.services.model_loader import model_loader
+
+    def records_for(batch):
+        # Cycle a bounded pool of distinct records so huge batches stay cheap to build
+        pool = make_records(min(batch, 1000))
+        return [pool[i % len(pool)] for i in range(batch)]
+
+    def stage_probabilities(batch):
+        rng = random.Random(7)
+        return [rng.random() for _ in range(batch)]
+
+    def run_stage1(records):
+        for data in records:
+            InferenceService.predict_stage1(data)
+
+    def run_stage2(state):
+        records, probs = state
+        for data, p1 in zip(records, probs):
+            InferenceService.predict_stage2(data, p1)
+
+    def run_stage3(state):
+        records, probs = state
+        for data, p2 in zip(records, probs):
+            InferenceService.predict_stage3(data, p2)
+
+    def run_full(records):
+        for data in records:
+            s1 = InferenceService.predict_stage1(data)
+            s2 = InferenceService.predict_stage2(data, s1['probability'])
+            s3 = InferenceService.predict_stage3(data, s2['probability'])
+            RiskEngine.generate_full_assessment(s1['probability'], s2['probability'], s3['probability'])
+
+    def run_cascade(records):
+        for data in records:
+            cascade_pipeline.run(data)
+
+    def setup_fusion(batch):
+        rng = random.Random(11)
+        return [(rng.random(), rng.random(), rng.random()) for _ in range(batch)]
+
+    def run_fusion(triples):
+        for p1, p2, p3 in triples:
+            RiskEngine.generate_full_assessment(p1, p2, p3)
+
+    def setup_to_dict(batch):
+        now = dt.utcnow()
+        assessments = []
+        for i, data in enumerate(records_for(batch)):
+            a = Assessment(id=i + 1, user_id=1, created_at=now)
+            a.update_stage1(data, 0.42, 'Elevated')
+            a.update_stage2(data, 0.51, 'Elevated', InferenceService.count_apoe4(data['genotype']))
+            a.update_stage3(data, 0.63, 'Elevated')
+            a.update_final_results(0.51, 'Moderate', 'Annual biomarker testing recommended.')
+            assessments.append(a)
+        return assessments
+
+    def run_to_dict(assessments):
+        for a in assessments:
+            a.to_dict()
+
+    def run_load_all(count):
+        for _ in range(count):
+            model_loader.reset()
+            model_loader.load_all()
+
+    return {
+        'stage1': (records_for, run_stage1),
+        'stage2': (lambda b: (records_for(b), stage_probabilities(b)), run_stage2),
+        'stage3': (lambda b: (records_for(b), stage_probabilities(b)), run_stage3),
+        'full': (records_for, run_full),
+        'cascade': (records_for, run_cascade),
+        'cascade_batch': (records_for, cascade_pipeline.score_batch),
+        'cascade_triage': (records_for, lambda records: cascade_pipeline.score_batch(records, triage=True)),
+        'risk_engine': (setup_fusion, run_fusion),
+        'to_dict': (setup_to_dict, run_to_dict),
+        # Loading is not per-record: a batch of N is N cold reloads, capped at 10
+        'load_all': (lambda b: min(b, 10), run_load_all),
+    }
+
+
+def measure(run, state, repeats, min_time=MIN_TIME_S):
+    """Time run(state) until min_time has passed and at least `repeats` times; return the samples."""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < repeats or (time.perf_counter() < deadline and len(timings) < MAX_SAMPLES):
+        start = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def noise(timings):
+    """Relative median absolute deviation of a set of timings."""
+    median = statistics.median(timings)
+    return statistics.median(abs(t - median) for t in timings) / median if median else 0.0
+
+
+def run_suite(names, batch_sizes, repeats):
+    """Run benchmarks and return {name: {batch: stats}}."""
+    from backend.services.model_loader import model_loader
+    model_loader.load_all()
+
+    benchmarks = build_benchmarks()
+    results = {}
+    for name in names:
+        setup, run = benchmarks[name]
+        results[name] = {}
+        for batch in batch_sizes:
+            state = setup(batch)
+            operations = state if isinstance(state, int) else batch
+            run(setup(1))  # warm up code paths and caches
+            timings = measure(run, state, repeats)
+            median = statistics.median(timings)
+            stats = results[name][str(batch)] = {
+                'operations': operations,
+                'samples': len(timings),
+                'best_s': min(timings),
+                'median_s': median,
+                'noise': noise(timings),
+                'per_op_us': median / operations * 1e6
+            }
+            print(f"  {name:<12}{batch:>8}  {median / operations * 1e6:>12.2f} µs/op  "
+                  f"({operations / median:,.0f} ops/s, ±{stats['noise']:.1%}, {len(timings)} runs)")
+        model_loader.load_all()
+    return results
+
+
+def combine(passes):
+    """
+    Merge several run_suite passes into one baseline: the median of each
+    case's medians, with its noise widened to the spread between passes.
+    """
+    combined = {}
+    for name, batches in passes[0].items():
+        combined[name] = {}
+        for batch in batches:
+            runs = [p[name][batch] for p in passes]
+            medians = [r['median_s'] for r in runs]
+            median = statistics.median(medians)
+            spread = max(abs(m - median) for m in medians) / median if median else 0.0
+            operations = runs[0]['operations']
+            combined[name][batch] = {
+                'operations': operations,
+                'samples': sum(r['samples'] for r in runs),
+                'best_s': min(r['best_s'] for r in runs),
+                'median_s': median,
+                'noise': max([spread] + [r['noise'] for r in runs]),
+                'per_op_us': median / operations * 1e6
+            }
+    return combined
+
+
+def confirm(results, regressions, repeats):
+    """Re-measure regressed cases, keeping the faster median of each (in place)."""
+    for name, batch, *_ in regressions:
+        fresh = run_suite([name], [int(batch)], repeats)[name][batch]
+        if fresh['median_s'] < results[name][batch]['median_s']:
+            results[name][batch] = fresh
+
+
+def compare(results, baseline, threshold, min_gated_s):
+    """
+    Compare median per-op timings with the baseline.
+
+    A case regresses when its ratio exceeds 1 + max(threshold, NOISE_FACTOR x
+    the larger noise of the two measurements). Cases whose median run is
+    shorter than min_gated_s are too jittery to gate and come back as
+    informational.
+
+    Returns:
+        (regressions, informational): lists of (name, batch, baseline_us,
+        current_us, ratio, tolerance)
+    """
+    regressions, informational = [], []
+    for name, batches in results.items():
+        for batch, stats in batches.items():
+            reference = baseline.get('results', {}).get(name, {}).get(batch)
+            if not reference:
+                continue
+            ratio = stats['per_op_us'] / reference['per_op_us']
+            tolerance = max(threshold, NOISE_FACTOR * max(stats['noise'], reference.get('noise', 0.0)))
+            if ratio <= 1 + tolerance:
+                continue
+            entry = (name, batch, reference['per_op_us'], stats['per_op_us'], ratio, tolerance)
+            if min(stats['median_s'], reference['median_s']) < min_gated_s:
+                informational.append(entry)
+            else:
+                regressions.append(entry)
+    return regressions, informational
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)),
+                        help='Comma-separated batch sizes (1 to 100000)')
+    parser.add_argument('--only', default='', help='Comma-separated benchmark names')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help=f'Minimum runs per case (each runs for at least {MIN_TIME_S:g}s)')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Minimum allowed slowdown of the median vs. baseline before failing '
+                             '(0.15 = 15%%; widened to the measured noise)')
+    parser.add_argument('--min-gated-ms', type=float, default=5.0,
+                        help='Cases whose median run is shorter are reported but never fail the gate')
+    parser.add_argument('--confirm', type=int, default=2,
+                        help='Re-measure regressed cases this many times before failing')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--baseline-runs', type=int, default=3,
+                        help='Passes combined into a saved baseline (their spread sets its noise)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b]
+    names = [n for n in args.only.split(',') if n] or list(build_benchmarks())
+
+    print("=" * 64)
+    print(f"MirAI inference benchmarks (batch sizes: {batch_sizes})")
+    print("=" * 64)
+    results = run_suite(names, batch_sizes, args.repeats)
+    if args.save_baseline and args.baseline_runs > 1:
+        passes = [results]
+        for run in range(2, args.baseline_runs + 1):
+            print(f"\nBaseline pass {run}/{args.baseline_runs}")
+            passes.append(run_suite(names, batch_sizes, args.repeats))
+        results = combine(passes)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        min_gated_s = args.min_gated_ms / 1000
+        for attempt in range(args.confirm):
+            regressions, _ = compare(results, baseline, args.threshold, min_gated_s)
+            if not regressions:
+                break
+            print(f"\nRe-measuring {len(regressions)} slower case(s) ({attempt + 1}/{args.confirm})")
+            confirm(results, regressions, args.repeats)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeats': args.repeats,
+            'runs': args.baseline_runs if args.save_baseline else 1
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("No baseline found; run with --save-baseline to create one.")
+        return 0
+
+    recorded = baseline.get('meta', {})
+    if (recorded.get('platform'), recorded.get('python')) != (report['meta']['platform'], report['meta']['python']):
+        print(f"⚠️  Baseline was recorded on {recorded.get('platform')} / Python {recorded.get('python')}; "
+              f"re-record it with --save-baseline on this machine for meaningful comparisons.")
+    regressions, informational = compare(results, baseline, args.threshold, args.min_gated_ms / 1000)
+    if informational:
+        print(f"ℹ️  {len(informational)} slower case(s) under {args.min_gated_ms:g} ms per run (not gated):")
+        for name, batch, before, after, ratio, tolerance in informational:
+            print(f"  {name:<12}{batch:>8}  {before:>10.2f} -> {after:>10.2f} µs/op  ({ratio:.2f}x)")
+    if not regressions:
+        print(f"✅ No regressions beyond the tolerance (at least {args.threshold:.0%}) of baseline.")
+        return 0
+
+    print(f"❌ {len(regressions)} regression(s) beyond tolerance:")
+    for name, batch, before, after, ratio, tolerance in regressions:
+        print(f"  {name:<12}{batch:>8}  {before:>10.2f} -> {after:>10.2f} µs/op  "
+              f"({ratio:.2f}x, tolerance {tolerance:.0%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
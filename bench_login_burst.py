@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Login-Burst Benchmark
+Measures Stage-1 prediction latency (p50/p95/p99) while a burst of logins
+is in flight, with bcrypt inline vs. on the bounded offload pool.
+
+Runs in-process against a temporary database:
+    python bench_login_burst.py --logins 8 --predictions 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(app, pool_size, login_threads, predictions):
+    from backend.services.password_hasher import password_hasher
+
+    password_hasher.configure(
+        pool_size=pool_size,
+        max_pending=max(pool_size, 1) * 4,
+        queue_timeout=30.0,
+        log_rounds=app.config['BCRYPT_LOG_ROUNDS']
+    )
+
+    client = app.test_client()
+    credentials = {'email': 'bench@example.com', 'password': 'bench-password'}
+    client.post('/api/auth/register', json=credentials)
+    token = client.post('/api/auth/login', json=credentials).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    payload = {'age': 72, 'gender': 'Female', 'education': 14, 'faq': 8, 'ecogMem': 2.5, 'ecogTotal': 2.5}
+
+    stop = threading.Event()
+    login_count = [0]
+
+    def login_loop():
+        login_client = app.test_client()
+        while not stop.is_set():
+            login_client.post('/api/auth/login', json=credentials)
+            login_count[0] += 1
+
+    workers = [threading.Thread(target=login_loop, daemon=True) for _ in range(login_threads)]
+    for worker in workers:
+        worker.start()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(predictions):
+        t0 = time.perf_counter()
+        client.post('/api/predict/stage1', json=payload, headers=headers)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return {
+        'pool_size': pool_size,
+        'logins': login_count[0],
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'predictions_per_s': predictions / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=8, help='Concurrent login threads')
+    parser.add_argument('--predictions', type=int, default=200, help='Stage-1 predictions to time')
+    parser.add_argument('--pool-size', type=int, default=2, help='bcrypt pool size for the offload run')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='mirai-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    # Time the work, not 429s from the per-user inference budget
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import create_app
+
+    app = create_app('development')
+
+    print("=" * 72)
+    print(f"Login burst: {args.logins} login threads, {args.predictions} predictions")
+    print("=" * 72)
+    print(f"{'mode':<16}{'logins':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'pred/s':>10}")
+    for label, pool_size in (('inline', 0), (f'pool={args.pool_size}', args.pool_size)):
+        with app.app_context():
+            result = run(app, pool_size, args.logins, args.predictions)
+        print(f"{label:<16}{result['logins']:>8}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['predictions_per_s']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
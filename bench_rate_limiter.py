@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Rate Limiter Overhead Benchmark
+Times a single admission decision for each bucket store, and the full
+before_request check (JWT identity + bucket) through the Flask app.
+
+    python bench_rate_limiter.py --iterations 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def time_store(limiter, iterations, users):
+    """Return mean microseconds per acquire() across `users` identities."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        limiter.acquire(f'user:{i % users}', 'default')
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='mirai-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import create_app
+    from backend.services.rate_limiter import RateLimiter, MemoryBucketStore, SQLiteBucketStore, rate_limiter
+
+    limiter = RateLimiter()
+    # Budgets large enough that every call is admitted (worst case: a write per call)
+    limiter.budgets = {'default': (1e12, 1e12), 'inference': (1e12, 1e12)}
+
+    print("=" * 60)
+    print(f"Rate limiter overhead ({args.iterations} calls, {args.users} users)")
+    print("=" * 60)
+
+    limiter.store = MemoryBucketStore()
+    print(f"memory store        {time_store(limiter, args.iterations, args.users):8.2f} µs/call")
+
+    limiter.store = SQLiteBucketStore(os.path.join(tmp_dir, 'ratelimit.db'))
+    sqlite_iterations = min(args.iterations, 20000)
+    print(f"sqlite store        {time_store(limiter, sqlite_iterations, args.users):8.2f} µs/call")
+
+    # Full request-path cost: health is exempt, /api/auth/me goes through the limiter
+    app = create_app('development')
+    rate_limiter.enabled = True
+    rate_limiter.budgets = {'default': (1e12, 1e12), 'inference': (1e12, 1e12)}
+    client = app.test_client()
+    requests_to_time = min(args.iterations, 5000)
+    for path in ('/api/health', '/api/auth/me'):
+        start = time.perf_counter()
+        for _ in range(requests_to_time):
+            client.get(path)
+        per_request = (time.perf_counter() - start) / requests_to_time * 1e6
+        print(f"GET {path:<16}{per_request:8.2f} µs/request (end-to-end)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Span Overhead Benchmark
+Measures the cost of one timing span on the prediction path, with and
+without an active instrumented request.
+
+    python bench_spans.py --iterations 1000000
+"""
+import argparse
+import time
+
+from backend.services import metrics as metrics_module
+from backend.services.metrics import span
+
+
+def time_spans(iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with span('features'):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000000)
+    args = parser.parse_args()
+
+    metrics_module._local.spans = None
+    idle = time_spans(args.iterations)
+    metrics_module._local.spans = {}
+    active = time_spans(args.iterations)
+    metrics_module._local.spans = None
+
+    print(f"span (no active request)  {idle:8.0f} ns")
+    print(f"span (recording)          {active:8.0f} ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Build Surrogate Models
+Distils each stage's primary pipeline (KNNImputer -> StandardScaler ->
+XGBoost) into one regression tree over the raw features, missing values
+included. Each tree is fitted to the primary model's log-odds and stored
+as plain arrays in surrogates.json, which the app serves when the primary
+artifacts cannot be loaded (and optionally under load; see
+SURROGATE_SHED_QUEUE_MS).
+
+    python build_surrogates.py
+    python build_surrogates.py --max-depth 12 --samples 200000
+
+The distillation set is the imputer's training rows, jittered copies of
+them, and rows drawn from each feature's marginal, with values missing
+at the training rate. Fidelity is reported on a held-out fifth and on
+the training rows, and the build fails if risk-level agreement on the
+held-out rows falls below --min-agreement.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODELS_PATH = os.path.join(BASE_DIR, 'backend', 'ml_models')
+EPSILON = 1e-6
+
+
+def distillation_rows(train, samples, rng):
+    """Training rows, jittered training rows and marginal draws (NaN at the training missing rates)."""
+    complete = train[~np.isnan(train).any(axis=1)]
+    spread = np.nanstd(train, axis=0)
+    copies = max(samples // 2 // max(len(complete), 1), 1)
+    jittered = np.repeat(complete, copies, axis=0)
+    jittered += rng.normal(0.0, 0.02, jittered.shape) * spread
+
+    columns = []
+    for j in range(train.shape[1]):
+        observed = train[~np.isnan(train[:, j]), j]
+        columns.append(rng.choice(observed, samples // 2) + rng.normal(0.0, 0.05 * observed.std(), samples // 2))
+    drawn = np.column_stack(columns)
+
+    synthetic = np.vstack([jittered, drawn])
+    missing_rate = np.isnan(train).mean(axis=0)
+    synthetic[rng.random(synthetic.shape) < missing_rate] = np.nan
+    # Discrete features (gender, APOE4 count) keep their training values
+    for j in range(train.shape[1]):
+        observed = np.unique(train[~np.isnan(train[:, j]), j])
+        if len(observed) <= 5:
+            finite = ~np.isnan(synthetic[:, j])
+            nearest = np.abs(synthetic[finite, j][:, None] - observed[None, :]).argmin(axis=1)
+            synthetic[finite, j] = observed[nearest]
+    return np.vstack([train, synthetic])
+
+
+def tree_spec(tree, features):
+    """Plain-array form of a fitted sklearn regression tree (leaf values as probabilities)."""
+    t = tree.tree_
+    leaf = t.children_left < 0
+    logits = t.value[:, 0, 0]
+    return {
+        'features': list(features),
+        'feature': [-1 if is_leaf else int(f) for f, is_leaf in zip(t.feature, leaf)],
+        'threshold': [0.0 if is_leaf else float(v) for v, is_leaf in zip(t.threshold, leaf)],
+        'left': [int(v) for v in t.children_left],
+        'right': [int(v) for v in t.children_right],
+        'missing_left': [int(v) for v in t.missing_go_to_left],
+        'value': [float(1.0 / (1.0 + np.exp(-v))) if is_leaf else 0.0 for v, is_leaf in zip(logits, leaf)]
+    }
+
+
+def fidelity(teacher, student, thresholds):
+    levels = lambda p: np.digitize(p, thresholds)
+    error = np.abs(teacher - student)
+    return {
+        'rows': int(len(teacher)),
+        'mean_abs_error': round(float(error.mean()), 5),
+        'p99_abs_error': round(float(np.quantile(error, 0.99)), 5),
+        'max_abs_error': round(float(error.max()), 5),
+        'risk_level_agreement': round(float((levels(teacher) == levels(student)).mean()), 5)
+    }
+
+
+def build_stage(artifacts, stage, args, rng):
+    from sklearn.tree import DecisionTreeRegressor
+    from backend.services import InferenceService
+    from backend.services.cascade import CompiledStage
+    from backend.services.surrogate import SurrogateTree
+
+    imputer = artifacts.get_imputer(stage)
+    teacher = CompiledStage(imputer, artifacts.get_scaler(stage), artifacts.get_model(stage))
+    features = getattr(InferenceService, f'STAGE{stage}_FEATURES')
+    thresholds = InferenceService.STAGE3_THRESHOLDS if stage == 3 else (0.3, 0.6)
+
+    train = np.asarray(imputer._fit_X, dtype=np.float64)
+    X = distillation_rows(train, args.samples, rng)
+    p = np.clip(teacher.predict(X.copy()).astype(np.float64), EPSILON, 1 - EPSILON)
+
+    order = rng.permutation(len(X))
+    fit_rows, holdout_rows = order[len(X) // 5:], order[:len(X) // 5]
+    tree = DecisionTreeRegressor(max_depth=args.max_depth, min_samples_leaf=args.min_samples_leaf,
+                                 random_state=args.seed)
+    tree.fit(X[fit_rows], np.log(p[fit_rows] / (1 - p[fit_rows])))
+
+    spec = tree_spec(tree, features)
+    surrogate = SurrogateTree(spec)
+    student = surrogate.predict(X)
+    spec['fidelity'] = {
+        'holdout': fidelity(p[holdout_rows], student[holdout_rows], thresholds),
+        'training_rows': fidelity(p[:len(train)], student[:len(train)], thresholds)
+    }
+
+    rows = X[:1000].tolist()
+    start = time.perf_counter_ns()
+    for row in rows:
+        surrogate.predict_one(row)
+    ns_per_row = (time.perf_counter_ns() - start) / len(rows)
+    return spec, ns_per_row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-path', default=DEFAULT_MODELS_PATH)
+    parser.add_argument('--output', help='Default: <models-path>/surrogates.json')
+    parser.add_argument('--max-depth', type=int, default=10)
+    parser.add_argument('--min-samples-leaf', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=60000, help='Synthetic rows per stage.')
+    parser.add_argument('--min-agreement', type=float, default=0.9,
+                        help='Minimum held-out risk-level agreement per stage.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from backend.services.model_loader import ArtifactSet
+
+    artifacts = ArtifactSet(args.models_path)
+    rng = np.random.default_rng(args.seed)
+    output = {
+        'format': 1,
+        'created_at': datetime.utcnow().isoformat(),
+        'teacher_versions': {},
+        'parameters': {'max_depth': args.max_depth, 'min_samples_leaf': args.min_samples_leaf,
+                       'samples': args.samples, 'seed': args.seed},
+        'stages': {}
+    }
+    failed = []
+    print(f"{'stage':<6} {'nodes':>6} {'MAE':>8} {'p99':>8} {'level agree':>12} {'train agree':>12} {'ns/row':>8}")
+    for stage in (1, 2, 3):
+        spec, ns_per_row = build_stage(artifacts, stage, args, rng)
+        output['stages'][str(stage)] = spec
+        output['teacher_versions'][str(stage)] = artifacts.get_version(stage)
+        holdout, train = spec['fidelity']['holdout'], spec['fidelity']['training_rows']
+        print(f"{stage:<6} {len(spec['feature']):>6} {holdout['mean_abs_error']:>8.4f} {holdout['p99_abs_error']:>8.4f} "
+              f"{holdout['risk_level_agreement']:>12.3f} {train['risk_level_agreement']:>12.3f} {ns_per_row:>8.0f}")
+        if holdout['risk_level_agreement'] < args.min_agreement:
+            failed.append(stage)
+
+    if failed:
+        print(f"❌ Risk-level agreement below {args.min_agreement} for stage(s) {failed}; nothing written")
+        return 1
+    path = args.output or os.path.join(args.models_path, 'surrogates.json')
+    with open(path, 'w') as f:
+        json.dump(output, f, separators=(',', ':'))
+    print(f"✅ Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
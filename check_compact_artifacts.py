@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Compact Artifact Accuracy Check
+Scores the same synthetic patients with the full and the compact
+(MODEL_COMPACT) artifacts through the fused cascade and fails if any stage
+probability moves beyond the tolerance or any risk category changes.
+
+    python check_compact_artifacts.py
+    python check_compact_artifacts.py --records 20000 --tolerance 1e-6
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def score(records, compact):
+    from backend.services import InferenceService, cascade_pipeline
+    from backend.services.model_loader import model_loader
+
+    model_loader.reset()
+    model_loader.configure(compact=compact)
+    if not model_loader.load_all():
+        raise RuntimeError('Could not load model artifacts')
+    result = cascade_pipeline.score_batch(records)
+    result['stage1_level'] = np.array([InferenceService.get_risk_level(p) for p in result['stage1_probability']])
+    result['stage2_level'] = np.array([InferenceService.get_risk_level(p) for p in result['stage2_probability']])
+    result['stage3_level'] = np.array([
+        InferenceService.get_risk_level(p, thresholds=InferenceService.STAGE3_THRESHOLDS)
+        for p in result['stage3_probability']
+    ])
+    return result, model_loader.memory_report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--tolerance', type=float, default=1e-5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    from bench_inference import make_records
+    records = make_records(args.records)
+
+    full, full_memory = score(records, compact=False)
+    compact, compact_memory = score(records, compact=True)
+
+    print("=" * 64)
+    print(f"Compact artifact check ({len(records)} records)")
+    print("=" * 64)
+    failed = False
+    for key in ('stage1_probability', 'stage2_probability', 'stage3_probability', 'final_risk_probability'):
+        diff = float(np.max(np.abs(full[key] - compact[key])))
+        ok = diff <= args.tolerance
+        failed |= not ok
+        print(f"  {key:<24} max |diff| {diff:.3e}  {'✅' if ok else '❌'}")
+    for key in ('stage1_level', 'stage2_level', 'stage3_level', 'risk_category'):
+        changed = int(np.count_nonzero(full[key] != compact[key]))
+        failed |= changed > 0
+        print(f"  {key:<24} changed    {changed:>9}  {'✅' if not changed else '❌'}")
+
+    print(f"\nArtifact memory: {full_memory['total_bytes']:,} -> {compact_memory['total_bytes']:,} bytes")
+    for stage, artifacts in compact_memory['stages'].items():
+        check = artifacts.get('compact_check', {})
+        print(f"  stage {stage}: " + ", ".join(
+            f"{name} {info['type']} {info['bytes']:,}" for name, info in artifacts.items() if name != 'compact_check'
+        ) + f"  (float32 imputer: {check.get('float32_imputer')})")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
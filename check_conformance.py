@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+"""
+Inference Conformance Suite
+Golden outputs of the reference pipeline (InferenceService stage by stage:
+pandas -> KNNImputer -> StandardScaler -> XGBClassifier, then RiskEngine)
+for a fixed corpus of edge-case inputs, and a harness that checks any
+inference backend against them.
+
+    python check_conformance.py generate                 # rebuild the golden corpus
+    python check_conformance.py check                    # check every backend
+    python check_conformance.py check --backends cascade,compact --tolerance 1e-7
+
+The corpus covers missing and invalid fields, every gender and APOE
+genotype spelling, extreme biomarker values, inputs whose probabilities
+land next to each risk threshold, and a random sweep. A backend passes
+when it fails on exactly the cases the reference fails on, every
+probability is within the tolerance, and every risk level and category
+matches exactly.
+"""
+import argparse
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BASE_DIR, 'backend', 'ml_models', 'golden_corpus.json.gz')
+CORPUS_FORMAT = 1
+
+STAGE1_FIELDS = ('age', 'gender', 'education', 'faq', 'ecogMem', 'ecogTotal')
+BIOMARKERS = ('ptau217', 'ab42', 'ab40', 'nfl')
+GENOTYPES = [f'{a}/{b}' for a, b in itertools.product('234', repeat=2)] + [
+    '', None, '4', '44', '3-4', 'e3/e4', 'E4/E4', 'ε4/ε4', 'APOE 3/3', 'unknown'
+]
+GENDERS = ('Male', 'male', 'MALE', 'Female', 'female', 'Other', '', 0, 1, None)
+# (stage or 'final', threshold) pairs whose neighbourhoods are sampled densely
+THRESHOLDS = ((1, 0.3), (1, 0.6), (2, 0.3), (2, 0.6), (3, 0.3), (3, 0.7), ('final', 0.3), ('final', 0.7))
+
+
+# ----------------------------------------------------------------------
+# Corpus generation
+# ----------------------------------------------------------------------
+def base_case(rng):
+    return {
+        'age': rng.randint(50, 95),
+        'gender': rng.choice(('Male', 'Female')),
+        'education': rng.randint(0, 24),
+        'faq': rng.choice((0, 1, 2, 4, 5, 6, 10, 15, 20, 25, 30)),
+        'ecogMem': round(rng.uniform(1, 4), 2),
+        'ecogTotal': round(rng.uniform(1, 4), 2),
+        'genotype': rng.choice(GENOTYPES[:9]),
+        'ptau217': round(rng.uniform(0.05, 2.0), 3),
+        'ab42': round(rng.uniform(2, 40), 2),
+        'ab40': round(rng.uniform(50, 400), 1),
+        'nfl': round(rng.uniform(2, 100), 1)
+    }
+
+
+def edge_cases(rng):
+    """Hand-picked edge cases around one typical patient."""
+    typical = {'age': 72, 'gender': 'Female', 'education': 16, 'faq': 5, 'ecogMem': 2.0,
+               'ecogTotal': 2.0, 'genotype': '3/4', 'ptau217': 0.6, 'ab42': 15.0, 'ab40': 180.0, 'nfl': 22.0}
+    cases = [dict(typical)]
+
+    def variant(**changes):
+        case = dict(typical)
+        for key, value in changes.items():
+            if value is KeyError:
+                case.pop(key, None)
+            else:
+                case[key] = value
+        cases.append(case)
+
+    # Missing fields: each alone, then whole stages
+    for field in typical:
+        variant(**{field: KeyError})
+    variant(**{f: KeyError for f in STAGE1_FIELDS})
+    variant(**{f: KeyError for f in BIOMARKERS})
+    cases.append({})
+    # Explicit nulls, empty strings and non-numeric values
+    for field in typical:
+        variant(**{field: None})
+    for field in ('age', 'education', 'faq', 'ecogMem', 'ptau217', 'nfl'):
+        variant(**{field: ''})
+        variant(**{field: 'n/a'})
+        variant(**{field: str(typical[field])})
+    # Every gender and genotype spelling
+    for gender in GENDERS:
+        variant(gender=gender)
+    for genotype in GENOTYPES:
+        variant(genotype=genotype)
+    # Input-side boundaries (factor and insight thresholds)
+    for age in (0, 18, 74, 74.999, 75, 75.001, 110, 150):
+        variant(age=age)
+    for faq in (0, 4, 4.999, 5, 5.001, 30, 31, -1):
+        variant(faq=faq)
+    for ecog in (0, 1, 1.999, 2, 2.001, 4, 10):
+        variant(ecogMem=ecog)
+        variant(ecogTotal=ecog)
+    for education in (0, 1, 30, -5):
+        variant(education=education)
+    # Extreme biomarker values
+    for field in BIOMARKERS:
+        for value in (0, -1, 1e-9, 0.5999, 0.6, 0.6001, 1e3, 1e6, 1e12):
+            variant(**{field: value})
+    for value in (0, 1e-9, 1e6):
+        variant(**{f: value for f in BIOMARKERS})
+    # Genotype x biomarker cross product on a few random patients
+    for genotype in GENOTYPES[:9]:
+        case = base_case(rng)
+        case['genotype'] = genotype
+        cases.append(case)
+    return cases
+
+
+def threshold_cases(rng, per_threshold, pool_size):
+    """Random inputs whose fast-path outputs lie closest to each threshold."""
+    import numpy as np
+    from backend.services import cascade_pipeline
+
+    pool = [base_case(rng) for _ in range(pool_size)]
+    scored = cascade_pipeline.score_batch(pool)
+    outputs = {
+        1: scored['stage1_probability'], 2: scored['stage2_probability'],
+        3: scored['stage3_probability'], 'final': scored['final_risk_probability']
+    }
+    chosen = set()
+    for key, threshold in THRESHOLDS:
+        chosen.update(np.argsort(np.abs(outputs[key] - threshold))[:per_threshold].tolist())
+    return [pool[i] for i in sorted(chosen)]
+
+
+# ----------------------------------------------------------------------
+# Outputs
+# ----------------------------------------------------------------------
+def text_digest(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+def outcome(failed_stage=None, stages=(), final=None, apoe4_count=None, text=None):
+    """Normalized per-case result compared by the harness."""
+    return {
+        'failed_stage': failed_stage,
+        'probabilities': [s['probability'] for s in stages],
+        'levels': [s['risk_level'] for s in stages],
+        'final': final['final_risk_probability'] if final else None,
+        'category': final['risk_category'] if final else None,
+        'apoe4_count': apoe4_count,
+        'text': text
+    }
+
+
+def reference_backend(cases):
+    """The reference pipeline: InferenceService stage by stage, then RiskEngine."""
+    from backend.services import InferenceService, RiskEngine
+
+    results = []
+    for data in cases:
+        s1 = InferenceService.predict_stage1(data)
+        if not s1['success']:
+            results.append(outcome(1))
+            continue
+        s2 = InferenceService.predict_stage2(data, s1['probability'])
+        if not s2['success']:
+            results.append(outcome(2, [s1]))
+            continue
+        s3 = InferenceService.predict_stage3(data, s2['probability'])
+        if not s3['success']:
+            results.append(outcome(3, [s1, s2]))
+            continue
+        final = RiskEngine.generate_full_assessment(s1['probability'], s2['probability'], s3['probability'])
+        results.append(outcome(None, [s1, s2, s3], final, s2['apoe4_count'], text_digest(
+            s1['factors'], s2['genetic_insight'], s3['biomarker_insight'], final['escalation_recommendation']
+        )))
+    return results
+
+
+def cascade_backend(cases):
+    """CascadePipeline.run, one request at a time (/api/predict/full)."""
+    from backend.services import cascade_pipeline
+
+    results = []
+    for data in cases:
+        r = cascade_pipeline.run(data)
+        if not r['success']:
+            results.append(outcome(r['stage']))
+            continue
+        s1, s2, s3, final = r['stage1'], r['stage2'], r['stage3'], r['final_assessment']
+        results.append(outcome(None, [s1, s2, s3], final, s2['apoe4_count'], text_digest(
+            s1['factors'], s2['genetic_insight'], s3['biomarker_insight'], final['escalation_recommendation']
+        )))
+    return results
+
+
+def cascade_batch_backend(cases, expected):
+    """CascadePipeline.score_batch over the cases the reference scores (no per-row errors)."""
+    from backend.services import InferenceService, cascade_pipeline
+
+    rows = [i for i, e in enumerate(expected) if e['failed_stage'] is None]
+    results = [outcome(e['failed_stage']) if e['failed_stage'] else None for e in expected]
+    scored = cascade_pipeline.score_batch([cases[i] for i in rows])
+    for k, i in enumerate(rows):
+        probabilities = [float(scored[f'stage{s}_probability'][k]) for s in (1, 2, 3)]
+        stages = [
+            {'probability': p, 'risk_level': InferenceService.get_risk_level(
+                p, thresholds=InferenceService.STAGE3_THRESHOLDS if s == 3 else (0.3, 0.6))}
+            for s, p in zip((1, 2, 3), probabilities)
+        ]
+        final = {'final_risk_probability': float(scored['final_risk_probability'][k]),
+                 'risk_category': str(scored['risk_category'][k])}
+        results[i] = outcome(None, stages, final)
+    return results
+
+
+def with_compact(backend):
+    """Run a backend on the compact (MODEL_COMPACT) artifacts."""
+    def run(*args):
+        from backend.services.model_loader import model_loader
+        model_loader.reset()
+        model_loader.configure(compact=True)
+        model_loader.load_all()
+        try:
+            return backend(*args)
+        finally:
+            model_loader.reset()
+            model_loader.configure(compact=False)
+            model_loader.load_all()
+    return run
+
+
+# name -> (callable, needs expected outputs)
+BACKENDS = {
+    'reference': (reference_backend, False),
+    'cascade': (cascade_backend, False),
+    'cascade_batch': (cascade_batch_backend, True),
+    'compact': (with_compact(cascade_backend), False),
+    'compact_batch': (with_compact(cascade_batch_backend), True)
+}
+
+
+# ----------------------------------------------------------------------
+# Harness
+# ----------------------------------------------------------------------
+def compare(expected, actual, tolerance):
+    """Mismatch descriptions for one case (empty if conforming)."""
+    if actual is None:
+        return ['no result']
+    if expected['failed_stage'] != actual['failed_stage']:
+        return [f"failed_stage {actual['failed_stage']} != {expected['failed_stage']}"]
+    problems = []
+    for s, (e, a) in enumerate(zip(expected['probabilities'], actual['probabilities']), start=1):
+        if abs(e - a) > tolerance:
+            problems.append(f'stage{s} probability {a!r} != {e!r}')
+    for s, (e, a) in enumerate(zip(expected['levels'], actual['levels']), start=1):
+        if e != a:
+            problems.append(f'stage{s} level {a} != {e}')
+    if expected['final'] is not None and abs(expected['final'] - actual['final']) > tolerance:
+        problems.append(f"final {actual['final']!r} != {expected['final']!r}")
+    if expected['category'] != actual['category']:
+        problems.append(f"category {actual['category']} != {expected['category']}")
+    for key in ('apoe4_count', 'text'):
+        if actual[key] is not None and actual[key] != expected[key]:
+            problems.append(f'{key} differs')
+    return problems
+
+
+def artifact_versions():
+    from backend.services.model_loader import model_loader
+    return [model_loader.get_version(s) for s in (1, 2, 3)]
+
+
+def generate(args):
+    from backend.services.drift import drift_monitor
+
+    rng = random.Random(args.seed)
+    cases = edge_cases(rng)
+    with drift_monitor.suppressed():
+        cases += threshold_cases(rng, args.per_threshold, args.pool)
+        cases += [base_case(rng) for _ in range(args.random)]
+        expected = reference_backend(cases)
+    corpus = {
+        'format': CORPUS_FORMAT,
+        'artifact_versions': artifact_versions(),
+        'seed': args.seed,
+        'cases': [{'input': c, 'expected': e} for c, e in zip(cases, expected)]
+    }
+    with gzip.open(args.corpus, 'wt', encoding='utf-8') as f:
+        json.dump(corpus, f, ensure_ascii=False, separators=(',', ':'))
+    failing = sum(1 for e in expected if e['failed_stage'])
+    print(f"Wrote {len(cases)} cases ({failing} expected failures) to {args.corpus}")
+    return 0
+
+
+def check(args):
+    from backend.services.drift import drift_monitor
+
+    with gzip.open(args.corpus, 'rt', encoding='utf-8') as f:
+        corpus = json.load(f)
+    if corpus.get('format') != CORPUS_FORMAT:
+        print(f"❌ Unsupported corpus format {corpus.get('format')}")
+        return 1
+    if corpus['artifact_versions'] != artifact_versions():
+        print("❌ The corpus was generated from different artifacts; regenerate it "
+              "after reviewing the change (e.g. with replay_models.py)")
+        return 1
+    cases = [c['input'] for c in corpus['cases']]
+    expected = [c['expected'] for c in corpus['cases']]
+
+    print("=" * 78)
+    print(f"Conformance: {len(cases)} cases, tolerance {args.tolerance:g}")
+    print("=" * 78)
+    print(f"{'backend':<16}{'cases':>8}{'failures':>10}{'prob':>8}{'level':>8}{'category':>10}"
+          f"{'max |diff|':>12}{'µs/case':>10}")
+    failed = False
+    for name in args.backends.split(','):
+        backend, needs_expected = BACKENDS[name]
+        with drift_monitor.suppressed():
+            started = time.perf_counter()
+            actual = backend(cases, expected) if needs_expected else backend(cases)
+            elapsed = time.perf_counter() - started
+        counts = {'prob': 0, 'level': 0, 'category': 0, 'other': 0}
+        max_diff = 0.0
+        mismatches = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            if a is not None and e['failed_stage'] is None and a['failed_stage'] is None:
+                diffs = [abs(x - y) for x, y in zip(e['probabilities'], a['probabilities'])]
+                max_diff = max([max_diff, abs(e['final'] - a['final'])] + diffs)
+            problems = compare(e, a, args.tolerance)
+            for problem in problems:
+                kind = ('prob' if 'probability' in problem or problem.startswith('final') else
+                        'level' if 'level' in problem else 'category' if 'category' in problem else 'other')
+                counts[kind] += 1
+            if problems:
+                mismatches.append((i, problems))
+        ok = not mismatches
+        failed |= not ok
+        print(f"{name:<16}{len(cases):>8}{counts['other']:>10}{counts['prob']:>8}{counts['level']:>8}"
+              f"{counts['category']:>10}{max_diff:>12.2e}{elapsed / len(cases) * 1e6:>10.1f}  "
+              f"{'✅' if ok else '❌'}")
+        for i, problems in mismatches[:args.show]:
+            print(f"    case {i}: {'; '.join(problems)}  input={json.dumps(cases[i], ensure_ascii=False)}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    sub = parser.add_subparsers(dest='command', required=True)
+    gen = sub.add_parser('generate', help='Build the corpus and its reference outputs')
+    gen.add_argument('--seed', type=int, default=20240601)
+    gen.add_argument('--random', type=int, default=2000, help='Random sweep cases')
+    gen.add_argument('--per-threshold', type=int, default=100, help='Cases nearest each risk threshold')
+    gen.add_argument('--pool', type=int, default=50000, help='Candidates screened for threshold cases')
+    chk = sub.add_parser('check', help='Check backends against the corpus')
+    chk.add_argument('--backends', default=','.join(BACKENDS))
+    chk.add_argument('--tolerance', type=float, default=1e-6)
+    chk.add_argument('--show', type=int, default=5, help='Mismatching cases to print per backend')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    import warnings
+    warnings.filterwarnings('ignore', category=UserWarning)
+    return generate(args) if args.command == 'generate' else check(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
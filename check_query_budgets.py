@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Query Budget Check
+Drives every API route through a scripted session (register, the staged
+and full assessment flows, a staged flow whose stage 1 omits optional
+fields, edits of completed and of triaged assessments, results, trend
+and job endpoints) in the testing config, where a route that runs more SQL
+statements than its @query_budget raises. Prints the statement
+count of each request against its budget and exits non-zero on any
+violation or on a response that breaks its step's expectation, so it
+can gate CI.
+
+    python check_query_budgets.py
+    python check_query_budgets.py --verbose      # also print each statement
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+
+def configure(directory):
+    """Point every database and state directory at a scratch location."""
+    os.environ['FLASK_ENV'] = 'testing'
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'mirai.db')}"
+    for name, filename in (('ARCHIVE_DATABASE_PATH', 'archive.db'), ('IDEMPOTENCY_DATABASE_PATH', 'idempotency.db'),
+                           ('TOKEN_REVOCATION_DATABASE_PATH', 'revoked.db'), ('RATELIMIT_DATABASE_PATH', 'ratelimit.db'),
+                           ('JOBS_DATABASE_PATH', 'jobs.db'), ('METRICS_DIR', 'metrics'), ('DRIFT_DIR', 'drift'),
+                           ('JOURNAL_DIR', 'journal'), ('PROFILER_DIR', 'profiles')):
+        os.environ[name] = os.path.join(directory, filename)
+
+
+STAGE1_PARTIAL = {'gender': 'Male', 'faq': 2}
+STAGE1 = {'age': 72, 'gender': 'Female', 'education': 16, 'faq': 5, 'ecogMem': 2.5, 'ecogTotal': 2.0}
+BIOMARKERS = {'ptau217': 0.5, 'ab42': 15.2, 'ab40': 180.5, 'nfl': 22.0}
+# Confident enough at stage 1 for the triage cascade to exit there
+STAGE1_CONFIDENT = {'age': 88, 'gender': 'Male', 'education': 8, 'faq': 28, 'ecogMem': 4.0, 'ecogTotal': 3.8}
+
+# label -> (description, predicate on the response JSON) for steps whose body is checked
+EXPECTATIONS = {
+    'full (bad triage flag)': ('a 400 for an unknown flag spelling',
+                               lambda d: d.get('success') is False and 'triage' in d.get('error', '')),
+    'full (triage exit)': ('a provisional final left open',
+                           lambda d: (d.get('final_assessment') or {}).get('provisional') is True
+                           and d.get('stage3') is None),
+    'stage 1 (edit triaged)': ('a refitted provisional final',
+                               lambda d: (d.get('final_assessment') or {}).get('provisional') is True),
+    'stage 2 (triaged)': ('a provisional final refitted over stage 2',
+                          lambda d: (d.get('final_assessment') or {}).get('early_exit_stage') == 2),
+    'stage 3 (completes triaged)': ('a full final',
+                                    lambda d: d.get('final_assessment') is not None
+                                    and not d['final_assessment'].get('provisional')),
+}
+
+
+def scenario():
+    """(label, method, url, json body or None, auth) steps; '{id}' / '{partial}' / '{triaged}' / '{job}' are filled in as they appear."""
+    return [
+        ('register', 'post', '/api/auth/register', {'email': 'budget@example.com', 'password': 'budget-pass'}, False),
+        ('login', 'post', '/api/auth/login', {'email': 'budget@example.com', 'password': 'budget-pass'}, False),
+        ('profile', 'get', '/api/auth/me', None, True),
+        ('trend (no history)', 'get', '/api/results/trend', None, True),
+        ('stage 1 (new)', 'post', '/api/predict/stage1', STAGE1, True),
+        ('stage 2', 'post', '/api/predict/stage2', {'assessment_id': '{id}', 'genotype': '3/4'}, True),
+        ('in progress', 'get', '/api/results/in-progress', None, True),
+        ('stage 3 (completes)', 'post', '/api/predict/stage3', {'assessment_id': '{id}', **BIOMARKERS}, True),
+        ('stage 3 (unchanged)', 'post', '/api/predict/stage3', {'assessment_id': '{id}', **BIOMARKERS}, True),
+        ('stage 1 (missing fields)', 'post', '/api/predict/stage1', STAGE1_PARTIAL, True),
+        ('stage 2 (after missing)', 'post', '/api/predict/stage2', {'assessment_id': '{partial}', 'genotype': '3/3'}, True),
+        ('stage 3 (after missing)', 'post', '/api/predict/stage3', {'assessment_id': '{partial}', 'ptau217': 0.3}, True),
+        ('stage 1 (edit completed)', 'post', '/api/predict/stage1', {**STAGE1, 'faq': 8, 'assessment_id': '{id}'}, True),
+        ('stage 2 (edit completed)', 'post', '/api/predict/stage2', {'assessment_id': '{id}', 'genotype': '4/4'}, True),
+        ('full', 'post', '/api/predict/full', {**STAGE1, 'genotype': '3/3', **BIOMARKERS}, True),
+        ('full (triage)', 'post', '/api/predict/full', {**STAGE1, 'genotype': '3/3', **BIOMARKERS, 'triage': True}, True),
+        ('full (bad triage flag)', 'post', '/api/predict/full', {**STAGE1, 'triage': 'ture'}, True),
+        ('full (triage exit)', 'post', '/api/predict/full', {**STAGE1_CONFIDENT, 'triage': True}, True),
+        ('stage 1 (edit triaged)', 'post', '/api/predict/stage1',
+         {**STAGE1_CONFIDENT, 'faq': 26, 'assessment_id': '{triaged}'}, True),
+        ('stage 2 (triaged)', 'post', '/api/predict/stage2', {'assessment_id': '{triaged}', 'genotype': '4/4'}, True),
+        ('stage 3 (completes triaged)', 'post', '/api/predict/stage3', {'assessment_id': '{triaged}', **BIOMARKERS}, True),
+        ('results', 'get', '/api/results', None, True),
+        ('result', 'get', '/api/results/{id}', None, True),
+        ('latest', 'get', '/api/results/latest', None, True),
+        ('trend', 'get', '/api/results/trend', None, True),
+        ('job submit', 'post', '/api/jobs', [dict(STAGE1, genotype='3/4', **BIOMARKERS)], True),
+        ('jobs', 'get', '/api/jobs', None, True),
+        ('job', 'get', '/api/jobs/{job}', None, True),
+        ('job results (pending)', 'get', '/api/jobs/{job}/results', None, True),
+        ('job cancel', 'delete', '/api/jobs/{job}', None, True),
+        ('logout', 'post', '/api/auth/logout', None, True),
+    ]
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids) if '{' in value else value
+    if isinstance(value, dict):
+        return {k: (int(fill(v, ids)) if k == 'assessment_id' else fill(v, ids)) for k, v in value.items()}
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true', help='Print the statements each request ran.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory)
+        from app import create_app
+        from backend.services import queries
+        from backend.services.queries import QueryBudgetExceeded
+
+        app = create_app('testing')
+        client = app.test_client()
+        headers, ids, failures, exercised = {}, {'id': '', 'partial': '', 'triaged': '', 'job': ''}, [], set()
+
+        print(f"{'step':<28} {'status':>6} {'queries':>8} {'budget':>7} {'sql ms':>8}")
+        for label, method, url, body, auth in scenario():
+            url = fill(url, ids)
+            kwargs = {'headers': headers if auth else {}}
+            if body is not None:
+                kwargs['json'] = fill(body, ids)
+            try:
+                response = getattr(client, method)(url, **kwargs)
+            except QueryBudgetExceeded as e:
+                failures.append(f'{label}: {e}')
+                print(f'{label:<28} {"FAIL":>6}  {str(e).splitlines()[0]}')
+                continue
+
+            endpoint = app.url_map.bind('').match(url, method=method.upper())[0]
+            exercised.add(endpoint)
+            budget = getattr(app.view_functions[endpoint], 'query_budget', None)
+            print(f"{label:<28} {response.status_code:>6} {response.headers.get('X-Query-Count', '-'):>8} "
+                  f"{'-' if budget is None else budget:>7} {response.headers.get('X-Query-Time', '-'):>8}")
+            if args.verbose:
+                for statement in queries._local.statements:
+                    print(f"    {' '.join(statement.split())[:120]}")
+            if response.status_code >= 500:
+                failures.append(f'{label}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}')
+
+            data = response.get_json(silent=True) or {}
+            if label in EXPECTATIONS and not EXPECTATIONS[label][1](data):
+                failures.append(f'{label}: expected {EXPECTATIONS[label][0]}, got {str(data)[:200]}')
+            if 'access_token' in data:
+                headers = {'Authorization': f"Bearer {data['access_token']}"}
+            if label == 'stage 1 (new)':
+                ids['id'] = data.get('assessment_id', '')
+            if label == 'stage 1 (missing fields)':
+                ids['partial'] = data.get('assessment_id', '')
+            if label == 'full (triage exit)':
+                ids['triaged'] = data.get('assessment_id', '')
+            if 'job' in data and label == 'job submit':
+                ids['job'] = data['job']['id']
+
+        unbudgeted = sorted(
+            rule.endpoint for rule in app.url_map.iter_rules()
+            if rule.rule.startswith(('/api/auth', '/api/predict', '/api/results', '/api/jobs'))
+            and getattr(app.view_functions[rule.endpoint], 'query_budget', None) is None
+        )
+        unexercised = sorted(
+            endpoint for endpoint, view in app.view_functions.items()
+            if getattr(view, 'query_budget', None) is not None and endpoint not in exercised
+        )
+
+    print()
+    if unbudgeted:
+        print(f"⚠️  API routes without a query budget: {', '.join(unbudgeted)}")
+    if unexercised:
+        print(f"⚠️  Budgeted routes not exercised: {', '.join(unexercised)}")
+    if failures:
+        print(f'❌ {len(failures)} failures:')
+        for failure in failures:
+            print(f'  {failure}')
+        return 1
+    print('✅ Every request stayed within its query budget')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
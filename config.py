@@ -24,10 +24,110 @@ class Config:
     JWT_COOKIE_SECURE = False  # Set True in production with HTTPS
     JWT_COOKIE_CSRF_PROTECT = False
     
+    # Token revocation (logout) shared across workers
+    TOKEN_REVOCATION_DATABASE_PATH = os.environ.get('TOKEN_REVOCATION_DATABASE_PATH', os.path.join(INSTANCE_DIR, 'revoked_tokens.db'))
+    TOKEN_REVOCATION_SYNC_SECONDS = float(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', 1.0))
+    
+    # Password hashing (bcrypt cost factor and offload pool limits)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', 2))
+    BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', 8))
+    BCRYPT_QUEUE_TIMEOUT = float(os.environ.get('BCRYPT_QUEUE_TIMEOUT', 5.0))
+    
     # Database - use absolute path
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{os.path.join(INSTANCE_DIR, "mirai.db")}')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Assessment archive (completed assessments older than ARCHIVE_AFTER_DAYS)
+    ARCHIVE_DATABASE_PATH = os.environ.get('ARCHIVE_DATABASE_PATH', os.path.join(INSTANCE_DIR, 'mirai_archive.db'))
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    
+    # Idempotency-Key support for prediction endpoints ('memory' or 'sqlite')
+    IDEMPOTENCY_BACKEND = os.environ.get('IDEMPOTENCY_BACKEND', 'memory')
+    IDEMPOTENCY_DATABASE_PATH = os.environ.get('IDEMPOTENCY_DATABASE_PATH', os.path.join(INSTANCE_DIR, 'idempotency.db'))
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    
+    # Per-user token-bucket rate limits (capacity = burst, per_second = refill)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_DATABASE_PATH = os.environ.get('RATELIMIT_DATABASE_PATH', os.path.join(INSTANCE_DIR, 'ratelimit.db'))
+    RATELIMIT_INFERENCE_CAPACITY = float(os.environ.get('RATELIMIT_INFERENCE_CAPACITY', 10))
+    RATELIMIT_INFERENCE_PER_SECOND = float(os.environ.get('RATELIMIT_INFERENCE_PER_SECOND', 0.5))
+    RATELIMIT_DEFAULT_CAPACITY = float(os.environ.get('RATELIMIT_DEFAULT_CAPACITY', 60))
+    RATELIMIT_DEFAULT_PER_SECOND = float(os.environ.get('RATELIMIT_DEFAULT_PER_SECOND', 5))
+    
+    # Request timing (Server-Timing header and /metrics)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(INSTANCE_DIR, 'metrics'))
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    
+    # Per-request SQL statement counts and times; strict mode fails over-budget routes
+    SQL_ACCOUNTING_ENABLED = os.environ.get('SQL_ACCOUNTING_ENABLED', 'true').lower() == 'true'
+    SQL_BUDGET_STRICT = os.environ.get('SQL_BUDGET_STRICT', 'false').lower() == 'true'
+    
+    # Admin diagnostics (/api/admin/memory, /api/admin/drift); hidden unless a token is set
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+    
+    # On-demand request profiler (no hooks are installed unless enabled)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_DIR = os.environ.get('PROFILER_DIR', os.path.join(INSTANCE_DIR, 'profiles'))
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0.0))
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN', '')
+    PROFILER_KEEP = int(os.environ.get('PROFILER_KEEP', 20))
+    
+    # Synthetic-traffic warmer (in-process thread; /api/warmup for sidecars)
+    WARMER_ENABLED = os.environ.get('WARMER_ENABLED', 'false').lower() == 'true'
+    WARMER_INTERVAL_SECONDS = float(os.environ.get('WARMER_INTERVAL_SECONDS', 60))
+    WARMER_TOKEN = os.environ.get('WARMER_TOKEN', '')
+    
+    # Compact (float32 / flat-tree) model artifacts, checked against the originals at load
+    MODEL_COMPACT = os.environ.get('MODEL_COMPACT', 'false').lower() == 'true'
+    MODEL_COMPACT_TOLERANCE = float(os.environ.get('MODEL_COMPACT_TOLERANCE', 1e-5))
+    
+    # Distilled fallback models (build_surrogates.py), served while the primary artifacts
+    # cannot be loaded, and for load shedding once the smoothed queue wait exceeds SURROGATE_SHED_QUEUE_MS (0 = off)
+    SURROGATE_ENABLED = os.environ.get('SURROGATE_ENABLED', 'true').lower() == 'true'
+    SURROGATE_PATH = os.environ.get('SURROGATE_PATH', '')
+    SURROGATE_RETRY_SECONDS = float(os.environ.get('SURROGATE_RETRY_SECONDS', 30))
+    SURROGATE_SHED_QUEUE_MS = float(os.environ.get('SURROGATE_SHED_QUEUE_MS', 0))
+    
+    # Streaming drift monitor (sketches merged across workers via DRIFT_DIR)
+    DRIFT_ENABLED = os.environ.get('DRIFT_ENABLED', 'true').lower() == 'true'
+    DRIFT_DIR = os.environ.get('DRIFT_DIR', os.path.join(INSTANCE_DIR, 'drift'))
+    DRIFT_FLUSH_SECONDS = float(os.environ.get('DRIFT_FLUSH_SECONDS', 10))
+    DRIFT_BINS = int(os.environ.get('DRIFT_BINS', 20))
+    DRIFT_PSI_THRESHOLD = float(os.environ.get('DRIFT_PSI_THRESHOLD', 0.2))
+    
+    # Binary prediction journal (per-worker rotating segments; gzip once closed)
+    JOURNAL_ENABLED = os.environ.get('JOURNAL_ENABLED', 'false').lower() == 'true'
+    JOURNAL_DIR = os.environ.get('JOURNAL_DIR', os.path.join(INSTANCE_DIR, 'journal'))
+    JOURNAL_SEGMENT_BYTES = int(os.environ.get('JOURNAL_SEGMENT_BYTES', 16 << 20))
+    JOURNAL_SEGMENT_SECONDS = float(os.environ.get('JOURNAL_SEGMENT_SECONDS', 3600))
+    JOURNAL_FLUSH_SECONDS = float(os.environ.get('JOURNAL_FLUSH_SECONDS', 0.5))
+    JOURNAL_KEEP_RAW_SEGMENTS = int(os.environ.get('JOURNAL_KEEP_RAW_SEGMENTS', 2))
+    JOURNAL_QUEUE_SIZE = int(os.environ.get('JOURNAL_QUEUE_SIZE', 100000))
+    
+    # Background batch jobs (SQLite queue; scored by `flask run-job-workers` processes)
+    JOBS_DATABASE_PATH = os.environ.get('JOBS_DATABASE_PATH', os.path.join(INSTANCE_DIR, 'jobs.db'))
+    JOBS_CHUNK_SIZE = int(os.environ.get('JOBS_CHUNK_SIZE', 1000))
+    JOBS_MAX_ROWS = int(os.environ.get('JOBS_MAX_ROWS', 100000))
+    JOBS_MAX_UPLOAD_BYTES = int(os.environ.get('JOBS_MAX_UPLOAD_BYTES', 32 << 20))
+    # Request bodies are capped at the largest upload, including chunked ones without a Content-Length
+    MAX_CONTENT_LENGTH = JOBS_MAX_UPLOAD_BYTES
+    JOBS_MAX_ACTIVE_PER_USER = int(os.environ.get('JOBS_MAX_ACTIVE_PER_USER', 2))
+    JOBS_WORKER_PROCESSES = int(os.environ.get('JOBS_WORKER_PROCESSES', 1))
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 1))
+    JOBS_WORKER_NICE = int(os.environ.get('JOBS_WORKER_NICE', 10))
+    JOBS_CHUNK_PAUSE_SECONDS = float(os.environ.get('JOBS_CHUNK_PAUSE_SECONDS', 0.0))
+    JOBS_POLL_SECONDS = float(os.environ.get('JOBS_POLL_SECONDS', 1.0))
+    JOBS_LEASE_SECONDS = float(os.environ.get('JOBS_LEASE_SECONDS', 300))
+    JOBS_RETENTION_DAYS = float(os.environ.get('JOBS_RETENTION_DAYS', 7))
+    
+    # Early-exit triage (opt-in per request): a stage is confident outside "low,high"
+    TRIAGE_STAGE1_BAND = tuple(float(x) for x in os.environ.get('TRIAGE_STAGE1_BAND', '0.10,0.90').split(','))
+    TRIAGE_STAGE2_BAND = tuple(float(x) for x in os.environ.get('TRIAGE_STAGE2_BAND', '0.10,0.90').split(','))
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
@@ -39,16 +139,27 @@ class Config:
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    PAGE_CACHE_AUTO_RELOAD = True  # Pick up template edits without a restart
     
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    PAGE_CACHE_AUTO_RELOAD = False
     JWT_COOKIE_SECURE = True
 
 
+class TestingConfig(Config):
+    """Testing configuration (query budgets are enforced)."""
+    TESTING = True
+    SQL_BUDGET_STRICT = True
+    RATELIMIT_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4
+
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
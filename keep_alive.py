@@ -1,40 +1,87 @@
+import argparse
+import os
 import requests
 import time
 from datetime import datetime
 
 # Configuration
-URL = "https://mirai-alzheimer-screening.onrender.com/api/health"
-INTERVAL = 300  # 5 minutes (300 seconds)
+BASE_URL = os.environ.get('KEEP_ALIVE_URL', "https://mirai-alzheimer-screening.onrender.com")
+INTERVAL = int(os.environ.get('KEEP_ALIVE_INTERVAL', 300))  # 5 minutes (300 seconds)
+WARMER_TOKEN = os.environ.get('WARMER_TOKEN', '')
 
-def ping_server():
-    print(f"Starting keep-alive monitoring for: {URL}")
-    print(f"Ping interval: {INTERVAL} seconds")
+# Latency histogram bucket upper bounds (seconds)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SUMMARY_EVERY = 12  # Print the histogram every N pings
+
+
+def print_histogram(latencies):
+    counts = [0] * (len(BUCKETS) + 1)
+    for latency in latencies:
+        for i, bound in enumerate(BUCKETS):
+            if latency <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    print(f"Latency histogram ({len(latencies)} pings):")
+    labels = [f"<= {bound}s" for bound in BUCKETS] + [f"> {BUCKETS[-1]}s"]
+    for label, count in zip(labels, counts):
+        print(f"  {label:>9} | {'#' * count} {count}")
+    print("-" * 50)
+
+
+def ping_server(base_url, interval, warm):
+    # Warm mode runs synthetic scoring through every stage (no rows are written)
+    if warm:
+        url = f"{base_url}/api/warmup"
+        headers = {'X-Warmer-Token': WARMER_TOKEN} if WARMER_TOKEN else {}
+    else:
+        url = f"{base_url}/api/health"
+        headers = {}
+
+    print(f"Starting keep-alive monitoring for: {url}")
+    print(f"Ping interval: {interval} seconds")
     print("-" * 50)
 
+    latencies = []
     while True:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
             start_time = time.time()
-            response = requests.get(URL, timeout=30)
+            if warm:
+                response = requests.post(url, headers=headers, timeout=60)
+            else:
+                response = requests.get(url, timeout=30)
             duration = round(time.time() - start_time, 2)
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
+            latencies.append(duration)
+
             if response.status_code == 200:
                 data = response.json()
-                print(f"[{timestamp}] ✅ Success ({duration}s) | Status: {response.status_code} | Version: {data.get('version')}")
+                if warm:
+                    print(f"[{timestamp}] ✅ Warm ({duration}s) | Server total: {data.get('total_ms')} ms")
+                else:
+                    print(f"[{timestamp}] ✅ Success ({duration}s) | Status: {response.status_code} | Version: {data.get('version')}")
             else:
                 print(f"[{timestamp}] ⚠️ Warning ({duration}s) | Status: {response.status_code}")
-                
+
         except requests.exceptions.RequestException as e:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             print(f"[{timestamp}] ❌ Error: {e}")
         except Exception as e:
             print(f"[{timestamp}] ❌ Unexpected Error: {e}")
-        
+
+        if latencies and len(latencies) % SUMMARY_EVERY == 0:
+            print_histogram(latencies)
+
         # Wait for next interval
-        time.sleep(INTERVAL)
+        time.sleep(interval)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the MirAI server awake (and optionally warm).")
+    parser.add_argument('--url', default=BASE_URL, help='Base URL of the server')
+    parser.add_argument('--interval', type=int, default=INTERVAL, help='Seconds between pings')
+    parser.add_argument('--warm', action='store_true', help='Run synthetic scoring via /api/warmup')
+    args = parser.parse_args()
     try:
-        ping_server()
+        ping_server(args.url.rstrip('/'), args.interval, args.warm)
     except KeyboardInterrupt:
         print("\nKeep-alive script stopped by user.")
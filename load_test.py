@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+"""
+MirAI Load Test
+Drives realistic assessment sessions against the app and reports
+throughput, per-endpoint latency percentiles and error rates.
+
+Each session: log in -> Stage 1 -> Stage 2 -> Stage 3 (chained by
+assessment_id) -> poll results. Sessions either arrive at a fixed average
+rate (open loop, Poisson arrivals) or run back-to-back on every worker
+(closed loop, --rate 0).
+
+    python load_test.py --mode inprocess --concurrency 8 --sessions 200
+    python load_test.py --mode gunicorn --workers 2 --rate 5 --duration 60
+    python load_test.py --mode url --url http://127.0.0.1:5000 --concurrency 16
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GENOTYPES = ('2/3', '3/3', '3/3', '3/4', '3/4', '4/4', '')
+
+
+class InProcessTransport:
+    """Calls the Flask app through a per-thread test client."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = client.open(path, method=method, json=payload, headers=headers)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HTTPTransport:
+    """Calls a running server over HTTP."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, payload=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return resp.status, json.loads(resp.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+        except (urllib.error.URLError, OSError):
+            return 0, {}
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and error accounting."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def call(self, transport, name, method, path, payload=None, token=None):
+        start = time.perf_counter()
+        status, body = transport.request(method, path, payload, token)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if not 200 <= status < 300:
+                self.errors[name] += 1
+        return status, body
+
+
+def random_patient(rng):
+    return {
+        'age': rng.randint(55, 90),
+        'gender': rng.choice(('Male', 'Female')),
+        'education': rng.randint(8, 20),
+        'faq': rng.choice((0, 0, 1, 3, 5, 8, 12)),
+        'ecogMem': round(rng.uniform(1, 4), 2),
+        'ecogTotal': round(rng.uniform(1, 4), 2),
+        'genotype': rng.choice(GENOTYPES),
+        'ptau217': round(rng.uniform(0.1, 1.5), 3),
+        'ab42': round(rng.uniform(5, 30), 2),
+        'ab40': round(rng.uniform(100, 300), 1),
+        'nfl': round(rng.uniform(5, 60), 1),
+    }
+
+
+def run_session(transport, recorder, user, rng, polls):
+    """One realistic user session."""
+    status, body = recorder.call(transport, 'login', 'POST', '/api/auth/login', user)
+    if status != 200:
+        return
+    token = body['access_token']
+    patient = random_patient(rng)
+
+    stage1 = {k: patient[k] for k in ('age', 'gender', 'education', 'faq', 'ecogMem', 'ecogTotal')}
+    status, body = recorder.call(transport, 'stage1', 'POST', '/api/predict/stage1', stage1, token)
+    if status != 200:
+        return
+    assessment_id = body['assessment_id']
+
+    status, _ = recorder.call(transport, 'stage2', 'POST', '/api/predict/stage2',
+                              {'assessment_id': assessment_id, 'genotype': patient['genotype']}, token)
+    if status != 200:
+        return
+
+    stage3 = {k: patient[k] for k in ('ptau217', 'ab42', 'ab40', 'nfl')}
+    stage3['assessment_id'] = assessment_id
+    status, _ = recorder.call(transport, 'stage3', 'POST', '/api/predict/stage3', stage3, token)
+    if status != 200:
+        return
+
+    recorder.call(transport, 'result', 'GET', f'/api/results/{assessment_id}', token=token)
+    for _ in range(polls):
+        recorder.call(transport, 'results', 'GET', '/api/results', token=token)
+    with recorder._lock:
+        recorder.sessions += 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(recorder, elapsed):
+    total_requests = sum(len(v) for v in recorder.latencies.values())
+    total_errors = sum(recorder.errors.values())
+    print("=" * 78)
+    print(f"{recorder.sessions} sessions, {total_requests} requests in {elapsed:.1f}s "
+          f"({total_requests / elapsed:.1f} req/s, {recorder.sessions / elapsed:.2f} sessions/s), "
+          f"errors {total_errors / max(total_requests, 1):.2%}")
+    print("=" * 78)
+    print(f"{'endpoint':<10}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'err %':>8}")
+    for name in ('login', 'stage1', 'stage2', 'stage3', 'result', 'results'):
+        values = recorder.latencies.get(name)
+        if not values:
+            continue
+        print(f"{name:<10}{len(values):>8}{len(values) / elapsed:>9.1f}{percentile(values, 50):>10.1f}"
+              f"{percentile(values, 95):>10.1f}{percentile(values, 99):>10.1f}{max(values):>10.1f}"
+              f"{recorder.errors[name] / len(values):>8.1%}")
+
+
+def create_users(transport, count):
+    users = []
+    for i in range(count):
+        user = {'email': f'loadtest{i}@example.com', 'password': 'loadtest-password'}
+        transport.request('POST', '/api/auth/register', user)
+        users.append(user)
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn', 'url'), default='inprocess')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Target for --mode url')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for --mode gunicorn')
+    parser.add_argument('--port', type=int, default=8711)
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent sessions')
+    parser.add_argument('--rate', type=float, default=0.0, help='Session arrivals per second (0 = closed loop)')
+    parser.add_argument('--sessions', type=int, default=100, help='Sessions to run (closed loop)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate arrivals (open loop)')
+    parser.add_argument('--users', type=int, default=20, help='Distinct user accounts')
+    parser.add_argument('--polls', type=int, default=2, help='Results polls per session')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='mirai-load-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'load.db')}"
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    server = None
+
+    if args.mode == 'inprocess':
+        sys.path.insert(0, BASE_DIR)
+        from app import create_app
+        transport = InProcessTransport(create_app('production'))
+    else:
+        base_url = args.url
+        if args.mode == 'gunicorn':
+            base_url = f'http://127.0.0.1:{args.port}'
+            server = subprocess.Popen(
+                ['gunicorn', 'app:app', '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}'],
+                cwd=BASE_DIR, env=dict(os.environ, FLASK_ENV='production'),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        transport = HTTPTransport(base_url)
+        deadline = time.time() + 60
+        while transport.request('GET', '/api/health')[0] != 200:
+            if time.time() > deadline:
+                print(f"❌ Server at {base_url} did not become healthy")
+                return 1
+            time.sleep(0.5)
+
+    try:
+        users = create_users(transport, args.users)
+        recorder = Recorder()
+        rng = random.Random(args.seed)
+
+        def session(seed):
+            local_rng = random.Random(seed)
+            run_session(transport, recorder, local_rng.choice(users), local_rng, args.polls)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            if args.rate > 0:
+                # Open loop: Poisson arrivals independent of response times
+                next_arrival = start
+                while time.perf_counter() - start < args.duration:
+                    next_arrival += rng.expovariate(args.rate)
+                    delay = next_arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    pool.submit(session, rng.random())
+            else:
+                for _ in range(args.sessions):
+                    pool.submit(session, rng.random())
+        report(recorder, time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Model Replay
+Replays recorded inputs through the current and a candidate artifact set
+and reports how the outputs would move: probability deltas by percentile,
+per-stage risk-level transition matrices and final RiskEngine category
+flips. Runs offline (no server); rows are scored as vectorized cascade
+buffers, in chunks spread over worker processes.
+
+    python replay_models.py --candidate path/to/ml_models
+    python replay_models.py --candidate new_models --journal instance/journal --workers 8
+    python replay_models.py --candidate new_models --csv export.csv --json replay.json --fail-on-flips
+
+Inputs come from the assessments table (default: DATABASE_URL), a
+prediction journal directory (newest record per assessment), or a CSV with request-style columns (age,
+gender, education, faq, ecogMem, ecogTotal, genotype or apoe4_count,
+ptau217, ab42, ab40, nfl). Each stage is compared only on rows that
+completed it; the final category only on rows that completed all three.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (0, 1, 5, 25, 50, 75, 95, 99, 100)
+STAGE_LEVELS = ('Low', 'Elevated', 'High')
+CATEGORIES = ('Low', 'Moderate', 'High')
+
+# Request-style column -> default used by InferenceService.build_stage1_features
+STAGE1_DEFAULTS = (('age', 65.0), ('gender', 1.0), ('education', 16.0),
+                   ('faq', 0.0), ('ecogMem', 1.0), ('ecogTotal', 1.0))
+BIOMARKERS = ('ptau217', 'ab42', 'ab40', 'nfl')
+
+# assessments column -> request-style column
+DB_COLUMNS = {
+    'age': 'age', 'gender': 'gender', 'education': 'education', 'faq_score': 'faq',
+    'ecog_mem': 'ecogMem', 'ecog_total': 'ecogTotal', 'apoe4_count': 'apoe4_count',
+    'ptau217': 'ptau217', 'ab42': 'ab42', 'ab40': 'ab40', 'nfl': 'nfl',
+    'stage2_completed': 'stage2_completed', 'stage3_completed': 'stage3_completed'
+}
+
+
+# ----------------------------------------------------------------------
+# Inputs -> (buffer, completed) where completed[:, k] marks stage k+1
+# ----------------------------------------------------------------------
+def frame_to_buffer(frame):
+    """Cascade buffers from a DataFrame of request-style columns (fill_row semantics)."""
+    import pandas as pd
+    from backend.services.cascade import APOE4_COLUMN, BUFFER_WIDTH
+
+    n = len(frame)
+    buffer = np.zeros((n, BUFFER_WIDTH), dtype=np.float64)
+    for column, (name, default) in enumerate(STAGE1_DEFAULTS):
+        if name not in frame:
+            buffer[:, column] = default
+            continue
+        values = frame[name]
+        if name == 'gender' and values.dtype == object:
+            values = values.map(lambda g: (1.0 if g.lower() == 'male' else 0.0) if isinstance(g, str) else g)
+        buffer[:, column] = pd.to_numeric(values, errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+
+    if 'apoe4_count' in frame:
+        apoe4 = pd.to_numeric(frame['apoe4_count'], errors='coerce')
+    elif 'genotype' in frame:
+        apoe4 = frame['genotype'].map(lambda g: str(g).count('4') if isinstance(g, str) else 0)
+    else:
+        apoe4 = pd.Series(0, index=frame.index)
+    buffer[:, APOE4_COLUMN] = apoe4.fillna(0).to_numpy(dtype=np.float64)
+
+    for offset, name in enumerate(BIOMARKERS):
+        if name in frame:
+            buffer[:, 9 + offset] = pd.to_numeric(frame[name], errors='coerce').fillna(0).to_numpy()
+    return buffer
+
+
+def load_database(url, chunk_size):
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    engine = create_engine(url)
+    query = (f"SELECT {', '.join(DB_COLUMNS)} FROM assessments "
+             f"WHERE stage1_completed = 1 ORDER BY id")
+    buffers, completed = [], []
+    for chunk in pd.read_sql(query, engine, chunksize=chunk_size):
+        chunk = chunk.rename(columns=DB_COLUMNS)
+        buffers.append(frame_to_buffer(chunk))
+        completed.append(np.column_stack([
+            np.ones(len(chunk), dtype=bool),
+            chunk['stage2_completed'].fillna(0).astype(bool).to_numpy(),
+            chunk['stage3_completed'].fillna(0).astype(bool).to_numpy()
+        ]))
+    engine.dispose()
+    return _concat(buffers, completed)
+
+
+def latest_per_assessment(records):
+    """
+    Keep each assessment's newest journal record. Every prediction request
+    journals the assessment's full state, so a staged assessment appears
+    once per request; batch rows (assessment id 0) are all kept.
+    """
+    records = records[np.argsort(records['timestamp'], kind='stable')]
+    ids = records['assessment_id']
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    keep = ids == 0
+    keep[len(ids) - 1 - last_from_end] = True
+    return records[keep]
+
+
+def load_journal(directory, since=None):
+    from backend.services.cascade import APOE4_COLUMN, BUFFER_WIDTH
+    from backend.services.journal import JournalReader
+
+    records = JournalReader(directory).read_all(since=since)
+    records = latest_per_assessment(records)
+    inputs = records['inputs'].astype(np.float64)
+    buffer = np.zeros((len(records), BUFFER_WIDTH), dtype=np.float64)
+    for column, (_, default) in enumerate(STAGE1_DEFAULTS):
+        buffer[:, column] = np.where(np.isnan(inputs[:, column]), default, inputs[:, column])
+    buffer[:, APOE4_COLUMN] = np.nan_to_num(inputs[:, 6])
+    buffer[:, 9:13] = np.nan_to_num(inputs[:, 7:11])
+    completed = ~np.isnan(records['probabilities'][:, :3])
+    completed[:, 0] = True
+    return buffer, completed
+
+
+def load_csv(path, chunk_size):
+    import pandas as pd
+
+    buffers, completed = [], []
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        stage2 = chunk[[c for c in ('genotype', 'apoe4_count') if c in chunk]].notna().any(axis=1)
+        stage3 = chunk[[c for c in BIOMARKERS if c in chunk]].notna().any(axis=1)
+        buffers.append(frame_to_buffer(chunk))
+        completed.append(np.column_stack([
+            np.ones(len(chunk), dtype=bool), stage2.to_numpy(), (stage2 & stage3).to_numpy()
+        ]))
+    return _concat(buffers, completed)
+
+
+def _concat(buffers, completed):
+    from backend.services.cascade import BUFFER_WIDTH
+    if not buffers:
+        return np.empty((0, BUFFER_WIDTH)), np.empty((0, 3), dtype=bool)
+    return np.concatenate(buffers), np.concatenate(completed)
+
+
+# ----------------------------------------------------------------------
+# Scoring (one pair of pipelines per worker process)
+# ----------------------------------------------------------------------
+_pipelines = None
+
+
+def _init_worker(current_path, candidate_path, threads):
+    global _pipelines
+    from backend.services.cascade import CascadePipeline
+    from backend.services.model_loader import ArtifactSet
+
+    _pipelines = []
+    for path in (current_path, candidate_path):
+        pipeline = CascadePipeline(loader=ArtifactSet(path))
+        for stage in pipeline.stages():
+            if threads:
+                stage.booster.set_param({'nthread': threads})
+        _pipelines.append(pipeline)
+
+
+def _score_chunk(buffer):
+    """(current, candidate) stage probabilities for one chunk, each shaped (n, 3)."""
+    from backend.services.drift import drift_monitor
+
+    outputs = []
+    with drift_monitor.suppressed():
+        for pipeline in _pipelines:
+            p1, p2, p3, _ = pipeline.score_buffer(buffer.copy())
+            outputs.append(np.column_stack([p1, p2, p3]))
+    return outputs
+
+
+def replay(buffer, current_path, candidate_path, workers, chunk_size):
+    chunks = [buffer[i:i + chunk_size] for i in range(0, len(buffer), chunk_size)]
+    if workers <= 1:
+        _init_worker(current_path, candidate_path, 0)
+        results = [_score_chunk(chunk) for chunk in chunks]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(current_path, candidate_path, threads)) as pool:
+            results = list(pool.map(_score_chunk, chunks))
+    if not results:
+        return np.empty((0, 3)), np.empty((0, 3))
+    return (np.concatenate([r[0] for r in results]),
+            np.concatenate([r[1] for r in results]))
+
+
+# ----------------------------------------------------------------------
+# Report
+# ----------------------------------------------------------------------
+def levels(probabilities, thresholds):
+    return np.digitize(probabilities, thresholds)
+
+
+def transitions(before, after, labels):
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    np.add.at(matrix, (before, after), 1)
+    return {labels[i]: {labels[j]: int(matrix[i, j]) for j in range(len(labels))} for i in range(len(labels))}
+
+
+def delta_summary(current, candidate):
+    delta = candidate - current
+    if not len(delta):
+        return {'rows': 0}
+    return {
+        'rows': int(len(delta)),
+        'percentiles': {str(p): float(v) for p, v in zip(PERCENTILES, np.percentile(delta, PERCENTILES))},
+        'mean_abs': float(np.mean(np.abs(delta))),
+        'max_abs': float(np.max(np.abs(delta)))
+    }
+
+
+def build_report(current, candidate, completed):
+    from backend.services import InferenceService
+    from backend.services.cascade import CascadePipeline
+    from backend.services.risk_engine import RiskEngine
+
+    report = {'rows': int(len(current)), 'stages': {}}
+    for index, stage in enumerate((1, 2, 3)):
+        rows = completed[:, index]
+        thresholds = InferenceService.STAGE3_THRESHOLDS if stage == 3 else (0.3, 0.6)
+        before = levels(current[rows, index], thresholds)
+        after = levels(candidate[rows, index], thresholds)
+        report['stages'][stage] = dict(
+            delta_summary(current[rows, index], candidate[rows, index]),
+            changed_levels=int(np.count_nonzero(before != after)),
+            transitions=transitions(before, after, STAGE_LEVELS)
+        )
+
+    rows = completed.all(axis=1)
+    final_current, _ = CascadePipeline.fuse(*current[rows].T)
+    final_candidate, _ = CascadePipeline.fuse(*candidate[rows].T)
+    thresholds = (RiskEngine.LOW_THRESHOLD, RiskEngine.HIGH_THRESHOLD)
+    before, after = levels(final_current, thresholds), levels(final_candidate, thresholds)
+    report['final'] = dict(
+        delta_summary(final_current, final_candidate),
+        flips=int(np.count_nonzero(before != after)),
+        transitions=transitions(before, after, CATEGORIES)
+    )
+    return report
+
+
+def print_report(report):
+    print("=" * 72)
+    print(f"Model replay: {report['rows']:,} rows in {report['seconds']:.1f}s")
+    print(f"  current   {report['current']['path']}  {report['current']['versions']}")
+    print(f"  candidate {report['candidate']['path']}  {report['candidate']['versions']}")
+    print("=" * 72)
+    sections = [(f"Stage {s}", data, STAGE_LEVELS, 'changed_levels') for s, data in report['stages'].items()]
+    sections.append(("Final (RiskEngine)", report['final'], CATEGORIES, 'flips'))
+    for title, data, labels, changed in sections:
+        print(f"\n{title}: {data['rows']:,} rows, {data[changed]:,} changed category")
+        if not data['rows']:
+            continue
+        print("  delta (candidate - current) by percentile:")
+        print("    " + "  ".join(f"p{p}={v:+.4f}" for p, v in data['percentiles'].items()))
+        print(f"    mean |delta| {data['mean_abs']:.5f}, max |delta| {data['max_abs']:.5f}")
+        print("  transitions (rows: current, columns: candidate):")
+        print("    " + " " * 10 + "".join(f"{label:>12}" for label in labels))
+        for label in labels:
+            print(f"    {label:<10}" + "".join(f"{data['transitions'][label][other]:>12,}" for other in labels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidate', required=True, help='Models directory of the candidate artifacts')
+    parser.add_argument('--current', default=os.path.join(BASE_DIR, 'backend', 'ml_models'),
+                        help='Models directory of the current artifacts')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--database', default=None, help='Database URL (default: DATABASE_URL / app config)')
+    source.add_argument('--journal', default=None, help='Prediction journal directory')
+    source.add_argument('--csv', default=None, help='CSV export with request-style columns')
+    parser.add_argument('--since', type=float, default=None, help='Journal only: UNIX timestamp lower bound')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--json', default=None, help='Also write the report as JSON')
+    parser.add_argument('--fail-on-flips', action='store_true',
+                        help='Exit non-zero if any final risk category changes')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BASE_DIR)
+    from backend.services.model_loader import ArtifactSet
+
+    started = time.perf_counter()
+    if args.journal:
+        buffer, completed = load_journal(args.journal, args.since)
+    elif args.csv:
+        buffer, completed = load_csv(args.csv, args.chunk_size)
+    else:
+        from config import Config
+        buffer, completed = load_database(args.database or Config.SQLALCHEMY_DATABASE_URI, args.chunk_size)
+
+    current, candidate = replay(buffer, args.current, args.candidate, args.workers, args.chunk_size)
+    report = build_report(current, candidate, completed)
+    report['seconds'] = time.perf_counter() - started
+    for name, path in (('current', args.current), ('candidate', args.candidate)):
+        artifacts = ArtifactSet(path)
+        report[name] = {'path': path, 'versions': [artifacts.get_version(s) for s in (1, 2, 3)]}
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if args.fail_on_flips and report['final']['flips'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())